@@ -0,0 +1,126 @@
+"""
+Arranque de la calculadora nativa (Flet) frente al camino del navegador (Flask).
+
+Cada camino se ejecuta en un intérprete limpio hasta tener el primer
+resultado para 50 personas:
+
+    nativo      importa la vista de Flet y la construye (calcula en el proceso)
+    navegador   importa Flask, arranca el servidor en un hilo como main.py,
+                pide la página y después /api/calcular
+
+Se informa del tiempo hasta el primer resultado (desde que se lanza el
+proceso) y del pico de memoria residente del proceso. No incluye la ventana
+de Flet ni el proceso del navegador, que en el camino del navegador suele
+ser lo que más memoria ocupa.
+
+Uso:
+    python benchmarks/arranque_vista.py
+    python benchmarks/arranque_vista.py --repeticiones 10
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+PERSONAS = 50
+
+_MEMORIA = '''
+try:
+    import resource
+    pico_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+except ImportError:  # Windows
+    pico_kb = None
+print(json.dumps({'pico_kb': pico_kb, 'resultado': resultado}), flush=True)
+'''
+
+NATIVO = f'''
+import json, sys
+sys.path.insert(0, {str(RAIZ)!r})
+import flet
+from utils.vista_calculadora import VistaCalculadora
+vista = VistaCalculadora({PERSONAS})
+resultado = vista.texto_refresco.value
+''' + _MEMORIA
+
+NAVEGADOR = f'''
+import json, logging, sys
+from urllib.request import urlopen
+logging.getLogger('werkzeug').setLevel(logging.WARNING)
+sys.path.insert(0, {str(RAIZ)!r})
+import flet
+from utils.app import app
+from utils.servidor import ConfiguracionServidor, ServidorGestionado
+servidor = ServidorGestionado(app, ConfiguracionServidor.desde_entorno(
+    host='127.0.0.1', puerto=int(sys.argv[1]), modo='desarrollo'))
+servidor.iniciar()
+servidor.esperar_listo()
+urlopen(servidor.url + '/').read()
+resultado = json.loads(urlopen(servidor.url + '/api/calcular?personas={PERSONAS}').read())['personas']
+''' + _MEMORIA
+
+CAMINOS = {
+    'nativo': NATIVO,
+    'navegador': NAVEGADOR,
+}
+
+
+def _puerto_libre():
+    with socket.socket() as conexion:
+        conexion.bind(('127.0.0.1', 0))
+        return conexion.getsockname()[1]
+
+
+def medir(codigo):
+    """
+    Ejecuta un camino en un intérprete limpio.
+
+    Returns:
+        tuple: (ms hasta el primer resultado, pico de memoria en KB o None)
+    """
+    # El cálculo de prueba no debe quedar en el historial del usuario
+    entorno = {**os.environ, 'FOODCALC_HISTORIAL': '0'}
+    inicio = time.perf_counter()
+    proceso = subprocess.Popen(
+        [sys.executable, '-c', codigo, str(_puerto_libre())],
+        stdout=subprocess.PIPE, text=True, cwd=RAIZ, env=entorno
+    )
+    linea = proceso.stdout.readline()
+    transcurrido = (time.perf_counter() - inicio) * 1000
+    proceso.stdout.close()
+    proceso.wait()
+    if proceso.returncode != 0 or not linea:
+        raise RuntimeError(f'El proceso terminó con código {proceso.returncode}')
+    return transcurrido, json.loads(linea)['pico_kb']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeticiones', type=int, default=5,
+                        help='arranques por camino (se informa la mediana)')
+    args = parser.parse_args()
+
+    resultados = {}
+    for _ in range(args.repeticiones):
+        # Los caminos se alternan para repartir el ruido de la máquina
+        for nombre, codigo in CAMINOS.items():
+            resultados.setdefault(nombre, []).append(medir(codigo))
+
+    print(f"{'camino':<12} {'primer resultado ms':>20} {'pico memoria MB':>16}")
+    for nombre, medidas in resultados.items():
+        tiempo = statistics.median(ms for ms, _ in medidas)
+        picos = [kb for _, kb in medidas if kb is not None]
+        memoria = f'{statistics.median(picos) / 1024:.1f}' if picos else 'n/d'
+        print(f'{nombre:<12} {tiempo:>20.1f} {memoria:>16}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,84 @@
+"""
+Benchmark de la codificación JSON de las respuestas con cada proveedor.
+
+Codifica la respuesta de /api/calcular/lote con lotes grandes y la lista de
+productos con cada proveedor JSON instalado (json siempre, orjson si está
+disponible). Informa del tamaño, la velocidad en MB/s y la mejora respecto
+al proveedor json.
+
+Uso:
+    python benchmarks/codificacion_json.py                  # lotes de 1000, 10000 y 100000
+    python benchmarks/codificacion_json.py --lotes 500 5000
+"""
+
+import argparse
+import sys
+
+from rendimiento import app, medir  # noqa: E402  (prepara sys.path y el historial temporal)
+from utils.food_calculator import calcular_cantidades_lote, listar_productos_disponibles  # noqa: E402
+from utils.proveedor_json import PROVEEDORES  # noqa: E402
+
+LOTES = (1_000, 10_000, 100_000)
+
+
+def respuesta_lote(personas):
+    """El mismo dict que devuelve /api/calcular/lote"""
+    resultados = calcular_cantidades_lote(list(range(1, personas + 1)))
+    return {
+        'success': True,
+        'total': len(resultados),
+        'resultados': [
+            {
+                'personas': resultado['total_personas'],
+                'productos_kg': resultado['productos_kg'],
+                'productos_unidades': resultado['productos_unidades']
+            }
+            for resultado in resultados
+        ]
+    }
+
+
+def casos(lotes):
+    """Casos del benchmark: (nombre, proveedor, función sin argumentos que devuelve bytes)"""
+    proveedores = {nombre: clase(app) for nombre, clase in PROVEEDORES.items()}
+    productos = listar_productos_disponibles()
+    lista = {'success': True, 'productos': productos, 'total': len(productos)}
+
+    resultado = []
+    for personas in lotes:
+        datos = respuesta_lote(personas)
+        for nombre, proveedor in proveedores.items():
+            resultado.append((f'lote[{personas}]', nombre,
+                              lambda p=proveedor, d=datos: p.response(d).get_data()))
+    for nombre, proveedor in proveedores.items():
+        resultado.append(('productos-disponibles', nombre,
+                          lambda p=proveedor: p.response(lista).get_data()))
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--lotes', type=int, nargs='+', default=LOTES,
+                        help='tamaños de lote medidos')
+    parser.add_argument('--segundos', type=float, default=1.0,
+                        help='tiempo de medida por caso')
+    args = parser.parse_args()
+
+    if 'orjson' not in PROVEEDORES:
+        print('Aviso: orjson no está instalado; solo se mide el proveedor json', file=sys.stderr)
+
+    referencia = {}
+    print(f"{'caso':<24} {'proveedor':<10} {'p50 ms':>10} {'p99 ms':>10} {'KB':>10} {'MB/s':>9} {'x json':>7}")
+    with app.app_context():
+        for caso, proveedor, funcion in casos(args.lotes):
+            tamano = len(funcion())
+            resultado = medir(funcion, args.segundos, minimo=3)
+            referencia.setdefault(caso, resultado['p50_ms'])
+            velocidad = tamano / 1e6 / (resultado['p50_ms'] / 1000)
+            print(f"{caso:<24} {proveedor:<10} {resultado['p50_ms']:>10.3f} {resultado['p99_ms']:>10.3f} "
+                  f"{tamano / 1024:>10.1f} {velocidad:>9.1f} {referencia[caso] / resultado['p50_ms']:>7.1f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
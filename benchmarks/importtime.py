@@ -0,0 +1,165 @@
+"""
+Informe de tiempos de importación (equivalente a python -X importtime).
+
+Mide cuánto cuesta importar cada punto de entrada de la aplicación y qué
+módulos pesan más. El informe se guarda en benchmarks/importtime.txt para
+que las regresiones de arranque se vean en el diff.
+
+Los tiempos dependen de la máquina: el informe guardado se regenera en la
+máquina donde se verifica. Con --verificar, un objetivo que supera el umbral
+se vuelve a medir (--reintentos) antes de darlo por regresión, porque una
+fase de carga de la máquina puede ralentizar todos los arranques a la vez.
+
+Uso:
+    python benchmarks/importtime.py              # regenera el informe
+    python benchmarks/importtime.py --verificar  # compara con el informe guardado
+"""
+
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+INFORME = Path(__file__).resolve().parent / 'importtime.txt'
+
+# Módulos medidos: el lanzador, el servidor y los backends que deben ser diferidos
+OBJETIVOS = [
+    'utils.food_calculator',
+    'utils.app',
+    'main',
+    'utils.exportar_pdf',
+    'utils.exportar_imagen',
+]
+
+# Módulos pesados que no deben cargarse al importar el lanzador ni el servidor
+DIFERIDOS = ['reportlab', 'PIL', 'numpy']
+
+_LINEA = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)')
+
+
+def medir(modulo):
+    """
+    Importa un módulo en un intérprete limpio con -X importtime.
+
+    Returns:
+        tuple: (total en ms, [(acumulado en ms, import directo)], módulos cargados)
+    """
+    codigo = (
+        f'import sys; sys.path.insert(0, {str(RAIZ)!r}); import {modulo}; '
+        f'print(",".join(sorted(m for m in {DIFERIDOS!r} if m in sys.modules)))'
+    )
+    proceso = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', codigo],
+        capture_output=True, text=True, cwd=RAIZ, check=True
+    )
+    # importtime escribe en postorden: los imports de un módulo aparecen
+    # justo antes que él y con más sangría
+    filas = []
+    for linea in proceso.stderr.splitlines():
+        coincidencia = _LINEA.match(linea)
+        if coincidencia:
+            filas.append((len(coincidencia.group(3)), coincidencia.group(4),
+                          int(coincidencia.group(2)) / 1000))
+
+    total, directos = 0.0, []
+    for posicion, (sangria, nombre, acumulado) in enumerate(filas):
+        if nombre != modulo:
+            continue
+        total = acumulado
+        for sangria_hijo, nombre_hijo, acumulado_hijo in reversed(filas[:posicion]):
+            if sangria_hijo <= sangria:
+                break
+            if sangria_hijo == sangria + 2:
+                directos.append((acumulado_hijo, nombre_hijo))
+        break
+
+    cargados = [m for m in proceso.stdout.strip().split(',') if m]
+    return total, directos, cargados
+
+
+def mediana(objetivo, repeticiones):
+    """Mediana del tiempo de importación de un objetivo, en ms"""
+    return statistics.median(medir(objetivo)[0] for _ in range(repeticiones))
+
+
+def informe(repeticiones):
+    """Genera el texto del informe con la mediana de varias repeticiones"""
+    lineas = [
+        '# Tiempos de importación (mediana de %d arranques en frío)' % repeticiones,
+        f'# Python {sys.version.split()[0]} en {sys.platform}',
+        '# Regenerar con: python benchmarks/importtime.py',
+        '',
+    ]
+    # Las repeticiones se alternan entre objetivos para repartir el ruido de
+    # la máquina, en vez de medir cada objetivo en una sola racha
+    resultados = {objetivo: [] for objetivo in OBJETIVOS}
+    for _ in range(repeticiones):
+        for objetivo, medidas in resultados.items():
+            if medidas is None:
+                continue
+            try:
+                medidas.append(medir(objetivo))
+            except subprocess.CalledProcessError:
+                resultados[objetivo] = None
+
+    for objetivo, medidas in resultados.items():
+        if medidas is None:
+            lineas.append(f'{objetivo}: no se pudo importar')
+            continue
+        total = statistics.median(m[0] for m in medidas)
+        _, directos, cargados = medidas[-1]
+        lineas.append(f'{objetivo}: {total:.1f} ms')
+        lineas.append(f'  pesados cargados: {", ".join(cargados) or "ninguno"}')
+        for tiempo, modulo in sorted(directos, reverse=True)[:5]:
+            lineas.append(f'  {tiempo:8.1f} ms  {modulo}')
+        lineas.append('')
+    return '\n'.join(lineas)
+
+
+def _totales(texto):
+    return {
+        m.group(1): float(m.group(2))
+        for m in re.finditer(r'^(\S+): ([\d.]+) ms$', texto, re.MULTILINE)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--verificar', action='store_true',
+                        help='falla si algún objetivo es más lento que el informe guardado')
+    parser.add_argument('--umbral', type=float, default=0.25,
+                        help='regresión relativa tolerada con --verificar (0.25 = 25%%)')
+    parser.add_argument('--reintentos', type=int, default=2,
+                        help='nuevas medidas de un objetivo que supera el umbral')
+    args = parser.parse_args()
+
+    texto = informe(args.repeticiones)
+    print(texto)
+
+    if not args.verificar:
+        INFORME.write_text(texto + '\n', encoding='utf-8')
+        return 0
+
+    base = _totales(INFORME.read_text(encoding='utf-8'))
+    regresiones = []
+    for modulo, actual in _totales(texto).items():
+        if modulo not in base:
+            continue
+        limite = base[modulo] * (1 + args.umbral)
+        for _ in range(args.reintentos):
+            if actual <= limite:
+                break
+            actual = min(actual, mediana(modulo, args.repeticiones))
+        if actual > limite:
+            regresiones.append(f'{modulo}: {actual:.1f} ms (antes {base[modulo]:.1f} ms)')
+    for regresion in regresiones:
+        print(f'REGRESIÓN {regresion}', file=sys.stderr)
+    return 1 if regresiones else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,355 @@
+"""
+Benchmarks del núcleo de cálculo y de todas las rutas HTTP.
+
+Mide las funciones de food_calculator con varias cantidades de personas y
+cada ruta de utils/app.py a través del cliente de pruebas de Flask
+(incluida la exportación a PDF e imagen). Para cada caso informa de
+operaciones por segundo, latencia p50/p99 y pico de memoria asignada.
+
+Uso:
+    python benchmarks/rendimiento.py                 # mide y compara con la línea base
+    python benchmarks/rendimiento.py --guardar       # mide y guarda la línea base
+    python benchmarks/rendimiento.py --filtro pdf    # solo los casos que contienen 'pdf'
+    python benchmarks/rendimiento.py --umbral 0.25   # regresión tolerada (25 %)
+
+La salida es 1 si algún caso empeora más que el umbral respecto a la
+línea base (p50 o pico de memoria).
+
+La línea base guarda tiempos absolutos y depende de la máquina: hay que
+regenerarla con --guardar en cada equipo donde se compare. Para reducir
+falsas alarmas al comparar, la línea base guarda además el tiempo de una
+carga de calibración fija; los p50 guardados se escalan por la relación
+entre esa calibración y la actual antes de compararlos. Si la máquina no es
+la de la línea base se avisa. --margen fija la tolerancia absoluta en ms.
+"""
+
+import argparse
+import atexit
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+# Los trabajos de exportación se renderizan en hilos para medir sin el
+# coste de arrancar procesos en cada ejecución del benchmark
+os.environ.setdefault('FOODCALC_EXPORTACION_PROCESOS', '0')
+
+# Los cálculos medidos se guardan en un historial temporal, no en el del usuario
+if 'FOODCALC_HISTORIAL' not in os.environ:
+    _DIRECTORIO_HISTORIAL = tempfile.mkdtemp(prefix='foodcalc-benchmark-')
+    atexit.register(shutil.rmtree, _DIRECTORIO_HISTORIAL, True)
+    os.environ['FOODCALC_HISTORIAL'] = os.path.join(_DIRECTORIO_HISTORIAL, 'historial.db')
+
+from utils.app import app  # noqa: E402
+from utils.catalogo import RECETARIO  # noqa: E402
+from utils.exportacion import generar_imagen, generar_pdf  # noqa: E402
+from utils.historial import HISTORIAL  # noqa: E402
+from utils.food_calculator import (  # noqa: E402
+    calcular_cantidades_comida,
+    calcular_cantidades_lote,
+    calcular_ingredientes_preparacion,
+    calcular_menu,
+    formatear_ingredientes_preparacion,
+    formatear_menu,
+    formatear_preparacion_especifica,
+    formatear_resultados,
+    calcular_preparacion_especifica,
+)
+from utils.menu import EntradaMenu  # noqa: E402
+from utils.renderizado import formatos_disponibles  # noqa: E402
+
+LINEA_BASE = Path(__file__).resolve().parent / 'linea_base.json'
+
+PERSONAS = (10, 100, 1000)
+PREPARACION = RECETARIO.nombres[0]
+
+
+def casos_nucleo():
+    """Casos del núcleo de cálculo: (nombre, función sin argumentos)"""
+    casos = []
+    for personas in PERSONAS:
+        resultado = calcular_cantidades_comida(personas)
+        ingredientes = calcular_ingredientes_preparacion(personas)
+        preparacion = calcular_preparacion_especifica(personas, PREPARACION)
+
+        casos.append((f'calcular_cantidades_comida[{personas}]',
+                      lambda p=personas: calcular_cantidades_comida(p)))
+        casos.append((f'calcular_ingredientes_preparacion[{personas}]',
+                      lambda p=personas: calcular_ingredientes_preparacion(p)))
+        for formato in formatos_disponibles():
+            casos.append((f'formatear_resultados[{personas},{formato}]',
+                          lambda r=resultado, f=formato: formatear_resultados(r, f)))
+            casos.append((f'formatear_ingredientes_preparacion[{personas},{formato}]',
+                          lambda i=ingredientes, f=formato: formatear_ingredientes_preparacion(i, f)))
+            casos.append((f'formatear_preparacion_especifica[{personas},{formato}]',
+                          lambda r=preparacion, f=formato: formatear_preparacion_especifica(r, f)))
+
+    lote = list(range(1, 10_001))
+    casos.append(('calcular_cantidades_lote[10000]', lambda: calcular_cantidades_lote(lote)))
+
+    menu = [
+        EntradaMenu(RECETARIO.nombres[i % len(RECETARIO.nombres)], 50 + i, 3, 1)
+        for i in range(30 * 3 * 5)
+    ]
+    resultado_menu = calcular_menu(menu)
+    casos.append(('calcular_menu[450]', lambda: calcular_menu(menu)))
+    casos.append(('formatear_menu[450,csv]', lambda: formatear_menu(resultado_menu, 'csv')))
+
+    casos.append(('generar_pdf[100]', lambda: generar_pdf(100)))
+    casos.append(('generar_imagen[100,png]', lambda: generar_imagen(100, 'png')))
+    return casos
+
+
+def _peticion(cliente, metodo, ruta, **opciones):
+    def ejecutar():
+        respuesta = getattr(cliente, metodo)(ruta, **opciones)
+        datos = respuesta.get_data()
+        if respuesta.status_code >= 400:
+            raise RuntimeError(f'{metodo.upper()} {ruta}: {respuesta.status_code} {datos[:200]!r}')
+        return datos
+    return ejecutar
+
+
+def _exportar(cliente, tipo):
+    def ejecutar():
+        trabajo = cliente.post('/api/exportar', json={'personas': 100, 'tipo': tipo}).get_json()['trabajo']
+        while trabajo['estado'] not in ('terminado', 'error'):
+            time.sleep(0.001)
+            trabajo = cliente.get(f"/api/exportar/{trabajo['id']}").get_json()['trabajo']
+        return _peticion(cliente, 'get', f"/api/exportar/{trabajo['id']}/descarga")()
+    return ejecutar
+
+
+# Casos que se miden antes que el resto, con el proceso recién arrancado
+PRIMEROS = ('GET /metrics',)
+
+RUTAS_EXPORTAR = ('/api/exportar', '/api/exportar/<trabajo_id>', '/api/exportar/<trabajo_id>/descarga')
+
+
+def casos_http():
+    """Casos de las rutas HTTP: (nombre, regla o reglas cubiertas, función sin argumentos)"""
+    cliente = app.test_client()
+    json_100 = {'json': {'personas': 100}}
+    casos = [
+        ('GET /', '/', _peticion(cliente, 'get', '/')),
+        ('GET /api/salud', '/api/salud', _peticion(cliente, 'get', '/api/salud')),
+        ('GET /metrics', '/metrics', _peticion(cliente, 'get', '/metrics')),
+        ('POST /api/calcular', '/api/calcular', _peticion(cliente, 'post', '/api/calcular', **json_100)),
+        ('GET /api/calcular', '/api/calcular', _peticion(cliente, 'get', '/api/calcular?personas=100')),
+        ('POST /api/calcular/lote[1000]', '/api/calcular/lote',
+         _peticion(cliente, 'post', '/api/calcular/lote', json={'personas': list(range(1, 1001))})),
+        ('POST /api/calcular/lote/ndjson[1000]', '/api/calcular/lote/<formato_flujo>',
+         _peticion(cliente, 'post', '/api/calcular/lote/ndjson', json={'personas': list(range(1, 1001))})),
+        ('POST /api/producto', '/api/producto',
+         _peticion(cliente, 'post', '/api/producto', json={'personas': 100, 'producto': 'Arroz blanco'})),
+        ('GET /api/productos-disponibles', '/api/productos-disponibles',
+         _peticion(cliente, 'get', '/api/productos-disponibles')),
+        ('POST /api/ingredientes', '/api/ingredientes', _peticion(cliente, 'post', '/api/ingredientes', **json_100)),
+        ('GET /api/preparaciones-disponibles', '/api/preparaciones-disponibles',
+         _peticion(cliente, 'get', '/api/preparaciones-disponibles')),
+        ('POST /api/preparacion', '/api/preparacion',
+         _peticion(cliente, 'post', '/api/preparacion', json={'personas': 100, 'preparacion': PREPARACION})),
+        ('POST /api/menu', '/api/menu', _peticion(cliente, 'post', '/api/menu', json={'entradas': [
+            {'preparacion': nombre, 'personas': 100, 'raciones_dia': 2, 'dias': 30}
+            for nombre in RECETARIO.nombres
+        ]})),
+        ('POST /api/refresco', '/api/refresco', _peticion(cliente, 'post', '/api/refresco', **json_100)),
+        ('GET /api/descargar/pdf', '/api/descargar/pdf',
+         _peticion(cliente, 'get', '/api/descargar/pdf?personas=100')),
+        ('GET /api/descargar/imagen', '/api/descargar/imagen',
+         _peticion(cliente, 'get', '/api/descargar/imagen?personas=100&formato_imagen=png')),
+    ]
+    # Cada exportación encola, consulta el estado y descarga el resultado
+    casos.extend(
+        (f'POST /api/exportar {tipo} (hasta la descarga)', RUTAS_EXPORTAR, _exportar(cliente, tipo))
+        for tipo in ('pdf', 'imagen')
+    )
+    casos.extend(
+        (f'POST /api/formato/{formato}', '/api/formato/<formato_tipo>',
+         _peticion(cliente, 'post', f'/api/formato/{formato}', **json_100))
+        for formato in formatos_disponibles()
+    )
+    # Las consultas del historial recorren lo que han registrado los casos anteriores
+    if HISTORIAL is not None:
+        casos.extend([
+            ('GET /api/historial', '/api/historial', _peticion(cliente, 'get', '/api/historial?limite=100')),
+            ('GET /api/historial/totales (por mes)', '/api/historial/totales',
+             _peticion(cliente, 'get', '/api/historial/totales?agrupar=mes')),
+        ])
+    return casos
+
+
+def rutas_sin_cubrir(casos):
+    """Rutas de la aplicación que ningún caso HTTP recorre"""
+    cubiertas = set()
+    for _, reglas, _ in casos:
+        cubiertas.update((reglas,) if isinstance(reglas, str) else reglas)
+    return sorted(
+        regla.rule for regla in app.url_map.iter_rules()
+        if regla.endpoint != 'static' and regla.rule not in cubiertas
+    )
+
+
+def medir(funcion, segundos, minimo=5):
+    """
+    Ejecuta una función repetidamente durante un tiempo fijo.
+
+    Returns:
+        dict: ops_s, p50_ms, p99_ms, pico_kb e iteraciones
+    """
+    funcion()  # calentamiento: cachés, imports diferidos, plantillas
+
+    latencias = []
+    limite = time.perf_counter() + segundos
+    while len(latencias) < minimo or time.perf_counter() < limite:
+        inicio = time.perf_counter_ns()
+        funcion()
+        latencias.append(time.perf_counter_ns() - inicio)
+
+    # El pico de memoria se mide aparte: tracemalloc ralentiza la ejecución
+    tracemalloc.start()
+    funcion()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    percentiles = statistics.quantiles(latencias, n=100, method='inclusive')
+    return {
+        'ops_s': round(len(latencias) / (sum(latencias) / 1e9), 1),
+        'p50_ms': round(percentiles[49] / 1e6, 4),
+        'p99_ms': round(percentiles[98] / 1e6, 4),
+        'pico_kb': round(pico / 1024, 1),
+        'iteraciones': len(latencias),
+    }
+
+
+def calibrar(repeticiones=7):
+    """
+    Mide una carga fija de Python puro (ordenar y sumar) para estimar la
+    velocidad de la máquina en este momento.
+
+    Returns:
+        float: Mediana en ms
+    """
+    datos = [(i * 7919) % 10007 for i in range(200_000)]
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        sum(sorted(datos))
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return round(statistics.median(tiempos), 3)
+
+
+def maquina():
+    """Identifica el equipo en el que se mide la línea base"""
+    return f'{platform.node()} {platform.machine()} {os.cpu_count()} CPU'
+
+
+def comparar(resultados, base, umbral, factor=1.0, margen_ms=0.1):
+    """
+    Compara los resultados con la línea base.
+
+    Args:
+        resultados (dict): Resultados actuales por caso
+        base (dict): Casos de la línea base
+        umbral (float): Regresión relativa tolerada
+        factor (float): Calibración actual / calibración de la línea base;
+            escala los p50 guardados a la velocidad de esta máquina
+        margen_ms (float): Margen absoluto para los casos de microsegundos
+
+    Returns:
+        list: Descripción de cada regresión por encima del umbral
+    """
+    regresiones = []
+    for nombre, actual in resultados.items():
+        anterior = base.get(nombre)
+        if anterior is None:
+            continue
+        for metrica in ('p50_ms', 'pico_kb'):
+            # Un margen absoluto evita falsas alarmas en casos de microsegundos
+            if metrica == 'p50_ms':
+                referencia, margen = anterior[metrica] * factor, margen_ms
+            else:
+                referencia, margen = anterior[metrica], 4
+            if actual[metrica] > referencia * (1 + umbral) + margen:
+                regresiones.append(f'{nombre}: {metrica} {round(referencia, 4)} -> {actual[metrica]}')
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--segundos', type=float, default=0.3,
+                        help='tiempo de medida por caso')
+    parser.add_argument('--filtro', default='',
+                        help='solo los casos cuyo nombre contiene este texto')
+    parser.add_argument('--umbral', type=float, default=0.5,
+                        help='regresión relativa tolerada (0.5 = 50%%)')
+    parser.add_argument('--guardar', action='store_true',
+                        help='guarda los resultados como nueva línea base')
+    parser.add_argument('--margen', type=float, default=0.1,
+                        help='margen absoluto tolerado en el p50, en ms')
+    parser.add_argument('--base', type=Path, default=LINEA_BASE,
+                        help='archivo JSON de la línea base')
+    args = parser.parse_args()
+
+    http = casos_http()
+    casos = casos_nucleo() + [(nombre, funcion) for nombre, _, funcion in http]
+    casos = [(nombre, funcion) for nombre, funcion in casos if args.filtro in nombre]
+    # Cada caso añade series de métricas y /metrics tarda más cuantas más
+    # hay: se mide primero para que exponga siempre el mismo registro
+    casos.sort(key=lambda caso: caso[0] not in PRIMEROS)
+
+    sin_cubrir = rutas_sin_cubrir(http)
+    if sin_cubrir:
+        print(f"Aviso: rutas sin benchmark: {', '.join(sin_cubrir)}", file=sys.stderr)
+
+    calibracion = calibrar()
+    resultados = {}
+    print(f"{'caso':<58} {'ops/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'pico KB':>9}")
+    for nombre, funcion in casos:
+        resultado = medir(funcion, args.segundos)
+        resultados[nombre] = resultado
+        print(f"{nombre:<58} {resultado['ops_s']:>10.1f} {resultado['p50_ms']:>9.3f} "
+              f"{resultado['p99_ms']:>9.3f} {resultado['pico_kb']:>9.1f}")
+
+    if args.guardar:
+        base = json.loads(args.base.read_text(encoding='utf-8'))['casos'] if args.base.exists() else {}
+        base.update(resultados)
+        args.base.write_text(json.dumps({
+            'python': sys.version.split()[0],
+            'plataforma': sys.platform,
+            'maquina': maquina(),
+            'calibracion_ms': calibracion,
+            'casos': dict(sorted(base.items())),
+        }, indent=2, ensure_ascii=False) + '\n', encoding='utf-8')
+        print(f'Línea base guardada en {args.base}')
+        return 0
+
+    if not args.base.exists():
+        print('No hay línea base; ejecute con --guardar para crearla')
+        return 0
+
+    base = json.loads(args.base.read_text(encoding='utf-8'))
+    if base.get('maquina') != maquina():
+        print(f"Aviso: la línea base es de otra máquina ({base.get('maquina', 'desconocida')}); "
+              'regenérela con --guardar en esta', file=sys.stderr)
+    # Sin calibración guardada (líneas base antiguas) no se escala
+    factor = calibracion / base['calibracion_ms'] if base.get('calibracion_ms') else 1.0
+    print(f"Calibración: {calibracion} ms (línea base {base.get('calibracion_ms', 'n/d')} ms, factor {factor:.2f})")
+
+    regresiones = comparar(resultados, base['casos'], args.umbral, factor, args.margen)
+    for regresion in regresiones:
+        print(f'REGRESIÓN {regresion}', file=sys.stderr)
+    return 1 if regresiones else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,50 +1,97 @@
 """
 Food Calculator - Aplicación de escritorio con Flet y Flask
-Proporciona una interfaz Flet con un botón para iniciar la app web
+Abre la calculadora nativa (calcula en este proceso, sin servidor) y
+permite iniciar la app web con Flask para usarla desde el navegador
 """
 
+import atexit
 import flet as ft
+import os
 import threading
 import webbrowser
-import time
 from pathlib import Path
 import sys
 
 # Agregar el directorio actual al path
 sys.path.insert(0, str(Path(__file__).parent))
 
-from utils.app import app as flask_app
+# utils.app (Flask) se importa al iniciar el servidor, no al abrir la ventana
+from utils.servidor import ConfiguracionServidor, ServidorGestionado, esperar_disponible
 
 
 class FoodCalculatorApp:
     def __init__(self):
-        self.server_thread = None
-        self.server_running = False
+        self.server = None
         self.port = 5000
         self.host = 'localhost'
+        self.modo = 'desarrollo'
+        self.trabajadores = 2
+        # Precarga opcional de Flask y de los backends de exportación
+        self.precargar = os.environ.get('FOODCALC_PRECARGAR') == '1'
+    
+    @property
+    def server_running(self):
+        return self.server is not None and self.server.en_ejecucion
+    
+    @property
+    def url(self):
+        return f'http://{self.host}:{self.port}'
         
     def start_server(self):
-        """Inicia el servidor Flask en un thread separado"""
+        """
+        Inicia el servidor en un thread separado con el modo elegido y
+        espera a que responda en la ruta de salud.
+        
+        Returns:
+            bool: True si el servidor quedó listo
+        """
         if self.server_running:
-            return
+            return True
         
-        self.server_running = True
-        self.server_thread = threading.Thread(
-            target=lambda: flask_app.run(
-                debug=False,
-                host=self.host,
-                port=self.port,
-                use_reloader=False
-            ),
-            daemon=True
+        from utils.app import app as flask_app
+        
+        configuracion = ConfiguracionServidor.desde_entorno(
+            host=self.host,
+            puerto=self.port,
+            modo=self.modo,
+            trabajadores=self.trabajadores
         )
-        self.server_thread.start()
+        self.server = ServidorGestionado(flask_app, configuracion)
+        self.server.iniciar()
+        return self.server.esperar_listo()
+    
+    def stop_server(self):
+        """Detiene el servidor y libera el puerto"""
+        if self.server is not None:
+            self.server.detener()
+            self.server = None
+    
+    def restart_server(self):
+        """
+        Reinicia el servidor con el modo, los trabajadores y el puerto actuales.
+        
+        Returns:
+            bool: True si el servidor quedó listo
+        """
+        if self.server is None:
+            return self.start_server()
+        
+        self.server.reiniciar(puerto=self.port, modo=self.modo, trabajadores=self.trabajadores)
+        return self.server.esperar_listo()
+        
+    def prewarm(self):
+        """Importa Flask y los backends de exportación en segundo plano"""
+        def cargar():
+            import utils.app  # noqa: F401
+            from utils.exportacion import precargar
+            precargar(en_segundo_plano=False)
+        
+        threading.Thread(target=cargar, name='precarga', daemon=True).start()
         
     def open_browser(self):
-        """Abre el navegador con la URL de la app"""
-        time.sleep(1)  # Esperar a que el servidor inicie
-        url = f'http://{self.host}:{self.port}'
-        webbrowser.open(url)
+        """Abre el navegador en cuanto el servidor responde"""
+        if esperar_disponible(self.host, self.port):
+            webbrowser.open(self.url)
 
 
 def main(page: ft.Page):
@@ -52,14 +99,28 @@ def main(page: ft.Page):
     
     # Configurar página
     page.title = "🍳 Food Calculator"
-    page.window.width = 600
-    page.window.height = 700
+    page.window.width = 640
+    page.window.height = 800
     page.theme_mode = ft.ThemeMode.LIGHT
     page.padding = 20
     
     # Crear instancia de la app
     calc_app = FoodCalculatorApp()
     
+    # El servidor se detiene al cerrar la ventana o al salir del proceso: en
+    # modo producción gunicorn es un proceso aparte que quedaría huérfano
+    # con el puerto ocupado
+    atexit.register(calc_app.stop_server)
+    
+    def on_window_event(e):
+        """Detiene el servidor antes de cerrar la ventana"""
+        if e.data == "close":
+            calc_app.stop_server()
+            page.window.destroy()
+    
+    page.window.prevent_close = True
+    page.window.on_event = on_window_event
+    
     # ===== COMPONENTES =====
     
     # Título
@@ -99,7 +160,10 @@ def main(page: ft.Page):
         if running:
             status_indicator.content.controls[0].name = ft.Icons.CHECK_CIRCLE
             status_indicator.content.controls[0].color = "#22c55e"
-            status_indicator.content.controls[1].value = "Servidor ejecutándose ✓"
+            status_indicator.content.controls[1].value = (
+                f"Servidor ejecutándose ✓ ({calc_app.server.nombre}, "
+                f"{calc_app.server.trabajadores} trabajadores)"
+            )
             status_indicator.bgcolor = "#dcfce7"
         else:
             status_indicator.content.controls[0].name = ft.Icons.CIRCLE
@@ -108,6 +172,33 @@ def main(page: ft.Page):
             status_indicator.bgcolor = "#fee2e2"
         page.update()
     
+    # Selector de modo del servidor
+    selector_modo = ft.Dropdown(
+        label="Modo del servidor",
+        width=300,
+        value=calc_app.modo,
+        options=[
+            ft.dropdown.Option("desarrollo", "Desarrollo (un proceso)"),
+            ft.dropdown.Option("produccion", "Producción (varios trabajadores)"),
+        ]
+    )
+    
+    # Número de trabajadores del modo producción
+    campo_trabajadores = ft.TextField(
+        label="Trabajadores",
+        width=300,
+        value=str(calc_app.trabajadores),
+        keyboard_type=ft.KeyboardType.NUMBER
+    )
+    
+    # Puerto del servidor (se puede cambiar entre arranques)
+    campo_puerto = ft.TextField(
+        label="Puerto",
+        width=300,
+        value=str(calc_app.port),
+        keyboard_type=ft.KeyboardType.NUMBER
+    )
+    
     # Botón principal - Iniciar servidor
     btn_iniciar = ft.ElevatedButton(
         text="▶️ Iniciar Servidor",
@@ -138,6 +229,16 @@ def main(page: ft.Page):
         disabled=True
     )
     
+    # Botón - Reiniciar con el modo, los trabajadores y el puerto elegidos
+    btn_reiniciar = ft.ElevatedButton(
+        text="🔄 Reiniciar Servidor",
+        bgcolor="#f59e0b",
+        color="white",
+        width=300,
+        height=60,
+        disabled=True
+    )
+    
     # Información
     info_text = ft.Text(
         "Haz clic en 'Iniciar Servidor' para comenzar",
@@ -191,20 +292,36 @@ def main(page: ft.Page):
     
     # ===== EVENTOS =====
     
+    def leer_campos():
+        """Pasa a la app el modo, los trabajadores y el puerto de los campos"""
+        calc_app.modo = selector_modo.value
+        calc_app.trabajadores = max(1, int(campo_trabajadores.value or 1))
+        calc_app.port = int(campo_puerto.value or calc_app.port)
+    
+    def mostrar_en_ejecucion():
+        """Actualiza botones, URL y estado con el servidor en marcha"""
+        btn_iniciar.disabled = True
+        url_text.value = f"🔗 {calc_app.url}"
+        btn_abrir.disabled = False
+        btn_reiniciar.disabled = False
+        btn_detener.disabled = False
+        url_text.visible = True
+        update_status(True)
+    
     def on_iniciar_click(e):
         """Evento al hacer clic en Iniciar"""
         try:
             info_text.value = "⏳ Iniciando servidor..."
             page.update()
             
-            calc_app.start_server()
+            leer_campos()
+            
+            if not calc_app.start_server():
+                calc_app.stop_server()
+                raise RuntimeError(f"el servidor no respondió en {calc_app.url}")
             
             # Actualizar UI
-            btn_iniciar.disabled = True
-            btn_abrir.disabled = False
-            btn_detener.disabled = False
-            url_text.visible = True
-            update_status(True)
+            mostrar_en_ejecucion()
             info_text.value = "✓ Servidor iniciado correctamente"
             info_text.color = "#22c55e"
             
@@ -217,7 +334,7 @@ def main(page: ft.Page):
     def on_abrir_click(e):
         """Evento al hacer clic en Abrir"""
         try:
-            url = f'http://{calc_app.host}:{calc_app.port}'
+            url = calc_app.url
             webbrowser.open(url)
             info_text.value = f"✓ Abriendo {url} en el navegador..."
             info_text.color = "#22c55e"
@@ -227,12 +344,38 @@ def main(page: ft.Page):
         
         page.update()
     
+    def on_reiniciar_click(e):
+        """Evento al hacer clic en Reiniciar: aplica los campos sin cerrar la app"""
+        try:
+            info_text.value = "⏳ Reiniciando servidor..."
+            page.update()
+            
+            leer_campos()
+            
+            if not calc_app.restart_server():
+                calc_app.stop_server()
+                raise RuntimeError(f"el servidor no respondió en {calc_app.url}")
+            
+            mostrar_en_ejecucion()
+            info_text.value = "✓ Servidor reiniciado correctamente"
+            info_text.color = "#22c55e"
+        except Exception as ex:
+            on_detener_click(e)
+            info_text.value = f"❌ Error: {str(ex)}"
+            info_text.color = "#ef4444"
+        
+        page.update()
+    
     def on_detener_click(e):
         """Evento al hacer clic en Detener"""
         try:
-            calc_app.server_running = False
+            info_text.value = "⏳ Deteniendo servidor..."
+            page.update()
+            
+            calc_app.stop_server()
             btn_iniciar.disabled = False
             btn_abrir.disabled = True
+            btn_reiniciar.disabled = True
             btn_detener.disabled = True
             url_text.visible = False
             update_status(False)
@@ -247,6 +390,7 @@ def main(page: ft.Page):
     # Asignar eventos
     btn_iniciar.on_click = on_iniciar_click
     btn_abrir.on_click = on_abrir_click
+    btn_reiniciar.on_click = on_reiniciar_click
     btn_detener.on_click = on_detener_click
     
     # ===== DISEÑO =====
@@ -254,8 +398,12 @@ def main(page: ft.Page):
     # Contenedor de botones
     buttons_container = ft.Column(
         [
+            selector_modo,
+            campo_trabajadores,
+            campo_puerto,
             btn_iniciar,
             btn_abrir,
+            btn_reiniciar,
             btn_detener,
         ],
         spacing=12,
@@ -294,14 +442,46 @@ def main(page: ft.Page):
         expand=True
     )
     
-    # Scroll view
+    # Calculadora nativa: llama a food_calculator directamente, sin HTTP.
+    # Se importa al abrir la ventana, no al importar el módulo
+    from utils.vista_calculadora import VistaCalculadora
+    vista_calculadora = VistaCalculadora()
+    
+    # Scroll view del servidor web, oculto hasta que se elige
+    panel_servidor = ft.Column(
+        [main_content],
+        scroll=ft.ScrollMode.AUTO,
+        expand=True,
+        visible=False
+    )
+    
+    def mostrar_panel(calculadora: bool):
+        """Alterna entre la calculadora nativa y el panel del servidor web"""
+        vista_calculadora.contenido.visible = calculadora
+        panel_servidor.visible = not calculadora
+        btn_calculadora.disabled = calculadora
+        btn_version_web.disabled = not calculadora
+        page.update()
+    
+    btn_calculadora = ft.ElevatedButton(
+        text="🧮 Calculadora",
+        disabled=True,
+        on_click=lambda e: mostrar_panel(True)
+    )
+    btn_version_web = ft.ElevatedButton(
+        text="🌐 Versión web",
+        on_click=lambda e: mostrar_panel(False)
+    )
+    
     page.add(
-        ft.Column(
-            [main_content],
-            scroll=ft.ScrollMode.AUTO,
-            expand=True
-        )
+        ft.Row([btn_calculadora, btn_version_web], alignment=ft.MainAxisAlignment.CENTER),
+        vista_calculadora.contenido,
+        panel_servidor
     )
+    
+    # Precarga opcional tras el primer pintado
+    if calc_app.precargar:
+        calc_app.prewarm()
 
 
 def main_app():
@@ -0,0 +1,14 @@
+"""
+Configuración común de las pruebas.
+
+Las pruebas importan los módulos como utils.*, igual que main.py, y nunca
+escriben en el historial del usuario: cada prueba que lo necesita crea el
+suyo en un directorio temporal.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ['FOODCALC_HISTORIAL'] = '0'
@@ -0,0 +1,83 @@
+"""Pruebas de las rutas de la API"""
+
+import pytest
+
+import utils.app as modulo_app
+from utils.catalogo import VERSION_CATALOGO
+from utils.historial import HistorialCalculos
+
+
+@pytest.fixture
+def cliente():
+    return modulo_app.app.test_client()
+
+
+@pytest.fixture
+def historial(tmp_path, monkeypatch):
+    historial = HistorialCalculos(tmp_path / 'historial.db', intervalo=0.01)
+    monkeypatch.setattr(modulo_app, 'HISTORIAL', historial)
+    return historial
+
+
+def _filas(historial):
+    assert historial.vaciar(5)
+    return historial.calculos()
+
+
+def test_calcular_con_formato_registra_una_fila(cliente, historial):
+    # Lo que hace calcular() en index.html con un formato distinto de 'tabla'
+    consulta = {'personas': 50, 'v': VERSION_CATALOGO}
+    assert cliente.get('/api/calcular', query_string=consulta).status_code == 200
+    respuesta = cliente.get('/api/formato/markdown', query_string={**consulta, 'historial': 0})
+    assert respuesta.status_code == 200
+
+    filas = _filas(historial)
+    assert [(f['tipo'], f['personas']) for f in filas] == [('productos', 50)]
+
+
+def test_formato_sin_calcular_antes_se_registra(cliente, historial):
+    assert cliente.post('/api/formato/csv', json={'personas': 5}).status_code == 200
+    assert [f['tipo'] for f in _filas(historial)] == ['productos']
+
+
+def test_ingredientes_de_todas_las_preparaciones_se_registran(cliente, historial):
+    # obtenerIngredientes() en index.html no envía preparaciones
+    consulta = {'personas': 20, 'formato': 'texto', 'v': VERSION_CATALOGO}
+    assert cliente.get('/api/ingredientes', query_string=consulta).status_code == 200
+
+    filas = _filas(historial)
+    assert [(f['tipo'], f['personas']) for f in filas] == [('preparaciones', 20)]
+    assert historial.totales(productos=['Huevos'])
+
+
+def test_revalidacion_304_se_registra(cliente, historial):
+    # fetch(..., {cache: 'no-cache'}) repite la petición con If-None-Match
+    consulta = {'personas': 30, 'v': VERSION_CATALOGO}
+    primera = cliente.get('/api/refresco', query_string=consulta)
+    assert 'immutable' in primera.headers['Cache-Control']
+    segunda = cliente.get('/api/refresco', query_string=consulta,
+                          headers={'If-None-Match': primera.headers['ETag']})
+    assert segunda.status_code == 304
+
+    assert [f['tipo'] for f in _filas(historial)] == ['refresco', 'refresco']
+
+
+@pytest.mark.parametrize('personas, entrada', [
+    ([10, 'diez', 30], "Entrada 1: 'diez' no es un número de personas"),
+    ([10, 20, None], 'Entrada 2: None no es un número de personas'),
+    ([2.5], 'Entrada 0: 2.5 no es un número de personas'),
+    ([True], 'Entrada 0: True no es un número de personas'),
+    ([5, 0], 'Entrada 1: número de personas debe ser mayor a 0'),
+])
+@pytest.mark.parametrize('ruta', ['/api/calcular/lote', '/api/calcular/lote/ndjson'])
+def test_lote_con_entrada_no_valida_responde_400(cliente, ruta, personas, entrada):
+    respuesta = cliente.post(ruta, json={'personas': personas})
+    assert respuesta.status_code == 400
+    assert respuesta.get_json()['error'] == entrada
+
+
+def test_lote_por_get_acepta_textos_enteros(cliente):
+    respuesta = cliente.get('/api/calcular/lote/ndjson?personas=3&personas=7')
+    assert respuesta.status_code == 200
+    assert len(respuesta.get_data(as_text=True).splitlines()) > 0
+    assert cliente.get('/api/calcular/lote/ndjson?personas=3&personas=x').status_code == 400
@@ -0,0 +1,51 @@
+"""Pruebas de la caché de bytes con volcado a disco"""
+
+import os
+
+from utils.cache import CacheBytes, digerir_clave
+
+
+def _generador(contenido, llamadas):
+    def generar():
+        llamadas.append(contenido)
+        return contenido
+    return generar
+
+
+def test_expulsa_la_menos_usada_y_la_recupera_de_disco(tmp_path):
+    cache = CacheBytes(10, directorio=str(tmp_path))
+    llamadas = []
+    cache.obtener('a', _generador(b'aaaa', llamadas))
+    cache.obtener('b', _generador(b'bbbb', llamadas))
+    # Usar 'a' la deja como la más reciente: al entrar 'c' sale 'b'
+    cache.obtener('a', _generador(b'aaaa', llamadas))
+    cache.obtener('c', _generador(b'cccc', llamadas))
+
+    assert cache.expulsiones == 1
+    assert cache.bytes_en_memoria == 8
+    assert os.listdir(tmp_path) == [f"{digerir_clave('b')}.bin"]
+
+    contenido, resumen = cache.obtener('b', _generador(b'otro', llamadas))
+    assert contenido == b'bbbb'
+    assert resumen == digerir_clave('b')
+    assert llamadas == [b'aaaa', b'bbbb', b'cccc']
+    assert cache.estadisticas()['aciertos_disco'] == 1
+
+
+def test_sin_directorio_lo_expulsado_se_regenera():
+    cache = CacheBytes(4)
+    llamadas = []
+    cache.obtener('a', _generador(b'aaaa', llamadas))
+    cache.obtener('b', _generador(b'bbbb', llamadas))
+    cache.obtener('a', _generador(b'aaaa', llamadas))
+    assert llamadas == [b'aaaa', b'bbbb', b'aaaa']
+    assert cache.fallos == 3
+
+
+def test_lo_que_no_cabe_en_memoria_solo_va_a_disco(tmp_path):
+    cache = CacheBytes(3, directorio=str(tmp_path))
+    assert cache.guardar('grande', b'0123456789') == digerir_clave('grande')
+    assert cache.bytes_en_memoria == 0
+    assert cache.buscar('grande') == (b'0123456789', digerir_clave('grande'))
+    assert cache.buscar('otra') is None
+    assert cache.fallos == 1
@@ -0,0 +1,66 @@
+"""Pruebas de los validadores y la compresión de las respuestas cacheables"""
+
+import gzip
+
+import pytest
+
+import utils.app as modulo_app
+from utils.cache_http import CODIFICACIONES
+
+RUTA = '/api/productos-disponibles'
+
+
+@pytest.fixture
+def cliente():
+    return modulo_app.app.test_client()
+
+
+def test_sin_compresion_y_304_con_el_mismo_etag(cliente):
+    respuesta = cliente.get(RUTA)
+    assert respuesta.status_code == 200
+    assert 'Content-Encoding' not in respuesta.headers
+    assert 'Accept-Encoding' in respuesta.vary
+    etag = respuesta.headers['ETag']
+
+    condicional = cliente.get(RUTA, headers={'If-None-Match': etag})
+    assert condicional.status_code == 304
+    assert condicional.get_data() == b''
+    assert condicional.headers['ETag'] == etag
+
+    ultima_modificacion = respuesta.headers['Last-Modified']
+    assert cliente.get(RUTA, headers={'If-Modified-Since': ultima_modificacion}).status_code == 304
+    # If-None-Match manda aunque la fecha coincida
+    assert cliente.get(RUTA, headers={
+        'If-None-Match': '"otro"', 'If-Modified-Since': ultima_modificacion
+    }).status_code == 200
+
+
+def test_gzip_tiene_su_propio_etag(cliente):
+    original = cliente.get(RUTA)
+    comprimida = cliente.get(RUTA, headers={'Accept-Encoding': 'gzip'})
+    assert comprimida.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(comprimida.get_data()) == original.get_data()
+    assert comprimida.headers['ETag'] != original.headers['ETag']
+
+    # Cada representación se valida con su ETag
+    etag = comprimida.headers['ETag']
+    condicional = cliente.get(RUTA, headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+    assert condicional.status_code == 304
+    assert condicional.headers['ETag'] == etag
+    assert cliente.get(RUTA, headers={'If-None-Match': original.headers['ETag']}).status_code == 304
+
+
+@pytest.mark.skipif('br' not in CODIFICACIONES, reason='brotli no está instalado')
+def test_brotli_preferido_a_gzip(cliente):
+    import brotli
+
+    original = cliente.get(RUTA)
+    comprimida = cliente.get(RUTA, headers={'Accept-Encoding': 'gzip, br'})
+    assert comprimida.headers['Content-Encoding'] == 'br'
+    assert brotli.decompress(comprimida.get_data()) == original.get_data()
+
+
+def test_cuerpo_pequeno_no_se_comprime(cliente, monkeypatch):
+    monkeypatch.setattr('utils.cache_http.TAMANO_MINIMO_COMPRESION', 10 ** 9)
+    respuesta = cliente.get(RUTA, headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in respuesta.headers
@@ -0,0 +1,34 @@
+"""Pruebas del cálculo por lotes del catálogo"""
+
+import numpy as np
+import pytest
+
+from utils.catalogo import CATALOGO, CatalogoNormas, _redondear
+
+
+def test_escalar_lote_coincide_con_escalar():
+    lista_personas = list(range(1, 5001)) + [9999, 10_001, 123_457, 1_000_000]
+    filas_kg, filas_unidades = CATALOGO.escalar_lote(lista_personas)
+    for personas, fila_kg, fila_unidades in zip(lista_personas, filas_kg, filas_unidades):
+        cantidades_kg, cantidades_unidades = CATALOGO.escalar(personas)
+        assert list(fila_kg) == cantidades_kg, personas
+        assert list(fila_unidades) == cantidades_unidades, personas
+
+
+def test_escalar_lote_en_empates_de_redondeo():
+    # Con 5 g y 25 g por persona muchas cantidades acaban en 5 en el cuarto
+    # decimal: np.round() redondearía al par y round() no
+    catalogo = CatalogoNormas({'a': 5, 'b': 25, 'c': 0.5, 'd': 12.5}, {'e': 0.25, 'f': 0.05, 'g': 2})
+    lista_personas = list(range(1, 20_001))
+    filas_kg, filas_unidades = catalogo.escalar_lote(lista_personas)
+    for personas, fila_kg, fila_unidades in zip(lista_personas, filas_kg, filas_unidades):
+        cantidades_kg, cantidades_unidades = catalogo.escalar(personas)
+        assert list(fila_kg) == cantidades_kg, personas
+        assert list(fila_unidades) == cantidades_unidades, personas
+        assert [type(u) for u in fila_unidades] == [type(u) for u in cantidades_unidades]
+
+
+@pytest.mark.parametrize('decimales', [1, 3])
+def test_redondear_como_round(decimales):
+    valores = [n / 10 ** (decimales + 1) for n in range(0, 200_000, 5)]
+    assert _redondear(np.array(valores), decimales).tolist() == [round(v, decimales) for v in valores]
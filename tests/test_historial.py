@@ -0,0 +1,43 @@
+"""Pruebas del historial de cálculos"""
+
+import pytest
+
+from utils.food_calculator import calcular_cantidades_comida
+from utils.historial import HistorialCalculos, HistorialNoDisponible
+
+
+@pytest.fixture
+def historial(tmp_path):
+    return HistorialCalculos(tmp_path / 'historial.db', intervalo=0.01)
+
+
+def test_registra_y_resume_por_dia(historial):
+    for _ in range(3):
+        historial.registrar('productos', 50, calcular_cantidades_comida(50), evento='boda')
+    assert historial.vaciar(5)
+
+    assert len(historial.calculos()) == 3
+    arroz = historial.totales(productos=['Arroz blanco'], agrupar='evento')
+    assert len(arroz) == 1
+    assert arroz[0]['evento'] == 'boda'
+    assert arroz[0]['calculos'] == 3
+    assert arroz[0]['cantidad'] == round(3 * calcular_cantidades_comida(50)['productos_kg']['Arroz blanco'], 3)
+
+
+def test_base_inaccesible_no_rompe_el_registro(tmp_path):
+    # El directorio padre es un archivo: la base no se puede crear
+    (tmp_path / 'archivo').write_text('')
+    historial = HistorialCalculos(tmp_path / 'archivo' / 'historial.db', intervalo=0.01)
+
+    for _ in range(3):
+        historial.registrar('refresco', 10, 3.0)
+    assert historial.vaciar(5)
+    historial._hilo.join(5)
+
+    historial.registrar('refresco', 10, 3.0)
+    estadisticas = historial.estadisticas()
+    assert estadisticas['disponible'] is False
+    assert estadisticas['descartados'] == 4
+    assert estadisticas['pendientes'] == 0
+    with pytest.raises(HistorialNoDisponible):
+        historial.calculos()
@@ -0,0 +1,66 @@
+"""Pruebas de la forma de los resultados de food_calculator"""
+
+import json
+
+from utils.food_calculator import (
+    calcular_cantidades_comida,
+    calcular_cantidades_lote,
+    documento_personas,
+    documentos_lote,
+    documento_resultados,
+    formatear_resultados,
+    resultados_formateados
+)
+from utils.renderizado import a_json
+
+
+def _lista(resultado):
+    filas = []
+    for producto, cantidad in resultado['productos_kg'].items():
+        filas.append((producto, cantidad, 'kg'))
+    for producto, cantidad in resultado['productos_unidades'].items():
+        filas.append((producto, cantidad, 'unidades'))
+    return filas
+
+
+def test_resultado_es_un_dict_serializable():
+    resultado = calcular_cantidades_comida(50)
+    assert isinstance(resultado, dict)
+    assert json.loads(json.dumps(resultado)) == resultado
+    assert calcular_cantidades_lote([50]) == [resultado]
+
+
+def test_documento_personas_igual_que_desde_el_dict():
+    for personas in (1, 7, 50, 333):
+        assert documento_personas(personas) == documento_resultados(calcular_cantidades_comida(personas))
+
+
+def test_filas_igual_a_la_lista_de_dicts():
+    filas = formatear_resultados(calcular_cantidades_comida(50), 'lista')
+    lista = json.loads(json.dumps(filas, default=a_json))
+
+    assert isinstance(lista, list)
+    assert filas == lista
+    assert lista == filas
+    assert filas == tuple(lista)
+    assert filas == resultados_formateados(50, 'lista')
+    assert filas != lista[:-1]
+    assert filas != formatear_resultados(calcular_cantidades_comida(51), 'lista')
+    assert sorted((fila['producto'], fila['cantidad'], fila['unidad']) for fila in filas) == \
+        sorted(_lista(calcular_cantidades_comida(50)))
+
+
+def test_filas_conservan_los_cambios():
+    filas = formatear_resultados(calcular_cantidades_comida(50), 'lista')
+    filas[0]['cantidad'] = -1
+    assert filas[0]['cantidad'] == -1
+    assert a_json(filas)[0]['cantidad'] == -1
+    assert filas != resultados_formateados(50, 'lista')
+
+
+def test_documentos_lote_con_las_filas_de_cada_documento():
+    lote = [1, 7, 50]
+    documentos = list(documentos_lote(lote, bloque=2))
+    assert [extra for extra, _ in documentos] == [(personas,) for personas in lote]
+    for (personas,), documento in documentos:
+        assert documento.filas == documento_personas(personas).filas
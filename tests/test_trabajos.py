@@ -0,0 +1,29 @@
+"""Pruebas de la cola de exportación"""
+
+from utils import exportacion
+from utils.cache import CacheBytes
+from utils.trabajos import ColaExportacion
+
+
+def test_cola_usa_y_llena_la_cache_de_pdf(monkeypatch):
+    cache = CacheBytes(8 * 1024 * 1024)
+    monkeypatch.setattr(exportacion, 'CACHE_PDF', cache)
+    monkeypatch.setitem(exportacion._CACHES_EXPORTACION, 'pdf', (cache, exportacion._clave_pdf))
+    cola = ColaExportacion(trabajadores=1, usar_procesos=False)
+    try:
+        primero = cola.enviar('pdf', {'personas': 12})
+        primero.futuro.result(timeout=30)
+        assert primero.estado == 'terminado'
+        assert not primero.desde_cache
+
+        # La descarga directa y un segundo trabajo reutilizan lo que renderizó la cola
+        contenido, _ = exportacion.obtener_pdf(12)
+        assert contenido == primero.contenido
+        segundo = cola.enviar('pdf', {'personas': 12})
+        assert segundo.estado == 'terminado'
+        assert segundo.desde_cache
+        assert segundo.futuro is None
+        assert segundo.contenido == primero.contenido
+        assert cache.fallos == 1
+    finally:
+        cola.cerrar()
@@ -5,33 +5,69 @@ Interfaz web para calcular cantidades de comida
 
 import os
 import sys
+import time
 import webbrowser
 import threading
 import io
+from functools import wraps
 from pathlib import Path
-from flask import Flask, render_template, request, jsonify, send_file
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib import colors
-from reportlab.lib.units import inch
-from PIL import Image, ImageDraw, ImageFont
+from flask import Flask, g, render_template, request, jsonify, send_file, stream_with_context
 from utils.food_calculator import (
+    CACHE_FORMATOS,
     calcular_cantidades_comida,
+    calcular_cantidades_lote,
+    calcular_ingredientes_preparacion,
     formatear_resultados,
     obtener_producto_especifico,
+    obtener_productos_especificos,
     listar_productos_disponibles,
-    calcular_ingredientes_preparacion,
+    calcular_preparaciones,
     formatear_ingredientes_preparacion,
     obtener_preparaciones_disponibles,
     calcular_preparacion_especifica,
-    formatear_preparacion_especifica,
-    calcular_refresco
+    calcular_refresco,
+    resultados_formateados,
+    ingredientes_formateados,
+    preparacion_formateada,
+    calcular_menu,
+    formatear_menu,
+    documentos_lote
+)
+from utils.historial import HISTORIAL, MAX_LISTADO, HistorialNoDisponible, leer_filtros
+from utils.renderizado import formatos_disponibles, formatos_flujo_disponibles, renderizar_flujo
+from utils.catalogo import VERSION_CATALOGO
+from utils.proveedor_json import elegir_proveedor
+from utils.cache_http import CACHE_CUERPOS, fecha_modificacion, respuesta_cacheable
+from utils.metricas import CONTENT_TYPE, EN_CURSO, ERRORES, LATENCIA, PETICIONES, REGISTRO
+from utils.trazas import registrar_traza, tramo, trazar
+from utils.servidor import ConfiguracionServidor, crear_servidor, esperar_disponible
+from utils.trabajos import COLA_EXPORTACION, ColaLlena, ColaNoDisponible
+from utils.exportacion import (
+    CACHE_IMAGENES,
+    CACHE_PDF,
+    CALIDAD_IMAGEN,
+    COMPRESION_PNG,
+    FORMATOS_IMAGEN,
+    etag_imagen,
+    etag_pdf,
+    obtener_imagen,
+    obtener_pdf
 )
 
 # Configuración de la aplicación
 app = Flask(__name__)
-app.config['JSON_SORT_KEYS'] = False
+app.json = elegir_proveedor()(app)
+
+# Máximo de entradas aceptadas por /api/calcular/lote y /api/menu
+MAX_LOTE = 100_000
+
+# En flujo la salida no se guarda en memoria, así que el límite es mayor
+MAX_LOTE_FLUJO = int(os.environ.get('FOODCALC_MAX_LOTE_FLUJO', 1_000_000))
+BLOQUE_FLUJO = int(os.environ.get('FOODCALC_BLOQUE_FLUJO', 1000))
+TIPOS_FLUJO = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
 
 # Obtener ruta base para recursos
 if getattr(sys, 'frozen', False):
@@ -39,64 +75,390 @@ if getattr(sys, 'frozen', False):
 else:
     BASE_DIR = Path(__file__).parent
 
+# Políticas de caché HTTP: los listados cambian solo con el catálogo y la
+# página principal se revalida siempre (el 304 es barato)
+CACHE_CONTROL_CATALOGO = f"public, max-age={int(os.environ.get('FOODCALC_MAX_AGE_CATALOGO', 300))}"
+CACHE_CONTROL_PAGINA = 'no-cache'
+# Los cálculos por GET con ?v=<versión del catálogo> no caducan nunca: si el
+# catálogo cambia, cambia la URL
+CACHE_CONTROL_VERSIONADO = 'public, max-age=31536000, immutable'
+FECHA_CATALOGO = fecha_modificacion(BASE_DIR / 'catalogo.py')
+RUTA_PLANTILLA = BASE_DIR / 'templates' / 'index.html'
+
+# Métricas de las cachés y de la cola de exportación, leídas al consultar /metrics
+CACHE_ACIERTOS = REGISTRO.contador('foodcalc_cache_aciertos_total', 'Aciertos de cada caché', ('cache',))
+CACHE_FALLOS = REGISTRO.contador('foodcalc_cache_fallos_total', 'Fallos de cada caché', ('cache',))
+CACHE_RATIO = REGISTRO.indicador('foodcalc_cache_ratio_aciertos', 'Aciertos / (aciertos + fallos) de cada caché', ('cache',))
+CACHE_ENTRADAS = REGISTRO.indicador('foodcalc_cache_entradas', 'Entradas guardadas en cada caché', ('cache',))
+COLA_PENDIENTES = REGISTRO.indicador('foodcalc_exportacion_pendientes', 'Trabajos de exportación en cola o en proceso')
+COLA_RETENIDOS = REGISTRO.indicador('foodcalc_exportacion_retenidos', 'Trabajos de exportación guardados para consulta')
+HISTORIAL_PENDIENTES = REGISTRO.indicador('foodcalc_historial_pendientes', 'Cálculos encolados para el historial sin escribir')
+HISTORIAL_ESCRITOS = REGISTRO.contador('foodcalc_historial_escritos_total', 'Cálculos escritos en el historial')
+HISTORIAL_DESCARTADOS = REGISTRO.contador(
+    'foodcalc_historial_descartados_total',
+    'Cálculos descartados porque la cola del historial estaba llena o la base no se pudo abrir')
+
+
+@REGISTRO.recolector
+def recolectar_caches():
+    """Copia los contadores de las cachés y de la cola de exportación"""
+    caches = {
+        'formatos': CACHE_FORMATOS,
+        'cuerpos_http': CACHE_CUERPOS,
+        'pdf': CACHE_PDF,
+        'imagenes': CACHE_IMAGENES,
+    }
+    # La caché de líneas solo existe si ya se ha cargado el backend de imagen
+    exportar_imagen = sys.modules.get('utils.exportar_imagen')
+    if exportar_imagen is not None:
+        caches['lineas_imagen'] = exportar_imagen.CACHE_LINEAS
+    
+    for nombre, cache in caches.items():
+        estadisticas = cache.estadisticas()
+        aciertos = estadisticas['aciertos'] + estadisticas.get('aciertos_disco', 0)
+        fallos = estadisticas['fallos']
+        CACHE_ACIERTOS.fijar(aciertos, nombre)
+        CACHE_FALLOS.fijar(fallos, nombre)
+        CACHE_RATIO.fijar(round(aciertos / (aciertos + fallos), 4) if aciertos + fallos else 0.0, nombre)
+        CACHE_ENTRADAS.fijar(estadisticas.get('tamano', estadisticas.get('entradas')), nombre)
+    
+    cola = COLA_EXPORTACION.estadisticas()
+    COLA_PENDIENTES.fijar(cola['pendientes'])
+    COLA_RETENIDOS.fijar(cola['retenidos'])
+    
+    if HISTORIAL is not None:
+        historial = HISTORIAL.estadisticas()
+        HISTORIAL_PENDIENTES.fijar(historial['pendientes'])
+        HISTORIAL_ESCRITOS.fijar(historial['escritos'])
+        HISTORIAL_DESCARTADOS.fijar(historial['descartados'])
+
+
+@app.before_request
+def iniciar_medida():
+    """Marca el inicio de la petición para las métricas"""
+    g.inicio_peticion = time.perf_counter()
+    EN_CURSO.sumar()
+
+
+@app.after_request
+def registrar_medida(respuesta):
+    """
+    Cuenta la petición y registra su latencia por ruta, método y estado.
+    
+    En las respuestas en flujo la latencia es la del primer byte.
+    """
+    inicio = g.pop('inicio_peticion', None)
+    if inicio is not None:
+        # La plantilla de la ruta (no la URL) mantiene acotado el número de series
+        ruta = request.url_rule.rule if request.url_rule is not None else 'sin_ruta'
+        estado = str(respuesta.status_code)
+        PETICIONES.incrementar(request.method, ruta, estado)
+        LATENCIA.observar(time.perf_counter() - inicio, request.method, ruta, estado)
+        if respuesta.status_code >= 500:
+            ERRORES.incrementar(request.method, ruta, estado)
+    return respuesta
+
+
+@app.teardown_request
+def terminar_medida(error=None):
+    """Descuenta la petición en curso, también si terminó con una excepción"""
+    EN_CURSO.sumar(cantidad=-1)
+
+
+def no_modificado(etag):
+    """Respuesta 304 para una petición condicional cuyo ETag coincide"""
+    respuesta = app.response_class(status=304)
+    respuesta.set_etag(etag)
+    return respuesta
 
-def abrir_navegador():
-    """Abre el navegador automáticamente después de que el servidor esté listo"""
-    import time
-    time.sleep(2)  # Esperar a que el servidor inicie
-    webbrowser.open('http://localhost:5000')
+
+def datos_peticion():
+    """Parámetros de la petición: cuerpo JSON en POST o query string en GET"""
+    return request.get_json() if request.method == 'POST' else request.args
+
+
+def respuesta_calculo(parametros, generar):
+    """
+    Respuesta de un cálculo: JSON directo en POST y cacheable en GET.
+    
+    En GET la clave de caché usa los parámetros ya normalizados, así que
+    ?personas=010 y ?personas=10 comparten la misma entrada.
+    
+    Args:
+        parametros (dict): Parámetros canónicos del cálculo, en orden fijo
+        generar (callable): Función sin argumentos que produce el dict de respuesta
+    """
+    if request.method == 'POST':
+        return jsonify(generar())
+    
+    version = request.args.get('v')
+    if version == VERSION_CATALOGO:
+        cache_control = CACHE_CONTROL_VERSIONADO
+    elif version is None:
+        cache_control = CACHE_CONTROL_CATALOGO
+    else:
+        # URL de un catálogo anterior: se sirve el actual pero sin guardarlo
+        cache_control = 'no-cache'
+    
+    return respuesta_cacheable(
+        (request.path, tuple(parametros.items()), VERSION_CATALOGO, app.json.nombre),
+        lambda: jsonify(generar()).get_data(),
+        'application/json',
+        FECHA_CATALOGO,
+        cache_control
+    )
+
+
+def registrar_historial(tipo, personas, resultado, data, parametros=None):
+    """
+    Guarda un cálculo en el historial, si está activo, sin esperar a la escritura.
+    
+    Se registra también cuando la respuesta sale de la caché HTTP del
+    servidor o es un 304: cada petición que llega es un pedido. Un GET que
+    el navegador o un proxy sirve desde su caché no llega y no se cuenta;
+    por eso la interfaz pide con cache: 'no-cache' los cálculos que registra. El evento opcional llega en el parámetro 'evento'.
+    Con historial=0 la petición no se registra: la usa la interfaz para
+    pedir otra presentación de un cálculo que ya registró (/api/formato
+    después de /api/calcular), de modo que cada acción cuenta una vez.
+    """
+    if str(data.get('historial', '1')).lower() in ('0', 'false'):
+        return
+    if HISTORIAL is not None:
+        HISTORIAL.registrar(tipo, personas, resultado, evento=data.get('evento'), parametros=parametros)
+
+
+def parametros_imagen(data):
+    """
+    Lee y valida las opciones de exportación de imagen de una petición.
+    
+    Raises:
+        ValueError: Si el formato, la compresión o la calidad no son válidos
+    """
+    formato = data.get('formato_imagen', 'png')
+    compresion = int(data.get('compresion', COMPRESION_PNG))
+    calidad = int(data.get('calidad', CALIDAD_IMAGEN))
+    
+    if formato not in FORMATOS_IMAGEN:
+        raise ValueError('Formato de imagen no válido')
+    
+    if not 0 <= compresion <= 9 or not 1 <= calidad <= 100:
+        raise ValueError('Compresión o calidad fuera de rango')
+    
+    return {'formato': formato, 'compresion': compresion, 'calidad': calidad}
+
+
+def leer_lote_personas(lista_personas, maximo):
+    """
+    Lee y valida la lista de números de personas de un lote.
+    
+    Args:
+        lista_personas (list): Enteros, o textos con enteros si llegan por GET
+        maximo (int): Máximo de entradas aceptadas
+        
+    Returns:
+        list: Números de personas como enteros
+        
+    Raises:
+        ValueError: Si la lista está vacía o es demasiado larga, o si alguna
+            entrada no es un número entero mayor a 0
+    """
+    if not isinstance(lista_personas, list) or not lista_personas:
+        raise ValueError('Debe indicar una lista de números de personas')
+    
+    if len(lista_personas) > maximo:
+        raise ValueError(f'El lote no puede tener más de {maximo} entradas')
+    
+    resultado = []
+    for posicion, valor in enumerate(lista_personas):
+        # bool es subclase de int y un float se truncaría: ninguno es válido
+        try:
+            if isinstance(valor, bool) or not isinstance(valor, (int, str)):
+                raise ValueError
+            personas = int(valor)
+        except ValueError:
+            raise ValueError(f'Entrada {posicion}: {valor!r} no es un número de personas') from None
+        if personas < 1:
+            raise ValueError(f'Entrada {posicion}: número de personas debe ser mayor a 0')
+        resultado.append(personas)
+    return resultado
+
+
+def con_traza(vista):
+    """
+    Traza por fases de una ruta de exportación.
+    
+    Si la petición sale en el muestreo, la respuesta lleva la cabecera
+    Server-Timing con la duración de cada fase y la traza se escribe en el
+    registro de trazas. Una descarga servida desde caché no tiene el tramo 'render'.
+    """
+    @wraps(vista)
+    def envoltura(*args, **kwargs):
+        with trazar() as traza:
+            if traza is None:
+                return vista(*args, **kwargs)
+            with tramo('vista'):
+                respuesta = app.make_response(vista(*args, **kwargs))
+            traza.agregar('total', traza.total_ms())
+            respuesta.headers['Server-Timing'] = traza.server_timing()
+            if request.method == 'POST':
+                parametros = request.get_json(silent=True) or {}
+            else:
+                parametros = request.args.to_dict()
+            registrar_traza(
+                traza,
+                ruta=request.path,
+                metodo=request.method,
+                estado=respuesta.status_code,
+                parametros=parametros
+            )
+            return respuesta
+    return envoltura
+
+
+def abrir_navegador(host='localhost', puerto=5000):
+    """Abre el navegador automáticamente en cuanto el servidor responde"""
+    if esperar_disponible(host, puerto):
+        webbrowser.open(f'http://{host}:{puerto}')
 
 
 @app.route('/')
 def index():
     """Página principal"""
-    return render_template('index.html')
-
-
-@app.route('/api/calcular', methods=['POST'])
+    fecha = fecha_modificacion(RUTA_PLANTILLA)
+    return respuesta_cacheable(
+        ('index.html', fecha.timestamp(), VERSION_CATALOGO),
+        lambda: render_template('index.html', version_catalogo=VERSION_CATALOGO).encode('utf-8'),
+        'text/html',
+        fecha,
+        CACHE_CONTROL_PAGINA
+    )
+
+
+@app.route('/api/salud', methods=['GET'])
+def salud():
+    """API de salud: responde en cuanto el servidor puede atender peticiones"""
+    return jsonify({
+        'success': True,
+        'estado': 'ok',
+        'version_catalogo': VERSION_CATALOGO
+    })
+
+
+@app.route('/api/calcular', methods=['GET', 'POST'])
 def calcular():
     """API para calcular cantidades de comida"""
     try:
-        data = request.get_json()
+        data = datos_peticion()
         personas = int(data.get('personas', 1))
         
         if personas < 1:
             return jsonify({'error': 'Número de personas debe ser mayor a 0'}), 400
         
         resultado = calcular_cantidades_comida(personas)
+        registrar_historial('productos', personas, resultado, data, {'personas': personas})
+        
+        def generar():
+            return {
+                'success': True,
+                'personas': personas,
+                'productos_kg': resultado['productos_kg'],
+                'productos_unidades': resultado['productos_unidades']
+            }
+        
+        return respuesta_calculo({'personas': personas}, generar)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/calcular/lote', methods=['POST'])
+def calcular_lote():
+    """API para calcular cantidades de comida para muchas cantidades de personas"""
+    try:
+        data = request.get_json()
+        
+        try:
+            lista_personas = leer_lote_personas(data.get('personas', []), MAX_LOTE)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        resultados = calcular_cantidades_lote(lista_personas)
         
         return jsonify({
             'success': True,
-            'personas': personas,
-            'productos_kg': resultado['productos_kg'],
-            'productos_unidades': resultado['productos_unidades']
+            'total': len(resultados),
+            'resultados': [
+                {
+                    'personas': resultado['total_personas'],
+                    'productos_kg': resultado['productos_kg'],
+                    'productos_unidades': resultado['productos_unidades']
+                }
+                for resultado in resultados
+            ]
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/api/formato/<formato_tipo>', methods=['POST'])
+@app.route('/api/calcular/lote/<formato_flujo>', methods=['GET', 'POST'])
+def calcular_lote_flujo(formato_flujo):
+    """API para calcular un lote grande y recibirlo fila a fila en NDJSON o CSV"""
+    try:
+        if request.method == 'POST':
+            data = request.get_json()
+            lista_personas = data.get('personas', [])
+            tipo = data.get('tipo', 'productos')
+        else:
+            lista_personas = request.args.getlist('personas')
+            tipo = request.args.get('tipo', 'productos')
+        
+        if formato_flujo not in formatos_flujo_disponibles():
+            return jsonify({'error': 'Formato no válido'}), 400
+        
+        if tipo not in ('productos', 'ingredientes'):
+            return jsonify({'error': 'Tipo no válido'}), 400
+        
+        try:
+            lista_personas = leer_lote_personas(lista_personas, MAX_LOTE_FLUJO)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        trozos = renderizar_flujo(
+            documentos_lote(lista_personas, tipo, BLOQUE_FLUJO),
+            formato_flujo,
+            columnas_extra=('personas',)
+        )
+        
+        return app.response_class(
+            stream_with_context(trozo.encode('utf-8') for trozo in trozos),
+            mimetype=TIPOS_FLUJO.get(formato_flujo, 'text/plain'),
+            headers={'Content-Disposition': f'attachment; filename=food-calculator-lote.{formato_flujo}'}
+        )
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/formato/<formato_tipo>', methods=['GET', 'POST'])
 def obtener_formato(formato_tipo):
     """API para obtener resultados en diferentes formatos"""
     try:
-        data = request.get_json()
+        data = datos_peticion()
         personas = int(data.get('personas', 1))
         
-        resultado = calcular_cantidades_comida(personas)
-        
-        if formato_tipo == 'texto':
-            contenido = formatear_resultados(resultado, formato='texto')
-        elif formato_tipo == 'markdown':
-            contenido = formatear_resultados(resultado, formato='markdown')
-        elif formato_tipo == 'lista':
-            contenido = formatear_resultados(resultado, formato='lista')
-        else:
+        if formato_tipo not in formatos_disponibles():
             return jsonify({'error': 'Formato no válido'}), 400
         
-        return jsonify({
-            'success': True,
-            'contenido': contenido
+        registrar_historial('productos', personas, calcular_cantidades_comida(personas), data, {
+            'personas': personas,
+            'formato': formato_tipo
         })
+        
+        def generar():
+            return {
+                'success': True,
+                'contenido': resultados_formateados(personas, formato=formato_tipo)
+            }
+        
+        return respuesta_calculo({'personas': personas}, generar)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -108,6 +470,20 @@ def obtener_producto():
         data = request.get_json()
         personas = int(data.get('personas', 1))
         producto = data.get('producto', '')
+        productos = data.get('productos')
+        
+        if productos is not None:
+            if not isinstance(productos, list) or not productos:
+                return jsonify({'error': 'Productos no especificados'}), 400
+            
+            resultados = obtener_productos_especificos(personas, productos)
+            return jsonify({
+                'success': True,
+                'datos': [resultado for resultado in resultados if resultado],
+                'no_encontrados': [
+                    nombre for nombre, resultado in zip(productos, resultados) if not resultado
+                ]
+            })
         
         if not producto:
             return jsonify({'error': 'Producto no especificado'}), 400
@@ -126,32 +502,69 @@ def obtener_producto():
 def productos_disponibles():
     """API para listar todos los productos disponibles"""
     try:
-        productos = listar_productos_disponibles()
-        return jsonify({
-            'success': True,
-            'productos': productos,
-            'total': len(productos)
-        })
+        def generar():
+            productos = listar_productos_disponibles()
+            return jsonify({
+                'success': True,
+                'productos': productos,
+                'total': len(productos)
+            }).get_data()
+        
+        return respuesta_cacheable(
+            (request.path, VERSION_CATALOGO, app.json.nombre),
+            generar,
+            'application/json',
+            FECHA_CATALOGO,
+            CACHE_CONTROL_CATALOGO
+        )
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/api/ingredientes', methods=['POST'])
+@app.route('/api/ingredientes', methods=['GET', 'POST'])
 def obtener_ingredientes():
     """API para calcular ingredientes de preparaciones"""
     try:
-        data = request.get_json()
+        data = datos_peticion()
         personas = int(data.get('personas', 1))
         formato = data.get('formato', 'texto')
+        if request.method == 'GET':
+            # En GET las preparaciones se repiten: ?preparaciones=A&preparaciones=B
+            preparaciones = request.args.getlist('preparaciones') or None
+        else:
+            preparaciones = data.get('preparaciones')
         
-        ingredientes = calcular_ingredientes_preparacion(personas)
-        contenido = formatear_ingredientes_preparacion(ingredientes, formato=formato)
+        if preparaciones is not None and not isinstance(preparaciones, list):
+            return jsonify({'error': 'Las preparaciones deben ser una lista'}), 400
         
-        return jsonify({
-            'success': True,
+        if preparaciones is not None:
+            ingredientes = calcular_preparaciones(personas, preparaciones)
+            registrar_historial('preparaciones', personas, ingredientes, data, {
+                'personas': personas,
+                'preparaciones': preparaciones
+            })
+        else:
+            # Sin lista se calculan todas las preparaciones, y así se registra
+            registrar_historial('preparaciones', personas, calcular_ingredientes_preparacion(personas), data, {
+                'personas': personas
+            })
+        
+        def generar():
+            if preparaciones is None:
+                contenido = ingredientes_formateados(personas, formato=formato)
+            else:
+                contenido = formatear_ingredientes_preparacion(ingredientes, formato=formato)
+            return {
+                'success': True,
+                'personas': personas,
+                'contenido': contenido
+            }
+        
+        return respuesta_calculo({
             'personas': personas,
-            'contenido': contenido
-        })
+            'formato': formato,
+            'preparaciones': tuple(preparaciones) if preparaciones is not None else None
+        }, generar)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -160,21 +573,30 @@ def obtener_ingredientes():
 def preparaciones_disponibles():
     """API para listar todas las preparaciones disponibles"""
     try:
-        preparaciones = obtener_preparaciones_disponibles()
-        return jsonify({
-            'success': True,
-            'preparaciones': preparaciones,
-            'total': len(preparaciones)
-        })
+        def generar():
+            preparaciones = obtener_preparaciones_disponibles()
+            return jsonify({
+                'success': True,
+                'preparaciones': preparaciones,
+                'total': len(preparaciones)
+            }).get_data()
+        
+        return respuesta_cacheable(
+            (request.path, VERSION_CATALOGO, app.json.nombre),
+            generar,
+            'application/json',
+            FECHA_CATALOGO,
+            CACHE_CONTROL_CATALOGO
+        )
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/api/preparacion', methods=['POST'])
+@app.route('/api/preparacion', methods=['GET', 'POST'])
 def obtener_preparacion():
     """API para calcular una preparación específica"""
     try:
-        data = request.get_json()
+        data = datos_peticion()
         personas = int(data.get('personas', 1))
         preparacion = data.get('preparacion', '')
         formato = data.get('formato', 'texto')
@@ -185,191 +607,305 @@ def obtener_preparacion():
         resultado = calcular_preparacion_especifica(personas, preparacion)
         
         if resultado:
-            contenido = formatear_preparacion_especifica(resultado, formato=formato)
-            return jsonify({
-                'success': True,
-                'preparacion': resultado['preparacion'],
-                'personas': resultado['personas'],
-                'ingredientes': resultado['ingredientes'],
-                'contenido': contenido
+            registrar_historial('preparacion', personas, resultado, data, {
+                'personas': personas,
+                'preparacion': preparacion
             })
+            
+            def generar():
+                return {
+                    'success': True,
+                    'preparacion': resultado['preparacion'],
+                    'personas': resultado['personas'],
+                    'ingredientes': resultado['ingredientes'],
+                    'contenido': preparacion_formateada(personas, preparacion, formato=formato)
+                }
+            
+            return respuesta_calculo({
+                'personas': personas,
+                'preparacion': preparacion,
+                'formato': formato
+            }, generar)
         else:
             return jsonify({'error': 'Preparación no encontrada'}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/api/refresco', methods=['POST'])
+@app.route('/api/menu', methods=['POST'])
+def obtener_menu():
+    """API para calcular la lista de compra consolidada de un menú"""
+    try:
+        data = request.get_json()
+        datos_entradas = data.get('entradas', [])
+        unidades = data.get('unidades') or {}
+        formato = data.get('formato')
+        
+        if isinstance(datos_entradas, list) and len(datos_entradas) > MAX_LOTE:
+            return jsonify({'error': f'El menú no puede tener más de {MAX_LOTE} entradas'}), 400
+        
+        if not isinstance(unidades, dict):
+            return jsonify({'error': 'Las unidades deben ser un objeto ingrediente -> unidad'}), 400
+        
+        # utils.menu compila la matriz del recetario: se importa en el primer menú
+        from utils.menu import leer_entradas
+
+        try:
+            entradas = leer_entradas(datos_entradas)
+            menu = calcular_menu(entradas, unidades)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # El menú cuenta como un cálculo para el mayor número de comensales de sus entradas
+        registrar_historial('menu', max(entrada.personas for entrada in entradas), menu, data, {
+            'entradas': datos_entradas
+        })
+        
+        respuesta = {'success': True, **menu}
+        if formato is not None:
+            if formato not in formatos_disponibles():
+                return jsonify({'error': 'Formato no válido'}), 400
+            respuesta['contenido'] = formatear_menu(menu, formato=formato)
+        
+        return jsonify(respuesta)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/refresco', methods=['GET', 'POST'])
 def obtener_refresco():
     """API para calcular cantidad de refresco"""
     try:
-        data = request.get_json()
+        data = datos_peticion()
         personas = int(data.get('personas', 1))
         
         if personas < 1:
             return jsonify({'error': 'Número de personas debe ser mayor a 0'}), 400
         
-        litros = calcular_refresco(personas)
+        refresco_litros = calcular_refresco(personas)
+        registrar_historial('refresco', personas, refresco_litros, data, {'personas': personas})
         
-        return jsonify({
-            'success': True,
-            'personas': personas,
-            'refresco_litros': litros,
-            'refresco_onzas': personas * 8
-        })
+        def generar():
+            return {
+                'success': True,
+                'personas': personas,
+                'refresco_litros': refresco_litros,
+                'refresco_onzas': personas * 8
+            }
+        
+        return respuesta_calculo({'personas': personas}, generar)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/api/descargar/pdf', methods=['POST'])
+@app.route('/api/descargar/pdf', methods=['GET', 'POST'])
+@con_traza
 def descargar_pdf():
     """API para descargar resultados en PDF"""
     try:
-        data = request.get_json()
+        data = datos_peticion()
         personas = int(data.get('personas', 1))
         
-        resultado = calcular_cantidades_comida(personas)
-        contenido_texto = formatear_resultados(resultado, formato='texto')
-        
-        # Crear PDF
-        pdf_buffer = io.BytesIO()
-        doc = SimpleDocTemplate(pdf_buffer, pagesize=letter)
-        story = []
-        
-        styles = getSampleStyleSheet()
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=24,
-            textColor=colors.HexColor('#1e40af'),
-            spaceAfter=30,
-            alignment=1
-        )
+        # El ETag depende solo de la entrada: una descarga repetida no genera nada
+        etag = etag_pdf(personas)
+        if request.if_none_match.contains(etag):
+            return no_modificado(etag)
         
-        # Título
-        story.append(Paragraph(f"🍳 Food Calculator - {personas} personas", title_style))
-        story.append(Spacer(1, 0.3*inch))
-        
-        # Productos en kg
-        productos_kg = resultado['productos_kg']
-        if productos_kg:
-            story.append(Paragraph("Productos en Kilogramos", styles['Heading2']))
-            story.append(Spacer(1, 0.2*inch))
-            
-            data_table = [['Producto', 'Cantidad (kg)']]
-            for producto, cantidad in sorted(productos_kg.items()):
-                data_table.append([producto, f'{cantidad}'])
-            
-            table = Table(data_table, colWidths=[4*inch, 1.5*inch])
-            table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3b82f6')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 12),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black)
-            ]))
-            story.append(table)
-            story.append(Spacer(1, 0.3*inch))
-        
-        # Productos por unidades
-        productos_unidades = resultado['productos_unidades']
-        if productos_unidades:
-            story.append(Paragraph("Productos por Unidades", styles['Heading2']))
-            story.append(Spacer(1, 0.2*inch))
-            
-            data_table = [['Producto', 'Cantidad (unidades)']]
-            for producto, cantidad in sorted(productos_unidades.items()):
-                data_table.append([producto, f'{cantidad}'])
-            
-            table = Table(data_table, colWidths=[4*inch, 1.5*inch])
-            table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#10b981')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 12),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.lightgrey),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black)
-            ]))
-            story.append(table)
-        
-        doc.build(story)
-        pdf_buffer.seek(0)
+        contenido, etag = obtener_pdf(personas)
         
         return send_file(
-            pdf_buffer,
+            io.BytesIO(contenido),
             mimetype='application/pdf',
             as_attachment=True,
-            download_name=f'food-calculator-{personas}-personas.pdf'
+            download_name=f'food-calculator-{personas}-personas.pdf',
+            etag=etag
         )
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/api/descargar/imagen', methods=['POST'])
+@app.route('/api/descargar/imagen', methods=['GET', 'POST'])
+@con_traza
 def descargar_imagen():
     """API para descargar resultados como imagen"""
+    try:
+        data = datos_peticion()
+        personas = int(data.get('personas', 1))
+        try:
+            parametros = parametros_imagen(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        formato, compresion, calidad = parametros['formato'], parametros['compresion'], parametros['calidad']
+        
+        etag = etag_imagen(personas, formato, compresion, calidad)
+        if request.if_none_match.contains(etag):
+            return no_modificado(etag)
+        
+        contenido, etag = obtener_imagen(personas, formato, compresion, calidad)
+        _, mimetype = FORMATOS_IMAGEN[formato]
+        
+        return send_file(
+            io.BytesIO(contenido),
+            mimetype=mimetype,
+            as_attachment=True,
+            download_name=f'food-calculator-{personas}-personas.{formato}',
+            etag=etag
+        )
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/exportar', methods=['POST'])
+def crear_exportacion():
+    """API para encolar una exportación a PDF o imagen en segundo plano"""
     try:
         data = request.get_json()
         personas = int(data.get('personas', 1))
+        tipo = data.get('tipo', 'pdf')
         
-        resultado = calcular_cantidades_comida(personas)
-        contenido_texto = formatear_resultados(resultado, formato='texto')
+        if personas < 1:
+            return jsonify({'error': 'Número de personas debe ser mayor a 0'}), 400
+        
+        if tipo == 'pdf':
+            parametros = {'personas': personas}
+        elif tipo == 'imagen':
+            try:
+                parametros = {'personas': personas, **parametros_imagen(data)}
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+        else:
+            return jsonify({'error': 'Tipo de exportación no válido'}), 400
+        
+        try:
+            trabajo = COLA_EXPORTACION.enviar(tipo, parametros)
+        except (ColaLlena, ColaNoDisponible) as e:
+            return jsonify({'error': str(e)}), 503
+        
+        return jsonify({
+            'success': True,
+            'trabajo': trabajo.resumen()
+        }), 202
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/exportar/<trabajo_id>', methods=['GET'])
+def estado_exportacion(trabajo_id):
+    """API para consultar el estado de una exportación en segundo plano"""
+    trabajo = COLA_EXPORTACION.obtener(trabajo_id)
+    
+    if trabajo is None:
+        return jsonify({'error': 'Trabajo no encontrado'}), 404
+    
+    return jsonify({
+        'success': True,
+        'trabajo': trabajo.resumen()
+    })
+
+
+@app.route('/api/exportar/<trabajo_id>/descarga', methods=['GET'])
+def descargar_exportacion(trabajo_id):
+    """API para descargar el resultado de una exportación en segundo plano"""
+    trabajo = COLA_EXPORTACION.obtener(trabajo_id)
+    
+    if trabajo is None:
+        return jsonify({'error': 'Trabajo no encontrado'}), 404
+    
+    if trabajo.estado == 'error':
+        return jsonify({'error': trabajo.error}), 500
+    
+    if trabajo.estado != 'terminado':
+        return jsonify({'error': 'El trabajo todavía no ha terminado', 'trabajo': trabajo.resumen()}), 409
+    
+    personas = trabajo.parametros['personas']
+    if trabajo.tipo == 'pdf':
+        mimetype, extension = 'application/pdf', 'pdf'
+    else:
+        extension = trabajo.parametros['formato']
+        _, mimetype = FORMATOS_IMAGEN[extension]
+    
+    return send_file(
+        io.BytesIO(trabajo.contenido),
+        mimetype=mimetype,
+        as_attachment=True,
+        download_name=f'food-calculator-{personas}-personas.{extension}'
+    )
+
+
+@app.route('/api/historial', methods=['GET'])
+def historial():
+    """
+    API para consultar los cálculos guardados en el historial.
+    
+    Filtros por query string: desde, hasta (AAAA-MM-DD), tipo, evento,
+    personas_min, personas_max y producto (repetible); limite (100 por defecto).
+    
+    Se cuentan las peticiones que llegan al servidor, también las que
+    responden 304. Los GET versionados son inmutables: un cliente que los
+    sirve de su propia caché sin revalidar no queda registrado. La interfaz
+    web siempre revalida, así que cada acción suya cuenta una vez.
+    """
+    try:
+        if HISTORIAL is None:
+            return jsonify({'error': 'El historial está desactivado'}), 503
         
-        # Crear imagen
-        # Dimensiones base
-        width = 1200
-        height = 100  # Base
-        line_height = 30
+        try:
+            filtros = leer_filtros(request.args)
+            limite = int(request.args.get('limite', 100))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        # Contar líneas
-        lineas = contenido_texto.split('\n')
-        height += len(lineas) * line_height + 100
+        if not 1 <= limite <= MAX_LISTADO:
+            return jsonify({'error': f'El límite debe estar entre 1 y {MAX_LISTADO}'}), 400
         
-        # Crear imagen
-        img = Image.new('RGB', (width, height), color='white')
-        draw = ImageDraw.Draw(img)
+        calculos = HISTORIAL.calculos(limite=limite, **filtros)
+        return jsonify({
+            'success': True,
+            'calculos': calculos,
+            'total': len(calculos)
+        })
+    except HistorialNoDisponible as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/historial/totales', methods=['GET'])
+def historial_totales():
+    """
+    API para sumar las cantidades del historial, p. ej. el arroz de todos
+    los eventos del mes pasado: ?producto=Arroz&desde=2026-09-01&hasta=2026-09-30
+    
+    Acepta los mismos filtros que /api/historial y agrupar=dia|mes|evento|tipo.
+    Los totales cuentan los mismos cálculos que /api/historial (ver allí).
+    """
+    try:
+        if HISTORIAL is None:
+            return jsonify({'error': 'El historial está desactivado'}), 503
         
-        # Intentar usar font, si no, usar default
         try:
-            titulo_font = ImageFont.truetype("arial.ttf", 32)
-            texto_font = ImageFont.truetype("arial.ttf", 20)
-        except:
-            titulo_font = ImageFont.load_default()
-            texto_font = ImageFont.load_default()
-        
-        y_position = 30
-        
-        # Título
-        draw.text((50, y_position), f"🍳 Food Calculator - {personas} personas", 
-                 fill='#1e40af', font=titulo_font)
-        y_position += 60
-        
-        # Contenido
-        for linea in lineas:
-            if linea.strip():
-                draw.text((50, y_position), linea, fill='black', font=texto_font)
-            y_position += line_height
-        
-        # Guardar en buffer
-        img_buffer = io.BytesIO()
-        img.save(img_buffer, format='PNG')
-        img_buffer.seek(0)
+            filtros = leer_filtros(request.args)
+            totales = HISTORIAL.totales(agrupar=request.args.get('agrupar') or None, **filtros)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        return send_file(
-            img_buffer,
-            mimetype='image/png',
-            as_attachment=True,
-            download_name=f'food-calculator-{personas}-personas.png'
-        )
+        return jsonify({
+            'success': True,
+            'totales': totales,
+            'total': len(totales)
+        })
+    except HistorialNoDisponible as e:
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/metrics', methods=['GET'])
+def metricas():
+    """Métricas del proceso en el formato de texto de Prometheus"""
+    return app.response_class(REGISTRO.exponer(), content_type=CONTENT_TYPE)
+
+
 @app.errorhandler(404)
 def no_encontrado(error):
     """Manejar errores 404"""
@@ -384,11 +920,18 @@ def error_servidor(error):
 
 def main():
     """Función principal"""
+    configuracion = ConfiguracionServidor.desde_entorno()
+    servidor = crear_servidor(app, configuracion)
+    
     # Abrir navegador en un hilo separado
-    thread = threading.Thread(target=abrir_navegador, daemon=True)
+    thread = threading.Thread(
+        target=abrir_navegador,
+        args=(configuracion.host, configuracion.puerto),
+        daemon=True
+    )
     thread.start()
     
-    # Iniciar servidor Flask
-    print("🍳 Food Calculator iniciado")
-    print("🌐 Abriendo navegador en http://localhost:5000...")
-    app.run(debug=False, host='localhost', port=5000)
+    # Iniciar servidor
+    print(f"🍳 Food Calculator iniciado (modo {servidor.nombre}, {servidor.trabajadores} trabajadores)")
+    print(f"🌐 Abriendo navegador en http://{configuracion.host}:{configuracion.puerto}...")
+    servidor.ejecutar()
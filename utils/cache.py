@@ -0,0 +1,295 @@
+"""
+Cachés LRU acotadas y seguras entre hilos para resultados ya formateados
+y para documentos generados (PDF, imágenes).
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+
+class DiccionarioCongelado(dict):
+    """Diccionario de solo lectura que se serializa a JSON como un dict normal"""
+
+    __slots__ = ()
+
+    def _solo_lectura(self, *args, **kwargs):
+        raise TypeError('Los resultados en caché no se pueden modificar')
+
+    __setitem__ = __delitem__ = __ior__ = _solo_lectura
+    clear = pop = popitem = setdefault = update = _solo_lectura
+
+
+def congelar(valor):
+    """
+    Convierte un resultado en una versión inmutable apta para la caché.
+
+    Las listas pasan a tuplas y los diccionarios a DiccionarioCongelado,
+    de forma recursiva. Los textos y números ya son inmutables.
+    """
+    if isinstance(valor, list):
+        return tuple(congelar(elemento) for elemento in valor)
+    if isinstance(valor, dict):
+        return DiccionarioCongelado((clave, congelar(v)) for clave, v in valor.items())
+    return valor
+
+
+class CacheLRU:
+    """
+    Caché LRU con tamaño máximo configurable y contadores de uso.
+
+    Todos los accesos se serializan con un lock, así que una misma instancia
+    se puede compartir entre los hilos del servidor.
+    """
+
+    def __init__(self, tamano_maximo=256):
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+        self.tamano_maximo = max(0, int(tamano_maximo))
+        self.aciertos = 0
+        self.fallos = 0
+        self.expulsiones = 0
+
+    def obtener(self, clave, calcular):
+        """
+        Devuelve el valor guardado para la clave o lo calcula y lo guarda.
+
+        Args:
+            clave (tuple): Clave hashable, p. ej. (función, personas, formato)
+            calcular (callable): Función sin argumentos que produce el valor
+
+        Returns:
+            Valor congelado (ver congelar())
+        """
+        with self._lock:
+            if clave in self._datos:
+                self._datos.move_to_end(clave)
+                self.aciertos += 1
+                return self._datos[clave]
+            self.fallos += 1
+
+        # El cálculo se hace fuera del lock para no bloquear a otros hilos
+        valor = congelar(calcular())
+
+        with self._lock:
+            if self.tamano_maximo:
+                self._datos[clave] = valor
+                self._datos.move_to_end(clave)
+                self._recortar()
+        return valor
+
+    def redimensionar(self, tamano_maximo):
+        """Cambia el tamaño máximo y expulsa las entradas sobrantes"""
+        with self._lock:
+            self.tamano_maximo = max(0, int(tamano_maximo))
+            self._recortar()
+
+    def limpiar(self):
+        """Vacía la caché y reinicia los contadores"""
+        with self._lock:
+            self._datos.clear()
+            self.aciertos = self.fallos = self.expulsiones = 0
+
+    def estadisticas(self):
+        """
+        Devuelve los contadores de uso de la caché.
+
+        Returns:
+            dict: tamaño, tamaño máximo, aciertos, fallos y expulsiones
+        """
+        with self._lock:
+            return {
+                'tamano': len(self._datos),
+                'tamano_maximo': self.tamano_maximo,
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'expulsiones': self.expulsiones,
+            }
+
+    def __len__(self):
+        return len(self._datos)
+
+    def _recortar(self):
+        while len(self._datos) > self.tamano_maximo:
+            self._datos.popitem(last=False)
+            self.expulsiones += 1
+
+
+def digerir_clave(clave):
+    """
+    Calcula el resumen SHA-256 de una clave de caché.
+
+    Args:
+        clave (tuple): Clave con valores simples (números, textos)
+
+    Returns:
+        str: Resumen hexadecimal, estable entre procesos
+    """
+    return hashlib.sha256(repr(clave).encode('utf-8')).hexdigest()
+
+
+class CacheBytes:
+    """
+    Caché LRU de bytes con límite de memoria y volcado opcional a disco.
+
+    Las entradas se direccionan por el resumen de su clave. Cuando se supera
+    la capacidad, las entradas menos usadas salen de memoria y, si hay un
+    directorio configurado, se guardan allí para recuperarlas más tarde.
+    """
+
+    def __init__(self, capacidad_bytes, directorio=None):
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+        self.capacidad_bytes = max(0, int(capacidad_bytes))
+        self.directorio = directorio
+        self.bytes_en_memoria = 0
+        self.aciertos = 0
+        self.aciertos_disco = 0
+        self.fallos = 0
+        self.expulsiones = 0
+
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+
+    def obtener(self, clave, generar):
+        """
+        Devuelve los bytes guardados para la clave o los genera y los guarda.
+
+        Args:
+            clave (tuple): Clave hashable, p. ej. (personas, versión catálogo, versión plantilla)
+            generar (callable): Función sin argumentos que produce los bytes
+
+        Returns:
+            tuple: (contenido, resumen) donde resumen identifica la clave
+        """
+        encontrado = self.buscar(clave)
+        if encontrado is not None:
+            return encontrado
+
+        # La generación se hace fuera del lock para no bloquear a otros hilos
+        contenido = bytes(generar())
+        return contenido, self.guardar(clave, contenido)
+
+    def buscar(self, clave):
+        """
+        Busca la clave en memoria y después en disco, sin generar nada.
+
+        Un fallo cuenta igual que en obtener(): quien busca es porque va a
+        generar el contenido (p. ej. en otro proceso) y guardarlo con guardar().
+
+        Returns:
+            tuple: (contenido, resumen) o None si no está
+        """
+        resumen = digerir_clave(clave)
+
+        with self._lock:
+            contenido = self._datos.get(resumen)
+            if contenido is not None:
+                self._datos.move_to_end(resumen)
+                self.aciertos += 1
+                return contenido, resumen
+
+        contenido = self._leer_disco(resumen)
+        if contenido is not None:
+            with self._lock:
+                self.aciertos_disco += 1
+                volcar = self._guardar(resumen, contenido)
+            self._volcar(volcar)
+            return contenido, resumen
+
+        with self._lock:
+            self.fallos += 1
+        return None
+
+    def guardar(self, clave, contenido):
+        """
+        Guarda bytes ya generados para la clave.
+
+        Returns:
+            str: Resumen que identifica la clave
+        """
+        resumen = digerir_clave(clave)
+        with self._lock:
+            volcar = self._guardar(resumen, bytes(contenido))
+        self._volcar(volcar)
+        return resumen
+
+    def limpiar(self):
+        """Vacía la memoria (no el directorio de disco) y reinicia los contadores"""
+        with self._lock:
+            self._datos.clear()
+            self.bytes_en_memoria = 0
+            self.aciertos = self.aciertos_disco = self.fallos = self.expulsiones = 0
+
+    def estadisticas(self):
+        """
+        Devuelve los contadores de uso de la caché.
+
+        Returns:
+            dict: entradas, bytes en memoria, capacidad y contadores
+        """
+        with self._lock:
+            return {
+                'entradas': len(self._datos),
+                'bytes_en_memoria': self.bytes_en_memoria,
+                'capacidad_bytes': self.capacidad_bytes,
+                'aciertos': self.aciertos,
+                'aciertos_disco': self.aciertos_disco,
+                'fallos': self.fallos,
+                'expulsiones': self.expulsiones,
+            }
+
+    def _guardar(self, resumen, contenido):
+        # Se llama con el lock tomado. Devuelve las entradas que hay que
+        # volcar a disco, que se escriben después de soltar el lock
+        if len(contenido) > self.capacidad_bytes:
+            # No cabe en memoria: solo se conserva en disco
+            return [(resumen, contenido)]
+
+        anterior = self._datos.pop(resumen, None)
+        if anterior is not None:
+            self.bytes_en_memoria -= len(anterior)
+        self._datos[resumen] = contenido
+        self.bytes_en_memoria += len(contenido)
+
+        expulsadas = []
+        while self.bytes_en_memoria > self.capacidad_bytes:
+            resumen_viejo, contenido_viejo = self._datos.popitem(last=False)
+            self.bytes_en_memoria -= len(contenido_viejo)
+            self.expulsiones += 1
+            expulsadas.append((resumen_viejo, contenido_viejo))
+        return expulsadas
+
+    def _volcar(self, entradas):
+        if self.directorio:
+            for resumen, contenido in entradas:
+                self._escribir_disco(resumen, contenido)
+
+    def _ruta(self, resumen):
+        return os.path.join(self.directorio, f'{resumen}.bin')
+
+    def _leer_disco(self, resumen):
+        if not self.directorio:
+            return None
+        try:
+            with open(self._ruta(resumen), 'rb') as archivo:
+                return archivo.read()
+        except OSError:
+            return None
+
+    def _escribir_disco(self, resumen, contenido):
+        if not self.directorio:
+            return
+        ruta = self._ruta(resumen)
+        temporal = f'{ruta}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            with open(temporal, 'wb') as archivo:
+                archivo.write(contenido)
+            os.replace(temporal, ruta)
+        except OSError:
+            # El disco es solo un respaldo; si falla, la entrada se pierde
+            try:
+                os.remove(temporal)
+            except OSError:
+                pass
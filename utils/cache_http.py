@@ -0,0 +1,148 @@
+"""
+Caché HTTP para respuestas que solo cambian con el catálogo o la plantilla:
+validadores (ETag, Last-Modified), Cache-Control, respuestas 304 y
+compresión gzip/brotli negociada por petición. Los cuerpos comprimidos se
+guardan para no recomprimirlos en cada petición.
+"""
+
+import gzip
+import os
+import time
+from datetime import datetime, timezone
+
+from flask import current_app, request
+
+from utils.cache import CacheLRU, digerir_clave
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional: sin él solo se ofrece gzip
+    brotli = None
+
+# Codificaciones ofrecidas, por orden de preferencia ante la misma calidad
+CODIFICACIONES = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+# Por debajo de este tamaño comprimir no compensa
+TAMANO_MINIMO_COMPRESION = int(os.environ.get('FOODCALC_COMPRESION_MINIMO', 512))
+NIVEL_GZIP = int(os.environ.get('FOODCALC_COMPRESION_GZIP', 9))
+NIVEL_BROTLI = int(os.environ.get('FOODCALC_COMPRESION_BROTLI', 11))
+
+# Cuerpos ya generados y comprimidos, por (clave, codificación)
+CACHE_CUERPOS = CacheLRU(int(os.environ.get('FOODCALC_CACHE_CUERPOS', 512)))
+
+# Fecha de respaldo cuando no se puede leer la fecha de un archivo
+ARRANQUE = datetime.fromtimestamp(int(time.time()), timezone.utc)
+
+
+def fecha_modificacion(ruta):
+    """
+    Devuelve la fecha de modificación de un archivo para Last-Modified.
+
+    Args:
+        ruta (str): Ruta del archivo
+
+    Returns:
+        datetime: Fecha UTC sin microsegundos (HTTP solo admite segundos),
+        o la hora de arranque si el archivo no existe (p. ej. en un ejecutable)
+    """
+    try:
+        return datetime.fromtimestamp(int(os.path.getmtime(ruta)), timezone.utc)
+    except OSError:
+        return ARRANQUE
+
+
+def comprimir(contenido, codificacion):
+    """
+    Comprime un cuerpo con la codificación indicada.
+
+    La compresión gzip no incluye fecha, así que el resultado es estable.
+
+    Args:
+        contenido (bytes): Cuerpo sin comprimir
+        codificacion (str): 'gzip', 'br' o 'identity'
+
+    Returns:
+        bytes: Cuerpo comprimido
+    """
+    if codificacion == 'gzip':
+        return gzip.compress(contenido, compresslevel=NIVEL_GZIP, mtime=0)
+    if codificacion == 'br':
+        return brotli.compress(contenido, quality=NIVEL_BROTLI)
+    return contenido
+
+
+def negociar_codificacion(tamano):
+    """
+    Elige la codificación según Accept-Encoding de la petición actual.
+
+    Args:
+        tamano (int): Tamaño del cuerpo sin comprimir
+
+    Returns:
+        str: 'br', 'gzip' o 'identity'
+    """
+    if tamano < TAMANO_MINIMO_COMPRESION:
+        return 'identity'
+    return request.accept_encodings.best_match(CODIFICACIONES, default='identity')
+
+
+def _cuerpo(clave, codificacion, generar):
+    if codificacion == 'identity':
+        return CACHE_CUERPOS.obtener((clave, codificacion), lambda: bytes(generar()))
+    original = _cuerpo(clave, 'identity', generar)
+    return CACHE_CUERPOS.obtener((clave, codificacion), lambda: comprimir(original, codificacion))
+
+
+def _etag(base, codificacion):
+    return base if codificacion == 'identity' else f'{base}-{codificacion}'
+
+
+def respuesta_cacheable(clave, generar, mimetype, ultima_modificacion, cache_control):
+    """
+    Construye una respuesta con validadores, política de caché y compresión.
+
+    El cuerpo solo se genera la primera vez que se pide una clave; las
+    peticiones condicionales que coinciden reciben un 304 sin cuerpo.
+
+    Args:
+        clave (tuple): Identifica la versión del contenido (p. ej. ruta y versión del catálogo)
+        generar (callable): Función sin argumentos que produce el cuerpo en bytes
+        mimetype (str): Tipo del contenido
+        ultima_modificacion (datetime): Valor de Last-Modified
+        cache_control (str): Valor de Cache-Control
+
+    Returns:
+        Response: 200 con el cuerpo (comprimido si el cliente lo acepta) o 304
+    """
+    base = digerir_clave(clave)
+    # Cada codificación es una representación distinta y lleva su propio ETag
+    etags = {codificacion: _etag(base, codificacion) for codificacion in ('identity',) + CODIFICACIONES}
+
+    # If-None-Match tiene prioridad sobre If-Modified-Since (RFC 9110)
+    coincidente = None
+    if request.if_none_match:
+        coincidente = next(
+            (etag for etag in etags.values() if request.if_none_match.contains(etag)),
+            None
+        )
+    elif request.if_modified_since is not None and ultima_modificacion <= request.if_modified_since:
+        coincidente = etags[negociar_codificacion(len(_cuerpo(clave, 'identity', generar)))]
+
+    if coincidente is not None:
+        respuesta = current_app.response_class(status=304)
+        respuesta.set_etag(coincidente)
+    else:
+        original = _cuerpo(clave, 'identity', generar)
+        codificacion = negociar_codificacion(len(original))
+        respuesta = current_app.response_class(
+            _cuerpo(clave, codificacion, generar),
+            mimetype=mimetype
+        )
+        respuesta.set_etag(etags[codificacion])
+        if codificacion != 'identity':
+            respuesta.headers['Content-Encoding'] = codificacion
+
+    respuesta.last_modified = ultima_modificacion
+    respuesta.headers['Cache-Control'] = cache_control
+    respuesta.vary.add('Accept-Encoding')
+    return respuesta
@@ -0,0 +1,476 @@
+"""
+Catálogo de normas de consumo y de recetas por persona.
+Se compila una sola vez por proceso y lo comparten todos los cálculos.
+"""
+
+import hashlib
+from dataclasses import dataclass
+
+# Productos con cantidades en gramos por persona (CRUDO)
+PRODUCTOS_GRAMOS = {
+    "Arroz blanco": 100,
+    "Arroz moro": 52,
+    "Arroz con leche": 10,
+    "Frijoles": 45,
+    "Carne de cerdo/Fricasé sin hueso": 160,
+    "Carne de cerdo/Fricasé con hueso": 250,
+    "Pollo/Menudo para sopa": 40,
+    "Pollo": 250,
+    "Picadillo": 100,
+    "Picadillo para albóndiga": 100,
+    "Albóndiga": 86,
+    "Jamón meriendas": 45,
+    "Jamón desayuno": 15,
+    "Pescado frito": 140,
+    "Pescado aporreado": 100,
+    "Carne de res en salsa": 140,
+    "Carne de res en ropa vieja": 140,
+    "Hígado": 140,
+    "Espaguetis Napolitanos": 75,
+    "Espaguetis para ensalada": 17,
+    "Croquetas (3u)": 120,
+    "Croquetas (4u)": 100,
+    "Hamburguesa de pollo c/queso": 130,
+    "Plátano": 150,
+    "Papa": 150,
+    "Boniato": 150,
+    "Calabaza": 150,
+    "Yuca": 150,
+    "Tomate": 150,
+    "Col": 150,
+    "Natilla": 19.2,
+    "Gelatina": 19.2,
+    "Dulces de latas": 55,
+    "Queso para meriendas": 45,
+    "Queso para desayuno (Gouda)": 15,
+    "Queso para espaguetis": 58,
+    "Mantequilla": 8,
+    "Mayonesa": 8,
+}
+
+# Productos que se cuentan por unidades
+PRODUCTOS_UNIDADES = {
+    "Huevo": 2,
+    "Huevo revuelto": 1.5,
+    "Huevo tortilla": 2,
+    "Rodajas de piña": 1,
+}
+
+# Categorías para organizar los productos en kg al mostrarlos
+CATEGORIAS = {
+    "🍚 ARROCES": ["Arroz blanco", "Arroz moro", "Arroz con leche"],
+    "🫘 GRANOS": ["Frijoles"],
+    "🍖 CARNES Y AVES": [
+        "Carne de cerdo/Fricasé sin hueso",
+        "Carne de cerdo/Fricasé con hueso",
+        "Pollo/Menudo para sopa",
+        "Pollo",
+        "Carne de res en salsa",
+        "Carne de res en ropa vieja",
+        "Hígado"
+    ],
+    "🍔 PICADILLOS Y ELABORADOS": [
+        "Picadillo",
+        "Picadillo para albóndiga",
+        "Albóndiga",
+        "Croquetas (3u)",
+        "Croquetas (4u)",
+        "Hamburguesa de pollo c/queso"
+    ],
+    "🐟 PESCADO": ["Pescado frito", "Pescado aporreado"],
+    "🥓 EMBUTIDOS": ["Jamón meriendas", "Jamón desayuno"],
+    "🍝 PASTAS": ["Espaguetis Napolitanos", "Espaguetis para ensalada"],
+    "🥔 VIANDAS": ["Plátano", "Papa", "Boniato", "Calabaza", "Yuca"],
+    "🥗 VEGETALES": ["Tomate", "Col"],
+    "🍮 POSTRES": ["Natilla", "Gelatina", "Dulces de latas"],
+    "🧀 LÁCTEOS": [
+        "Queso para meriendas",
+        "Queso para desayuno (Gouda)",
+        "Queso para espaguetis",
+        "Mantequilla"
+    ],
+    "🥫 CONDIMENTOS": ["Mayonesa"]
+}
+
+# Categoría de los productos que se cuentan por unidades
+CATEGORIA_UNIDADES = "🥚 PRODUCTOS POR UNIDADES"
+
+# Ingredientes por persona de cada preparación: gramos (kg al escalar),
+# mililitros (litros al escalar) o unidades
+PREPARACIONES = {
+    "Arroz blanco": {
+        "Arroz": 100,  # g
+        "Agua": 200,  # ml (2:1 agua/arroz)
+        "Aceite": 5,  # g
+        "Sal": 2,  # g
+    },
+    "Arroz moro": {
+        "Arroz crudo": 52,  # g
+        "Frijol seco": 26,  # g
+        "Agua": 150,  # ml
+        "Aceite": 3,  # g
+        "Cebolla": 10,  # g
+        "Ajo": 2,  # g
+        "Pimiento": 5,  # g
+        "Sal": 1.5,  # g
+    },
+    "Frijoles negros": {
+        "Frijoles (secos)": 45,  # g
+        "Agua": 180,  # ml (4:1 agua/frijoles)
+        "Aceite": 3,  # g
+        "Cebolla": 15,  # g
+        "Ajo": 3,  # g
+        "Pimiento": 10,  # g
+        "Sal": 2,  # g
+        "Comino": 0.5,  # g
+    },
+    "Pollo frito": {
+        "Pollo (crudo)": 250,  # g
+        "Aceite para freír": 50,  # g
+        "Sal": 2,  # g
+        "Ajo": 2,  # g
+        "Limón": 10,  # g
+    },
+    "Picadillo": {
+        "Carne molida": 100,  # g
+        "Aceite": 5,  # g
+        "Cebolla": 20,  # g
+        "Ajo": 3,  # g
+        "Pimiento": 15,  # g
+        "Tomate": 30,  # g
+        "Sal": 1.5,  # g
+        "Comino": 0.5,  # g
+    },
+    "Espaguetis Napolitanos": {
+        "Espaguetis (secos)": 75,  # g
+        "Agua": 150,  # ml
+        "Salsa de tomate": 40,  # g
+        "Aceite": 5,  # g
+        "Cebolla": 15,  # g
+        "Ajo": 2,  # g
+        "Sal": 2,  # g
+        "Queso rallado": 58,  # g (para servir)
+    },
+    "Plátanos maduros fritos": {
+        "Plátano maduro": 150,  # g
+        "Aceite para freír": 30,  # g
+        "Sal (opcional)": 0.5,  # g
+    },
+    "Viandas hervidas (Papa/Yuca/Boniato)": {
+        "Vianda (papa/yuca/boniato)": 150,  # g
+        "Agua": 200,  # ml
+        "Sal": 2,  # g
+    },
+    "Ensalada de col": {
+        "Col": 150,  # g
+        "Tomate": 50,  # g
+        "Cebolla": 20,  # g
+        "Aceite": 5,  # g
+        "Vinagre": 3,  # ml
+        "Sal": 1,  # g
+    },
+    "Huevos revueltos": {
+        "Huevos": 1.5,  # unidades
+        "Aceite": 3,  # g
+        "Cebolla": 10,  # g
+        "Sal": 1,  # g
+    },
+}
+
+# Ficha de cada ingrediente: (unidad, densidad en kg por litro, categoría).
+# La densidad solo se indica donde tiene sentido convertir entre kg y litros.
+FICHAS_INGREDIENTES = {
+    "Arroz": ("kg", None, "Granos"),
+    "Arroz crudo": ("kg", None, "Granos"),
+    "Frijol seco": ("kg", None, "Granos"),
+    "Frijoles (secos)": ("kg", None, "Granos"),
+    "Espaguetis (secos)": ("kg", None, "Pastas"),
+    "Pollo (crudo)": ("kg", None, "Carnes"),
+    "Carne molida": ("kg", None, "Carnes"),
+    "Huevos": ("unidades", None, "Huevos"),
+    "Queso rallado": ("kg", None, "Lácteos"),
+    "Cebolla": ("kg", None, "Vegetales"),
+    "Ajo": ("kg", None, "Vegetales"),
+    "Pimiento": ("kg", None, "Vegetales"),
+    "Tomate": ("kg", None, "Vegetales"),
+    "Col": ("kg", None, "Vegetales"),
+    "Limón": ("kg", None, "Frutas"),
+    "Plátano maduro": ("kg", None, "Viandas"),
+    "Vianda (papa/yuca/boniato)": ("kg", None, "Viandas"),
+    "Salsa de tomate": ("kg", 1.03, "Salsas"),
+    "Aceite": ("kg", 0.92, "Grasas"),
+    "Aceite para freír": ("kg", 0.92, "Grasas"),
+    "Sal": ("kg", None, "Condimentos"),
+    "Sal (opcional)": ("kg", None, "Condimentos"),
+    "Comino": ("kg", None, "Condimentos"),
+    "Agua": ("litros", 1.0, "Líquidos"),
+    "Vinagre": ("litros", 1.01, "Líquidos"),
+}
+
+
+@dataclass(frozen=True, slots=True)
+class Ingrediente:
+    """Ingrediente con su unidad, densidad y categoría ya resueltas"""
+    nombre: str
+    unidad: str
+    densidad: float | None
+    categoria: str
+
+    def convertir(self, cantidad, unidad_destino):
+        """
+        Convierte una cantidad de este ingrediente a otra unidad.
+
+        Args:
+            cantidad (float): Cantidad expresada en la unidad del ingrediente
+            unidad_destino (str): 'kg', 'litros' o 'unidades'
+
+        Returns:
+            float: Cantidad en la unidad de destino
+
+        Raises:
+            ValueError: Si la conversión no es posible para este ingrediente
+        """
+        if unidad_destino == self.unidad:
+            return cantidad
+        if self.densidad is not None:
+            if self.unidad == 'litros' and unidad_destino == 'kg':
+                return cantidad * self.densidad
+            if self.unidad == 'kg' and unidad_destino == 'litros':
+                return cantidad / self.densidad
+        raise ValueError(f'No se puede convertir {self.nombre} de {self.unidad} a {unidad_destino}')
+
+
+# Ingredientes compilados una sola vez por proceso
+INGREDIENTES = {
+    nombre: Ingrediente(nombre, unidad, densidad, categoria)
+    for nombre, (unidad, densidad, categoria) in FICHAS_INGREDIENTES.items()
+}
+
+
+def unidad_ingrediente(nombre):
+    """
+    Devuelve la unidad de un ingrediente.
+
+    Los ingredientes del catálogo se resuelven con una búsqueda directa.
+    Para nombres ajenos al catálogo se usa la regla por nombre de siempre.
+
+    Args:
+        nombre (str): Nombre del ingrediente
+
+    Returns:
+        str: 'kg', 'litros' o 'unidades'
+    """
+    ingrediente = INGREDIENTES.get(nombre)
+    if ingrediente is not None:
+        return ingrediente.unidad
+    if nombre == "Huevos":
+        return "unidades"
+    if "Agua" in nombre or "Vinagre" in nombre:
+        return "litros"
+    return "kg"
+
+
+class CatalogoNormas:
+    """
+    Normas por persona en forma compacta con un índice fijo de productos.
+
+    Las normas se guardan en una tupla plana: primero los productos en
+    gramos y después los productos por unidades. La posición de cada
+    producto en esa tupla es fija durante toda la vida del proceso.
+    """
+
+    __slots__ = (
+        'nombres', 'nombres_kg', 'nombres_unidades', 'nombres_ordenados',
+        'normas', 'normas_kg', 'normas_unidades', 'indice', 'productos',
+        '_vector_kg', '_vector_unidades', '_unidades_enteras',
+    )
+
+    def __init__(self, productos_gramos, productos_unidades):
+        self.nombres_kg = tuple(productos_gramos)
+        self.nombres_unidades = tuple(productos_unidades)
+        self.nombres = self.nombres_kg + self.nombres_unidades
+        self.nombres_ordenados = tuple(sorted(self.nombres))
+
+        self.normas_kg = tuple(productos_gramos.values())
+        self.normas_unidades = tuple(productos_unidades.values())
+        self.normas = self.normas_kg + self.normas_unidades
+
+        self.indice = {nombre: i for i, nombre in enumerate(self.nombres)}
+
+        # Índice nombre -> (norma, unidad) para consultas de un solo producto
+        self.productos = {nombre: (norma, 'kg') for nombre, norma in productos_gramos.items()}
+        self.productos.update(
+            (nombre, (norma, 'unidades')) for nombre, norma in productos_unidades.items()
+        )
+
+        # Vectores para el cálculo por lotes; se crean en el primer lote para
+        # no importar NumPy al arrancar. Las normas enteras por unidades dan
+        # cantidades enteras en el cálculo individual y se conservan así.
+        self._vector_kg = None
+        self._vector_unidades = None
+        self._unidades_enteras = tuple(isinstance(u, int) for u in self.normas_unidades)
+
+    def escalar(self, personas):
+        """
+        Escala y redondea todas las normas para N personas en una sola pasada.
+
+        Args:
+            personas (int): Número de personas
+
+        Returns:
+            tuple: (cantidades_kg, cantidades_unidades) en el orden del índice
+        """
+        cantidades_kg = [round(gramos * personas / 1000, 3) for gramos in self.normas_kg]
+        cantidades_unidades = [round(unidades * personas, 1) for unidades in self.normas_unidades]
+        return cantidades_kg, cantidades_unidades
+
+    def cantidad(self, nombre, personas):
+        """
+        Calcula la cantidad de un solo producto para N personas.
+
+        Args:
+            nombre (str): Nombre exacto del producto
+            personas (int): Número de personas
+
+        Returns:
+            tuple: (cantidad, unidad) o None si el producto no existe
+        """
+        entrada = self.productos.get(nombre)
+        if entrada is None:
+            return None
+
+        norma, unidad = entrada
+        if unidad == 'kg':
+            return round(norma * personas / 1000, 3), unidad
+        return round(norma * personas, 1), unidad
+
+    def escalar_lote(self, lista_personas):
+        """
+        Escala y redondea las normas para muchas cantidades de personas a la vez.
+
+        Calcula la matriz personas × producto en una sola pasada vectorizada.
+        Los valores coinciden exactamente con los de escalar().
+
+        Args:
+            lista_personas (list): Números de personas (enteros)
+
+        Returns:
+            tuple: (filas_kg, filas_unidades), una fila por cada entrada
+        """
+        import numpy as np
+
+        if self._vector_kg is None:
+            self._vector_kg = np.array(self.normas_kg, dtype=np.float64)
+            self._vector_unidades = np.array(self.normas_unidades, dtype=np.float64)
+
+        personas = np.asarray(lista_personas, dtype=np.int64)
+
+        matriz_kg = _redondear(np.outer(personas, self._vector_kg) / 1000, 3)
+        filas_kg = matriz_kg.tolist()
+
+        matriz_unidades = _redondear(np.outer(personas, self._vector_unidades), 1)
+        columnas = [
+            matriz_unidades[:, j].astype(np.int64).tolist() if entera else matriz_unidades[:, j].tolist()
+            for j, entera in enumerate(self._unidades_enteras)
+        ]
+        filas_unidades = list(zip(*columnas)) if columnas else [()] * len(filas_kg)
+
+        return filas_kg, filas_unidades
+
+
+def _redondear(matriz, decimales):
+    """
+    Redondea una matriz igual que round() de Python.
+
+    np.round() redondea al par en los casos de empate exacto tras escalar,
+    mientras que round() usa el valor binario real. Esos casos son muy raros,
+    así que se detectan y se corrigen uno a uno.
+    """
+    import numpy as np
+
+    redondeada = np.round(matriz, decimales)
+    escalada = matriz * 10 ** decimales
+    empates = np.abs(escalada - np.floor(escalada) - 0.5) < 1e-6
+    if empates.any():
+        for posicion in zip(*np.nonzero(empates)):
+            redondeada[posicion] = round(float(matriz[posicion]), decimales)
+    return redondeada
+
+
+class RecetarioPreparaciones:
+    """
+    Vectores de ingredientes por persona de cada preparación.
+
+    Cada preparación guarda sus ingredientes, sus normas y sus divisores en
+    tuplas paralelas, así que calcular una preparación no toca las demás.
+    Las fichas de los ingredientes se resuelven aquí, al cargar el catálogo:
+    un ingrediente sin ficha es un error de datos y falla en la importación.
+    """
+
+    __slots__ = ('nombres', 'nombres_ordenados', 'recetas', 'fichas')
+
+    def __init__(self, preparaciones, ingredientes):
+        self.nombres = tuple(preparaciones)
+        self.nombres_ordenados = tuple(sorted(self.nombres))
+        self.recetas = {}
+        self.fichas = {}
+
+        for nombre, normas in preparaciones.items():
+            fichas = tuple(ingredientes[ingrediente] for ingrediente in normas)
+            self.recetas[nombre] = (
+                tuple(normas),
+                tuple(normas.values()),
+                tuple(ficha.unidad != 'unidades' for ficha in fichas),
+            )
+            self.fichas[nombre] = fichas
+
+    def calcular(self, nombre, personas):
+        """
+        Calcula los ingredientes de una sola preparación para N personas.
+
+        Args:
+            nombre (str): Nombre exacto de la preparación
+            personas (int): Número de personas
+
+        Returns:
+            dict: Ingredientes y cantidades, o None si la preparación no existe
+        """
+        receta = self.recetas.get(nombre)
+        if receta is None:
+            return None
+
+        ingredientes, normas, dividir_entre_mil = receta
+        return {
+            ingrediente: round(norma * personas / 1000 if dividir else norma * personas, 3)
+            for ingrediente, norma, dividir in zip(ingredientes, normas, dividir_entre_mil)
+        }
+
+    def calcular_varias(self, nombres, personas):
+        """
+        Calcula varias preparaciones para N personas en una sola llamada.
+
+        Args:
+            nombres (list): Nombres exactos de las preparaciones
+            personas (int): Número de personas
+
+        Returns:
+            dict: Preparación -> ingredientes, solo para las que existen
+        """
+        return {
+            nombre: self.calcular(nombre, personas)
+            for nombre in nombres
+            if nombre in self.recetas
+        }
+
+
+def _calcular_version():
+    datos = (PRODUCTOS_GRAMOS, PRODUCTOS_UNIDADES, CATEGORIAS, PREPARACIONES, FICHAS_INGREDIENTES)
+    return hashlib.sha256(repr(datos).encode('utf-8')).hexdigest()[:16]
+
+
+# Versión del catálogo: cambia solo cuando cambian los datos de este módulo
+VERSION_CATALOGO = _calcular_version()
+
+# Catálogo y recetario compilados una sola vez por proceso
+CATALOGO = CatalogoNormas(PRODUCTOS_GRAMOS, PRODUCTOS_UNIDADES)
+RECETARIO = RecetarioPreparaciones(PREPARACIONES, INGREDIENTES)
@@ -0,0 +1,272 @@
+"""
+Interfaz de exportación de resultados a PDF e imagen.
+
+Los backends (reportlab para PDF, Pillow para imagen) son pesados de
+importar y la mayoría de las sesiones no exporta nada, así que se cargan
+bajo demanda la primera vez que se usan, o en segundo plano con precargar().
+Los documentos generados se guardan en cachés de bytes direccionadas por contenido.
+"""
+
+import importlib
+import importlib.util
+import os
+import threading
+
+from utils.cache import CacheBytes, digerir_clave
+from utils.catalogo import VERSION_CATALOGO
+from utils.metricas import medir_render
+from utils.trazas import tramo
+
+# Versión de la plantilla del PDF: incrementarla al cambiar el diseño
+VERSION_PLANTILLA_PDF = 1
+
+# Caché de PDF generados: límite de memoria y directorio opcional de volcado
+CACHE_PDF = CacheBytes(
+    int(os.environ.get('FOODCALC_CACHE_PDF_BYTES', 32 * 1024 * 1024)),
+    os.environ.get('FOODCALC_CACHE_PDF_DIR') or None
+)
+
+# Versión de la plantilla de la imagen: incrementarla al cambiar el diseño
+VERSION_PLANTILLA_IMAGEN = 1
+
+# Caché de imágenes generadas
+CACHE_IMAGENES = CacheBytes(
+    int(os.environ.get('FOODCALC_CACHE_IMAGEN_BYTES', 64 * 1024 * 1024)),
+    os.environ.get('FOODCALC_CACHE_IMAGEN_DIR') or None
+)
+
+
+def _fuente_por_defecto():
+    # Se localiza el paquete sin importarlo
+    especificacion = importlib.util.find_spec('reportlab')
+    if especificacion is None or not especificacion.submodule_search_locations:
+        return 'Vera.ttf'
+    return os.path.join(list(especificacion.submodule_search_locations)[0], 'fonts', 'Vera.ttf')
+
+
+# Fuente de la imagen. Por defecto se usa Vera, que se distribuye con reportlab
+FUENTE_IMAGEN = os.environ.get('FOODCALC_FUENTE') or _fuente_por_defecto()
+
+# Formatos de imagen: formato -> (formato de Pillow, tipo MIME)
+FORMATOS_IMAGEN = {
+    'png': ('PNG', 'image/png'),
+    'webp': ('WEBP', 'image/webp'),
+    'jpeg': ('JPEG', 'image/jpeg'),
+}
+
+# Nivel de compresión PNG (0-9) y calidad WebP/JPEG (1-100) por defecto
+COMPRESION_PNG = int(os.environ.get('FOODCALC_COMPRESION_PNG', 6))
+CALIDAD_IMAGEN = int(os.environ.get('FOODCALC_CALIDAD_IMAGEN', 85))
+
+# Tamaños de letra del título y del contenido
+TAMANO_TITULO = 32
+TAMANO_TEXTO = 20
+
+# Módulos de cada backend de exportación
+BACKENDS = {
+    'pdf': 'utils.exportar_pdf',
+    'imagen': 'utils.exportar_imagen',
+}
+
+_backends_cargados = {}
+_lock_backends = threading.Lock()
+
+
+def cargar_backend(nombre):
+    """
+    Importa un backend de exportación la primera vez que se necesita.
+    
+    Args:
+        nombre (str): 'pdf' o 'imagen'
+        
+    Returns:
+        module: Módulo del backend
+    """
+    modulo = _backends_cargados.get(nombre)
+    if modulo is None:
+        with _lock_backends:
+            modulo = _backends_cargados.get(nombre)
+            if modulo is None:
+                modulo = importlib.import_module(BACKENDS[nombre])
+                _backends_cargados[nombre] = modulo
+    return modulo
+
+
+def backends_cargados():
+    """
+    Devuelve los backends ya importados.
+    
+    Returns:
+        tuple: Nombres de los backends cargados
+    """
+    return tuple(_backends_cargados)
+
+
+def precargar(en_segundo_plano=True):
+    """
+    Importa todos los backends para que la primera exportación no espere.
+    
+    Args:
+        en_segundo_plano (bool): Si es True la carga se hace en un hilo daemon
+        
+    Returns:
+        threading.Thread o None: El hilo de precarga, si se creó
+    """
+    def cargar_todos():
+        for nombre in BACKENDS:
+            cargar_backend(nombre)
+    
+    if not en_segundo_plano:
+        cargar_todos()
+        return None
+    
+    hilo = threading.Thread(target=cargar_todos, name='precarga-exportacion', daemon=True)
+    hilo.start()
+    return hilo
+
+
+def generar_pdf(personas):
+    """
+    Genera el PDF con las cantidades para N personas (ver utils.exportar_pdf).
+    
+    Args:
+        personas (int): Número de personas
+        
+    Returns:
+        bytes: Contenido del PDF
+    """
+    return cargar_backend('pdf').generar_pdf(personas)
+
+
+def generar_imagen(personas, formato='png', compresion=COMPRESION_PNG, calidad=CALIDAD_IMAGEN):
+    """
+    Genera la imagen con las cantidades para N personas (ver utils.exportar_imagen).
+    
+    Args:
+        personas (int): Número de personas
+        formato (str): 'png', 'webp' o 'jpeg'
+        compresion (int): Nivel de compresión PNG (0-9)
+        calidad (int): Calidad WebP/JPEG (1-100)
+        
+    Returns:
+        bytes: Contenido de la imagen
+    """
+    return cargar_backend('imagen').generar_imagen(personas, formato, compresion, calidad)
+
+
+def _renderizar(tipo, generar):
+    # Solo se llega aquí en un fallo de caché: el tramo 'render' de la traza
+    # incluye las fases del backend y su ausencia indica un acierto
+    with tramo('render'):
+        return medir_render(tipo, 'directa', generar)
+
+
+def _clave_pdf(personas):
+    return ('pdf', personas, VERSION_CATALOGO, VERSION_PLANTILLA_PDF)
+
+
+def etag_pdf(personas):
+    """
+    Devuelve el ETag fuerte del PDF para N personas sin generarlo.
+    
+    Args:
+        personas (int): Número de personas
+        
+    Returns:
+        str: Resumen de (personas, versión del catálogo, versión de la plantilla)
+    """
+    return digerir_clave(_clave_pdf(personas))
+
+
+def obtener_pdf(personas):
+    """
+    Devuelve el PDF para N personas desde la caché o generándolo.
+    
+    Args:
+        personas (int): Número de personas
+        
+    Returns:
+        tuple: (contenido, etag)
+    """
+    return CACHE_PDF.obtener(
+        _clave_pdf(personas),
+        lambda: _renderizar('pdf', lambda: generar_pdf(personas))
+    )
+
+
+def _clave_imagen(personas, formato='png', compresion=COMPRESION_PNG, calidad=CALIDAD_IMAGEN):
+    # Solo el parámetro que usa cada formato forma parte de la clave
+    ajuste = compresion if formato == 'png' else calidad
+    return (
+        'imagen', personas, formato, ajuste,
+        VERSION_CATALOGO, VERSION_PLANTILLA_IMAGEN, FUENTE_IMAGEN
+    )
+
+
+def etag_imagen(personas, formato='png', compresion=COMPRESION_PNG, calidad=CALIDAD_IMAGEN):
+    """
+    Devuelve el ETag fuerte de la imagen sin generarla.
+    
+    Args:
+        personas (int): Número de personas
+        formato (str): 'png', 'webp' o 'jpeg'
+        compresion (int): Nivel de compresión PNG (0-9)
+        calidad (int): Calidad WebP/JPEG (1-100)
+        
+    Returns:
+        str: Resumen de la clave de la imagen
+    """
+    return digerir_clave(_clave_imagen(personas, formato, compresion, calidad))
+
+
+def obtener_imagen(personas, formato='png', compresion=COMPRESION_PNG, calidad=CALIDAD_IMAGEN):
+    """
+    Devuelve la imagen para N personas desde la caché o generándola.
+    
+    Args:
+        personas (int): Número de personas
+        formato (str): 'png', 'webp' o 'jpeg'
+        compresion (int): Nivel de compresión PNG (0-9)
+        calidad (int): Calidad WebP/JPEG (1-100)
+        
+    Returns:
+        tuple: (contenido, etag)
+    """
+    return CACHE_IMAGENES.obtener(
+        _clave_imagen(personas, formato, compresion, calidad),
+        lambda: _renderizar('imagen', lambda: generar_imagen(personas, formato, compresion, calidad))
+    )
+
+
+# Caché y clave de cada tipo de exportación, con los parámetros del generador
+_CACHES_EXPORTACION = {
+    'pdf': (CACHE_PDF, _clave_pdf),
+    'imagen': (CACHE_IMAGENES, _clave_imagen),
+}
+
+
+def buscar_exportacion(tipo, parametros):
+    """
+    Busca una exportación en la misma caché que obtener_pdf() y obtener_imagen().
+    
+    Args:
+        tipo (str): 'pdf' o 'imagen'
+        parametros (dict): Argumentos del generador (personas, formato...)
+        
+    Returns:
+        tuple: (contenido, etag) o None si hay que generarla
+    """
+    cache, clave = _CACHES_EXPORTACION[tipo]
+    return cache.buscar(clave(**parametros))
+
+
+def guardar_exportacion(tipo, parametros, contenido):
+    """
+    Guarda una exportación generada fuera de obtener_pdf() y obtener_imagen()
+    (p. ej. en la cola de exportación) para que las descargas la reutilicen.
+    
+    Returns:
+        str: ETag de la exportación
+    """
+    cache, clave = _CACHES_EXPORTACION[tipo]
+    return cache.guardar(clave(**parametros), contenido)
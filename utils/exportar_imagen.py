@@ -0,0 +1,99 @@
+"""
+Backend de exportación a imagen (Pillow).
+Se importa bajo demanda desde utils.exportacion; las fuentes se resuelven
+una sola vez, al cargar este módulo.
+"""
+
+import io
+import os
+
+from PIL import Image, ImageDraw, ImageFont
+
+from utils.cache import CacheLRU
+from utils.exportacion import (
+    CALIDAD_IMAGEN,
+    COMPRESION_PNG,
+    FORMATOS_IMAGEN,
+    FUENTE_IMAGEN,
+    TAMANO_TEXTO,
+    TAMANO_TITULO,
+)
+from utils.food_calculator import resultados_formateados
+from utils.trazas import tramo
+
+# Caché de líneas ya rasterizadas: (texto, tamaño) -> máscara
+CACHE_LINEAS = CacheLRU(int(os.environ.get('FOODCALC_CACHE_LINEAS', 2048)))
+
+
+def _cargar_fuente(tamano):
+    try:
+        return ImageFont.truetype(FUENTE_IMAGEN, tamano)
+    except OSError:
+        return ImageFont.load_default(tamano)
+
+
+# Fuentes resueltas una sola vez al cargar el backend
+FUENTES = {tamano: _cargar_fuente(tamano) for tamano in (TAMANO_TITULO, TAMANO_TEXTO)}
+
+
+def _mascara_linea(linea, tamano):
+    """Rasteriza una línea una sola vez y la guarda en la caché de líneas"""
+    def rasterizar():
+        fuente = FUENTES[tamano]
+        _, _, ancho, alto = fuente.getbbox(linea)
+        mascara = Image.new('L', (max(ancho, 1), max(alto, 1)), 0)
+        ImageDraw.Draw(mascara).text((0, 0), linea, fill=255, font=fuente)
+        return mascara
+    
+    return CACHE_LINEAS.obtener((linea, tamano), rasterizar)
+
+
+def generar_imagen(personas, formato='png', compresion=COMPRESION_PNG, calidad=CALIDAD_IMAGEN):
+    """
+    Genera la imagen con las cantidades para N personas.
+    
+    Args:
+        personas (int): Número de personas
+        formato (str): 'png', 'webp' o 'jpeg'
+        compresion (int): Nivel de compresión PNG (0-9)
+        calidad (int): Calidad WebP/JPEG (1-100)
+        
+    Returns:
+        bytes: Contenido de la imagen
+    """
+    formato_pil, _ = FORMATOS_IMAGEN[formato]
+    with tramo('formateo'):
+        contenido_texto = resultados_formateados(personas, formato='texto')
+    
+    # Dimensiones base
+    width = 1200
+    height = 100  # Base
+    line_height = 30
+    
+    # Contar líneas
+    lineas = contenido_texto.split('\n')
+    height += len(lineas) * line_height + 100
+    
+    with tramo('rasterizado'):
+        img = Image.new('RGB', (width, height), color='white')
+        
+        y_position = 30
+        
+        # Título
+        titulo = f"🍳 Food Calculator - {personas} personas"
+        img.paste('#1e40af', (50, y_position), _mascara_linea(titulo, TAMANO_TITULO))
+        y_position += 60
+        
+        # Contenido
+        for linea in lineas:
+            if linea.strip():
+                img.paste('black', (50, y_position), _mascara_linea(linea, TAMANO_TEXTO))
+            y_position += line_height
+    
+    with tramo('codificacion'):
+        img_buffer = io.BytesIO()
+        if formato_pil == 'PNG':
+            img.save(img_buffer, format=formato_pil, compress_level=compresion)
+        else:
+            img.save(img_buffer, format=formato_pil, quality=calidad)
+    return img_buffer.getvalue()
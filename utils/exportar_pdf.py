@@ -0,0 +1,113 @@
+"""
+Backend de exportación a PDF (reportlab).
+Se importa bajo demanda desde utils.exportacion.
+"""
+
+import io
+from functools import lru_cache
+
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+from reportlab.lib import colors
+from reportlab.lib.units import inch
+
+from utils.food_calculator import calcular_cantidades_comida
+from utils.trazas import tramo
+
+
+@lru_cache(maxsize=None)
+def _estilos_pdf():
+    """Crea una sola vez la hoja de estilos y los estilos de tabla del PDF"""
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=24,
+        textColor=colors.HexColor('#1e40af'),
+        spaceAfter=30,
+        alignment=1
+    )
+    estilo_kg = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3b82f6')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 12),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ])
+    estilo_unidades = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#10b981')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 12),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.lightgrey),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ])
+    return styles, title_style, estilo_kg, estilo_unidades
+
+
+def generar_pdf(personas):
+    """
+    Genera el PDF con las cantidades para N personas.
+    
+    El documento se genera en modo invariante (sin fecha ni identificador
+    aleatorio), así que la misma entrada produce siempre los mismos bytes.
+    
+    Args:
+        personas (int): Número de personas
+        
+    Returns:
+        bytes: Contenido del PDF
+    """
+    with tramo('calculo'):
+        resultado = calcular_cantidades_comida(personas)
+    
+    # Maquetación: párrafos y tablas del documento
+    with tramo('maquetacion'):
+        styles, title_style, estilo_kg, estilo_unidades = _estilos_pdf()
+    
+        pdf_buffer = io.BytesIO()
+        doc = SimpleDocTemplate(pdf_buffer, pagesize=letter, invariant=1)
+        story = []
+    
+        # Título
+        story.append(Paragraph(f"🍳 Food Calculator - {personas} personas", title_style))
+        story.append(Spacer(1, 0.3*inch))
+    
+        # Productos en kg
+        productos_kg = resultado['productos_kg']
+        if productos_kg:
+            story.append(Paragraph("Productos en Kilogramos", styles['Heading2']))
+            story.append(Spacer(1, 0.2*inch))
+        
+            data_table = [['Producto', 'Cantidad (kg)']]
+            for producto, cantidad in sorted(productos_kg.items()):
+                data_table.append([producto, f'{cantidad}'])
+        
+            table = Table(data_table, colWidths=[4*inch, 1.5*inch])
+            table.setStyle(estilo_kg)
+            story.append(table)
+            story.append(Spacer(1, 0.3*inch))
+    
+        # Productos por unidades
+        productos_unidades = resultado['productos_unidades']
+        if productos_unidades:
+            story.append(Paragraph("Productos por Unidades", styles['Heading2']))
+            story.append(Spacer(1, 0.2*inch))
+        
+            data_table = [['Producto', 'Cantidad (unidades)']]
+            for producto, cantidad in sorted(productos_unidades.items()):
+                data_table.append([producto, f'{cantidad}'])
+        
+            table = Table(data_table, colWidths=[4*inch, 1.5*inch])
+            table.setStyle(estilo_unidades)
+            story.append(table)
+    
+    with tramo('build'):
+        doc.build(story)
+    return pdf_buffer.getvalue()
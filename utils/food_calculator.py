@@ -1,8 +1,45 @@
 """
 Módulo de cálculo de cantidades de comida según normas de consumo.
 Uso: from food_calculator import calcular_cantidades_comida, formatear_resultados
+Por lotes: python utils/food_calculator.py eventos.csv -o salida (ver utils/planificacion.py)
 """
 
+import os
+from itertools import groupby
+from operator import itemgetter
+
+try:
+    from utils.cache import CacheLRU
+    from utils.catalogo import CATALOGO, CATEGORIAS, CATEGORIA_UNIDADES, RECETARIO, unidad_ingrediente
+    from utils.renderizado import Documento, Seccion, crear_item, renderizar
+except ImportError:  # Ejecución directa del módulo
+    from cache import CacheLRU
+    from catalogo import CATALOGO, CATEGORIAS, CATEGORIA_UNIDADES, RECETARIO, unidad_ingrediente
+    from renderizado import Documento, Seccion, crear_item, renderizar
+
+# Caché de resultados formateados, con clave (función, personas, formato)
+CACHE_FORMATOS = CacheLRU(int(os.environ.get('FOODCALC_CACHE_FORMATOS', 512)))
+
+COLUMNAS_RESULTADOS = ('categoria', 'producto', 'cantidad', 'unidad')
+
+# Orden de las filas en kg de documento_resultados(): (categoría, producto, posición en el lote)
+ORDEN_FILAS_KG = tuple(
+    (categoria, producto, CATALOGO.indice[producto])
+    for categoria, productos in CATEGORIAS.items()
+    for producto in productos
+    if producto in CATALOGO.productos and CATALOGO.productos[producto][1] == 'kg'
+)
+
+# Las mismas filas agrupadas por categoría: (categoría, ((producto, posición), ...))
+SECCIONES_KG = tuple(
+    (categoria, tuple((producto, posicion) for _, producto, posicion in filas))
+    for categoria, filas in groupby(ORDEN_FILAS_KG, key=itemgetter(0))
+)
+
+# Productos por unidades en orden alfabético, con su posición en escalar()
+ORDEN_UNIDADES = tuple(sorted((producto, j) for j, producto in enumerate(CATALOGO.nombres_unidades)))
+
+
 def calcular_cantidades_comida(personas):
     """
     Calcula las cantidades necesarias de todos los productos para N personas.
@@ -21,194 +58,247 @@ def calcular_cantidades_comida(personas):
         >>> print(resultado['productos_kg']['Arroz blanco'])
         5.0
     """
-    
-    # Productos con cantidades en gramos por persona (CRUDO)
-    productos_gramos = {
-        "Arroz blanco": 100,
-        "Arroz moro": 52,
-        "Arroz con leche": 10,
-        "Frijoles": 45,
-        "Carne de cerdo/Fricasé sin hueso": 160,
-        "Carne de cerdo/Fricasé con hueso": 250,
-        "Pollo/Menudo para sopa": 40,
-        "Pollo": 250,
-        "Picadillo": 100,
-        "Picadillo para albóndiga": 100,
-        "Albóndiga": 86,
-        "Jamón meriendas": 45,
-        "Jamón desayuno": 15,
-        "Pescado frito": 140,
-        "Pescado aporreado": 100,
-        "Carne de res en salsa": 140,
-        "Carne de res en ropa vieja": 140,
-        "Hígado": 140,
-        "Espaguetis Napolitanos": 75,
-        "Espaguetis para ensalada": 17,
-        "Croquetas (3u)": 120,
-        "Croquetas (4u)": 100,
-        "Hamburguesa de pollo c/queso": 130,
-        "Plátano": 150,
-        "Papa": 150,
-        "Boniato": 150,
-        "Calabaza": 150,
-        "Yuca": 150,
-        "Tomate": 150,
-        "Col": 150,
-        "Natilla": 19.2,
-        "Gelatina": 19.2,
-        "Dulces de latas": 55,
-        "Queso para meriendas": 45,
-        "Queso para desayuno (Gouda)": 15,
-        "Queso para espaguetis": 58,
-        "Mantequilla": 8,
-        "Mayonesa": 8,
+    cantidades_kg, cantidades_unidades = CATALOGO.escalar(personas)
+    return _resultado(personas, cantidades_kg, cantidades_unidades)
+
+
+def _resultado(personas, cantidades_kg, cantidades_unidades):
+    return {
+        'productos_kg': dict(zip(CATALOGO.nombres_kg, cantidades_kg)),
+        'productos_unidades': dict(zip(CATALOGO.nombres_unidades, cantidades_unidades)),
+        'total_personas': personas
     }
+
+
+def calcular_cantidades_lote(lista_personas):
+    """
+    Calcula las cantidades de todos los productos para muchas cantidades de personas.
     
-    # Productos que se cuentan por unidades
-    productos_unidades_base = {
-        "Huevo": 2,
-        "Huevo revuelto": 1.5,
-        "Huevo tortilla": 2,
-        "Rodajas de piña": 1,
-    }
+    Todo el lote se resuelve en una sola pasada vectorizada sobre el catálogo.
     
-    # Calcular cantidades en kilogramos
-    productos_kg = {}
-    for producto, gramos_por_persona in productos_gramos.items():
-        gramos_totales = gramos_por_persona * personas
-        productos_kg[producto] = round(gramos_totales / 1000, 3)
+    Args:
+        lista_personas (list): Números de personas
+        
+    Returns:
+        list: Un resultado por entrada, con la misma forma que calcular_cantidades_comida()
     
-    # Calcular cantidades de productos por unidades
-    productos_unidades = {}
-    for producto, unidades_por_persona in productos_unidades_base.items():
-        productos_unidades[producto] = round(unidades_por_persona * personas, 1)
+    Ejemplo:
+        >>> resultados = calcular_cantidades_lote([50, 100, 200])
+        >>> print(resultados[1]['productos_kg']['Arroz blanco'])
+        10.0
+    """
+    filas_kg, filas_unidades = CATALOGO.escalar_lote(lista_personas)
     
-    return {
-        'productos_kg': productos_kg,
-        'productos_unidades': productos_unidades,
-        'total_personas': personas
-    }
+    return [
+        _resultado(personas, fila_kg, fila_unidades)
+        for personas, fila_kg, fila_unidades in zip(lista_personas, filas_kg, filas_unidades)
+    ]
 
 
-def formatear_resultados(resultado, formato='texto'):
+def documento_resultados(resultado):
     """
-    Formatea los resultados para mostrarlos.
+    Estructura el resultado de calcular_cantidades_comida() para renderizarlo.
     
     Args:
         resultado (dict): Resultado de calcular_cantidades_comida()
-        formato (str): 'texto', 'markdown', 'html' o 'lista'
         
     Returns:
-        str o list: Resultados formateados según el formato especificado
-    """
-    personas = resultado['total_personas']
-    productos_kg = resultado['productos_kg']
-    productos_unidades = resultado['productos_unidades']
-    
-    # Categorías para organizar
-    categorias = {
-        "🍚 ARROCES": ["Arroz blanco", "Arroz moro", "Arroz con leche"],
-        "🫘 GRANOS": ["Frijoles"],
-        "🍖 CARNES Y AVES": [
-            "Carne de cerdo/Fricasé sin hueso",
-            "Carne de cerdo/Fricasé con hueso",
-            "Pollo/Menudo para sopa",
-            "Pollo",
-            "Carne de res en salsa",
-            "Carne de res en ropa vieja",
-            "Hígado"
-        ],
-        "🍔 PICADILLOS Y ELABORADOS": [
-            "Picadillo",
-            "Picadillo para albóndiga",
-            "Albóndiga",
-            "Croquetas (3u)",
-            "Croquetas (4u)",
-            "Hamburguesa de pollo c/queso"
-        ],
-        "🐟 PESCADO": ["Pescado frito", "Pescado aporreado"],
-        "🥓 EMBUTIDOS": ["Jamón meriendas", "Jamón desayuno"],
-        "🍝 PASTAS": ["Espaguetis Napolitanos", "Espaguetis para ensalada"],
-        "🥔 VIANDAS": ["Plátano", "Papa", "Boniato", "Calabaza", "Yuca"],
-        "🥗 VEGETALES": ["Tomate", "Col"],
-        "🍮 POSTRES": ["Natilla", "Gelatina", "Dulces de latas"],
-        "🧀 LÁCTEOS": [
-            "Queso para meriendas",
-            "Queso para desayuno (Gouda)",
-            "Queso para espaguetis",
-            "Mantequilla"
-        ],
-        "🥫 CONDIMENTOS": ["Mayonesa"]
-    }
+        Documento: Representación intermedia común a todos los formatos
+    """
+    secciones, filas = _secciones_dict(resultado['productos_kg'], resultado['productos_unidades'])
+    return _documento_cantidades(resultado['total_personas'], secciones, filas)
+
+
+def documento_personas(personas):
+    """
+    Igual que documento_resultados(calcular_cantidades_comida(personas)), pero
+    recorre directamente las listas planas de escalar() sin crear los dicts.
     
-    if formato == 'lista':
-        # Devuelve una lista de diccionarios (útil para APIs/JSON)
-        lista = []
-        for categoria, productos in categorias.items():
-            for producto in productos:
-                if producto in productos_kg:
-                    lista.append({
-                        'categoria': categoria,
-                        'producto': producto,
-                        'cantidad': productos_kg[producto],
-                        'unidad': 'kg'
-                    })
-        
-        for producto, cantidad in productos_unidades.items():
-            lista.append({
-                'categoria': '🥚 PRODUCTOS POR UNIDADES',
-                'producto': producto,
-                'cantidad': cantidad,
-                'unidad': 'unidades'
-            })
+    Args:
+        personas (int): Número de personas
         
-        return lista
-    
-    # Formato texto común
-    lineas = []
-    
-    if formato == 'markdown':
-        lineas.append(f"**📊 CANTIDADES PARA {personas} PERSONAS**")
-        lineas.append(f"*(Producto crudo)*\n")
-    elif formato == 'html':
-        lineas.append(f"<b>📊 CANTIDADES PARA {personas} PERSONAS</b>")
-        lineas.append(f"<i>(Producto crudo)</i>\n")
-    else:
-        lineas.append(f"📊 CANTIDADES PARA {personas} PERSONAS")
-        lineas.append(f"(Producto crudo)\n")
-    
-    for categoria, productos in categorias.items():
-        tiene_productos = False
-        items = []
+    Returns:
+        Documento: Representación intermedia común a todos los formatos
+    """
+    secciones, filas = _secciones_listas(*CATALOGO.escalar(personas))
+    return _documento_cantidades(personas, secciones, filas)
+
+
+def _documento_cantidades(personas, secciones, filas):
+    return Documento(
+        titulo=f"📊 CANTIDADES PARA {personas} PERSONAS",
+        subtitulo="(Producto crudo)",
+        secciones=tuple(secciones),
+        columnas=COLUMNAS_RESULTADOS,
+        filas=tuple(filas)
+    )
+
+
+def _secciones_listas(cantidades_kg, cantidades_unidades):
+    # Listas planas de escalar(): las posiciones ya están resueltas
+    secciones = [
+        Seccion(categoria, tuple(crear_item(producto, cantidades_kg[i], 'kg') for producto, i in productos))
+        for categoria, productos in SECCIONES_KG
+    ]
+    if cantidades_unidades:
+        secciones.append(Seccion(CATEGORIA_UNIDADES, tuple(
+            crear_item(producto, cantidades_unidades[j], 'unidades') for producto, j in ORDEN_UNIDADES
+        )))
+    
+    return secciones, _filas_listas(cantidades_kg, cantidades_unidades)
+
+
+def _filas_listas(cantidades_kg, cantidades_unidades):
+    # Filas tabulares de las mismas listas; documentos_lote() solo necesita estas
+    filas = [(categoria, producto, cantidades_kg[i], 'kg') for categoria, producto, i in ORDEN_FILAS_KG]
+    filas.extend(
+        (CATEGORIA_UNIDADES, producto, cantidad, 'unidades')
+        for producto, cantidad in zip(CATALOGO.nombres_unidades, cantidades_unidades)
+    )
+    return filas
+
+
+def _secciones_dict(productos_kg, productos_unidades):
+    # Resultados en forma de dict (p. ej. construidos a mano): solo los productos presentes
+    secciones = []
+    filas = []
+    
+    for categoria, productos in CATEGORIAS.items():
+        items = tuple(
+            crear_item(producto, productos_kg[producto], 'kg')
+            for producto in productos
+            if producto in productos_kg
+        )
+        if items:
+            secciones.append(Seccion(categoria, items))
+            filas.extend((categoria, item.nombre, item.cantidad, item.unidad) for item in items)
+    
+    if productos_unidades:
+        secciones.append(Seccion(CATEGORIA_UNIDADES, tuple(
+            crear_item(producto, unidades, 'unidades')
+            for producto, unidades in sorted(productos_unidades.items())
+        )))
+        filas.extend(
+            (CATEGORIA_UNIDADES, producto, cantidad, 'unidades')
+            for producto, cantidad in productos_unidades.items()
+        )
+    
+    return secciones, filas
+
+
+def documento_preparacion(resultado):
+    """
+    Estructura el resultado de calcular_preparacion_especifica() para renderizarlo.
+    
+    Args:
+        resultado (dict): Resultado de calcular_preparacion_especifica()
         
-        for producto in productos:
-            if producto in productos_kg:
-                tiene_productos = True
-                kg = productos_kg[producto]
-                items.append(f"  • {producto}: {kg} kg")
+    Returns:
+        Documento: Representación intermedia común a todos los formatos
+    """
+    preparacion = resultado['preparacion']
+    ingredientes = resultado['ingredientes']
+    unidades = {ingrediente: unidad_ingrediente(ingrediente) for ingrediente in ingredientes}
+    
+    items = tuple(
+        crear_item(ingrediente, cantidad, unidades[ingrediente])
+        for ingrediente, cantidad in sorted(ingredientes.items())
+    )
+    
+    return Documento(
+        titulo=f"🍳 {preparacion.upper()} - {resultado['personas']} PERSONAS",
+        subtitulo=None,
+        secciones=(Seccion(None, items),),
+        columnas=('preparacion', 'ingrediente', 'cantidad', 'unidad'),
+        filas=tuple(
+            (preparacion, ingrediente, cantidad, unidades[ingrediente])
+            for ingrediente, cantidad in ingredientes.items()
+        ),
+        destacar_items=True
+    )
+
+
+def documento_ingredientes(preparaciones):
+    """
+    Estructura el resultado de calcular_ingredientes_preparacion() para renderizarlo.
+    
+    Args:
+        preparaciones (dict): Resultado de calcular_ingredientes_preparacion()
         
-        if tiene_productos:
-            if formato == 'markdown':
-                lineas.append(f"\n**{categoria}**")
-            elif formato == 'html':
-                lineas.append(f"\n<b>{categoria}</b>")
-            else:
-                lineas.append(f"\n{categoria}")
-            lineas.extend(items)
-    
-    # Productos por unidades
-    if productos_unidades:
-        if formato == 'markdown':
-            lineas.append(f"\n**🥚 PRODUCTOS POR UNIDADES**")
-        elif formato == 'html':
-            lineas.append(f"\n<b>🥚 PRODUCTOS POR UNIDADES</b>")
-        else:
-            lineas.append(f"\n🥚 PRODUCTOS POR UNIDADES")
+    Returns:
+        Documento: Representación intermedia común a todos los formatos
+    """
+    unidades = {
+        ingrediente: unidad_ingrediente(ingrediente)
+        for ingredientes in preparaciones.values()
+        for ingrediente in ingredientes
+    }
+    
+    secciones = tuple(
+        Seccion(f"{preparacion}:", tuple(
+            crear_item(ingrediente, cantidad, unidades[ingrediente])
+            for ingrediente, cantidad in sorted(ingredientes.items())
+        ))
+        for preparacion, ingredientes in sorted(preparaciones.items())
+    )
+    
+    return Documento(
+        titulo="👨‍🍳 INGREDIENTES POR PREPARACIÓN",
+        subtitulo=None,
+        secciones=secciones,
+        columnas=('preparacion', 'ingrediente', 'cantidad', 'unidad'),
+        filas=tuple(
+            (preparacion, ingrediente, cantidad, unidades[ingrediente])
+            for preparacion, ingredientes in preparaciones.items()
+            for ingrediente, cantidad in ingredientes.items()
+        )
+    )
+
+
+def documento_menu(menu):
+    """
+    Estructura el resultado de calcular_menu() para renderizarlo.
+    
+    Args:
+        menu (dict): Resultado de calcular_menu()
         
-        for producto, unidades in sorted(productos_unidades.items()):
-            lineas.append(f"  • {producto}: {unidades} unidades")
+    Returns:
+        Documento: Lista de compra agrupada por categoría de ingrediente
+    """
+    totales = menu['totales']
+    categorias = {}
+    for ingrediente, total in sorted(totales.items()):
+        categorias.setdefault(total['categoria'], []).append(
+            crear_item(ingrediente, total['cantidad'], total['unidad'])
+        )
+    
+    return Documento(
+        titulo="🛒 LISTA DE COMPRA DEL MENÚ",
+        subtitulo=f"{sum(menu['raciones'].values())} raciones en {menu['entradas']} entradas",
+        secciones=tuple(
+            Seccion(f"{categoria}:", tuple(items))
+            for categoria, items in sorted(categorias.items())
+        ),
+        columnas=('categoria', 'ingrediente', 'cantidad', 'unidad'),
+        filas=tuple(
+            (total['categoria'], ingrediente, total['cantidad'], total['unidad'])
+            for ingrediente, total in totales.items()
+        )
+    )
+
+
+def formatear_resultados(resultado, formato='texto'):
+    """
+    Formatea los resultados para mostrarlos.
     
-    return '\n'.join(lineas)
+    Args:
+        resultado (dict): Resultado de calcular_cantidades_comida()
+        formato (str): 'texto', 'markdown', 'html', 'lista' o 'csv'
+        
+    Returns:
+        str o Filas: Resultados formateados según el formato especificado
+    """
+    return renderizar(documento_resultados(resultado), formato)
 
 
 def obtener_producto_especifico(personas, nombre_producto):
@@ -222,22 +312,31 @@ def obtener_producto_especifico(personas, nombre_producto):
     Returns:
         dict: {'producto': str, 'cantidad': float, 'unidad': str} o None si no existe
     """
-    resultado = calcular_cantidades_comida(personas)
+    calculado = CATALOGO.cantidad(nombre_producto, personas)
     
-    if nombre_producto in resultado['productos_kg']:
-        return {
-            'producto': nombre_producto,
-            'cantidad': resultado['productos_kg'][nombre_producto],
-            'unidad': 'kg'
-        }
-    elif nombre_producto in resultado['productos_unidades']:
-        return {
-            'producto': nombre_producto,
-            'cantidad': resultado['productos_unidades'][nombre_producto],
-            'unidad': 'unidades'
-        }
+    if calculado is None:
+        return None
     
-    return None
+    cantidad, unidad = calculado
+    return {
+        'producto': nombre_producto,
+        'cantidad': cantidad,
+        'unidad': unidad
+    }
+
+
+def obtener_productos_especificos(personas, nombres_productos):
+    """
+    Obtiene la cantidad de varios productos en una sola llamada.
+    
+    Args:
+        personas (int): Número de personas
+        nombres_productos (list): Nombres exactos de los productos
+        
+    Returns:
+        list: Un resultado por nombre, en el mismo orden, con None para los que no existen
+    """
+    return [obtener_producto_especifico(personas, nombre) for nombre in nombres_productos]
 
 
 def listar_productos_disponibles():
@@ -247,9 +346,7 @@ def listar_productos_disponibles():
     Returns:
         list: Lista de nombres de productos
     """
-    resultado = calcular_cantidades_comida(1)
-    productos = list(resultado['productos_kg'].keys()) + list(resultado['productos_unidades'].keys())
-    return sorted(productos)
+    return list(CATALOGO.nombres_ordenados)
 
 
 def obtener_preparaciones_disponibles():
@@ -259,19 +356,7 @@ def obtener_preparaciones_disponibles():
     Returns:
         list: Lista de nombres de preparaciones
     """
-    preparaciones = {
-        "Arroz blanco": {},
-        "Arroz moro": {},
-        "Frijoles negros": {},
-        "Pollo frito": {},
-        "Picadillo": {},
-        "Espaguetis Napolitanos": {},
-        "Plátanos maduros fritos": {},
-        "Viandas hervidas (Papa/Yuca/Boniato)": {},
-        "Ensalada de col": {},
-        "Huevos revueltos": {},
-    }
-    return sorted(preparaciones.keys())
+    return list(RECETARIO.nombres_ordenados)
 
 
 def calcular_preparacion_especifica(personas, nombre_preparacion):
@@ -288,18 +373,34 @@ def calcular_preparacion_especifica(personas, nombre_preparacion):
     Ejemplo:
         >>> resultado = calcular_preparacion_especifica(50, "Espaguetis Napolitanos")
     """
-    todas_preparaciones = calcular_ingredientes_preparacion(personas)
+    ingredientes = RECETARIO.calcular(nombre_preparacion, personas)
     
-    if nombre_preparacion in todas_preparaciones:
+    if ingredientes is not None:
         return {
             'preparacion': nombre_preparacion,
             'personas': personas,
-            'ingredientes': todas_preparaciones[nombre_preparacion]
+            'ingredientes': ingredientes
         }
     
     return None
 
 
+def calcular_preparaciones(personas, nombres_preparaciones):
+    """
+    Calcula los ingredientes de varias preparaciones en una sola llamada.
+    
+    Solo se calculan las preparaciones pedidas; los nombres que no existen se ignoran.
+    
+    Args:
+        personas (int): Número de personas
+        nombres_preparaciones (list): Nombres exactos de las preparaciones
+        
+    Returns:
+        dict: Preparaciones pedidas y sus ingredientes con cantidades
+    """
+    return RECETARIO.calcular_varias(nombres_preparaciones, personas)
+
+
 def calcular_refresco(personas):
     """
     Calcula la cantidad de refresco necesaria (8 onzas por persona convertidas a litros).
@@ -331,61 +432,15 @@ def formatear_preparacion_especifica(resultado, formato='texto'):
     
     Args:
         resultado (dict): Resultado de calcular_preparacion_especifica()
-        formato (str): 'texto', 'markdown', 'html' o 'lista'
+        formato (str): 'texto', 'markdown', 'html', 'lista' o 'csv'
         
     Returns:
-        str o list: Resultado formateado
+        str o Filas: Resultado formateado
     """
     if not resultado:
         return "Preparación no encontrada"
     
-    preparacion = resultado['preparacion']
-    personas = resultado['personas']
-    ingredientes = resultado['ingredientes']
-    
-    if formato == 'lista':
-        lista = []
-        for ingrediente, cantidad in ingredientes.items():
-            # Detectar unidad
-            if ingrediente == "Huevos":
-                unidad = "unidades"
-            elif "Agua" in ingrediente or "Vinagre" in ingrediente:
-                unidad = "litros"
-            else:
-                unidad = "kg"
-            
-            lista.append({
-                'preparacion': preparacion,
-                'ingrediente': ingrediente,
-                'cantidad': cantidad,
-                'unidad': unidad
-            })
-        return lista
-    
-    lineas = []
-    
-    if formato == 'markdown':
-        lineas.append(f"**🍳 {preparacion.upper()} - {personas} PERSONAS**\n")
-    elif formato == 'html':
-        lineas.append(f"<b>🍳 {preparacion.upper()} - {personas} PERSONAS</b>\n")
-    else:
-        lineas.append(f"🍳 {preparacion.upper()} - {personas} PERSONAS\n")
-    
-    for ingrediente, cantidad in sorted(ingredientes.items()):
-        # Detectar unidad apropiada
-        if ingrediente == "Huevos":
-            unidad = "unidades"
-        elif "Agua" in ingrediente or "Vinagre" in ingrediente:
-            unidad = "litros"
-        else:
-            unidad = "kg"
-        
-        if formato == 'markdown':
-            lineas.append(f"  • **{ingrediente}:** {cantidad} {unidad}")
-        else:
-            lineas.append(f"  • {ingrediente}: {cantidad} {unidad}")
-    
-    return '\n'.join(lineas)
+    return renderizar(documento_preparacion(resultado), formato)
 
 
 def calcular_ingredientes_preparacion(personas):
@@ -402,94 +457,7 @@ def calcular_ingredientes_preparacion(personas):
         >>> ingredientes = calcular_ingredientes_preparacion(50)
         >>> print(ingredientes['Arroz blanco'])
     """
-    
-    preparaciones = {
-        "Arroz blanco": {
-            "Arroz": 100 * personas / 1000,  # kg
-            "Agua": 200 * personas / 1000,  # litros (2:1 agua/arroz)
-            "Aceite": 5 * personas / 1000,  # kg
-            "Sal": 2 * personas / 1000,  # kg
-        },
-        "Arroz moro": {
-            "Arroz crudo": 52 * personas / 1000,  # kg
-            "Frijol seco": 26 * personas / 1000,  # kg
-            "Agua": 150 * personas / 1000,  # litros
-            "Aceite": 3 * personas / 1000,  # kg
-            "Cebolla": 10 * personas / 1000,  # kg
-            "Ajo": 2 * personas / 1000,  # kg
-            "Pimiento": 5 * personas / 1000,  # kg
-            "Sal": 1.5 * personas / 1000,  # kg
-        },
-        "Frijoles negros": {
-            "Frijoles (secos)": 45 * personas / 1000,  # kg
-            "Agua": 180 * personas / 1000,  # litros (4:1 agua/frijoles)
-            "Aceite": 3 * personas / 1000,  # kg
-            "Cebolla": 15 * personas / 1000,  # kg
-            "Ajo": 3 * personas / 1000,  # kg
-            "Pimiento": 10 * personas / 1000,  # kg
-            "Sal": 2 * personas / 1000,  # kg
-            "Comino": 0.5 * personas / 1000,  # kg
-        },
-        "Pollo frito": {
-            "Pollo (crudo)": 250 * personas / 1000,  # kg
-            "Aceite para freír": 50 * personas / 1000,  # kg
-            "Sal": 2 * personas / 1000,  # kg
-            "Ajo": 2 * personas / 1000,  # kg
-            "Limón": 10 * personas / 1000,  # kg
-        },
-        "Picadillo": {
-            "Carne molida": 100 * personas / 1000,  # kg
-            "Aceite": 5 * personas / 1000,  # kg
-            "Cebolla": 20 * personas / 1000,  # kg
-            "Ajo": 3 * personas / 1000,  # kg
-            "Pimiento": 15 * personas / 1000,  # kg
-            "Tomate": 30 * personas / 1000,  # kg
-            "Sal": 1.5 * personas / 1000,  # kg
-            "Comino": 0.5 * personas / 1000,  # kg
-        },
-        "Espaguetis Napolitanos": {
-            "Espaguetis (secos)": 75 * personas / 1000,  # kg
-            "Agua": 150 * personas / 1000,  # litros
-            "Salsa de tomate": 40 * personas / 1000,  # kg
-            "Aceite": 5 * personas / 1000,  # kg
-            "Cebolla": 15 * personas / 1000,  # kg
-            "Ajo": 2 * personas / 1000,  # kg
-            "Sal": 2 * personas / 1000,  # kg
-            "Queso rallado": 58 * personas / 1000,  # kg (para servir)
-        },
-        "Plátanos maduros fritos": {
-            "Plátano maduro": 150 * personas / 1000,  # kg
-            "Aceite para freír": 30 * personas / 1000,  # kg
-            "Sal (opcional)": 0.5 * personas / 1000,  # kg
-        },
-        "Viandas hervidas (Papa/Yuca/Boniato)": {
-            "Vianda (papa/yuca/boniato)": 150 * personas / 1000,  # kg
-            "Agua": 200 * personas / 1000,  # litros
-            "Sal": 2 * personas / 1000,  # kg
-        },
-        "Ensalada de col": {
-            "Col": 150 * personas / 1000,  # kg
-            "Tomate": 50 * personas / 1000,  # kg
-            "Cebolla": 20 * personas / 1000,  # kg
-            "Aceite": 5 * personas / 1000,  # kg
-            "Vinagre": 3 * personas / 1000,  # litros
-            "Sal": 1 * personas / 1000,  # kg
-        },
-        "Huevos revueltos": {
-            "Huevos": 1.5 * personas,  # unidades
-            "Aceite": 3 * personas / 1000,  # kg
-            "Cebolla": 10 * personas / 1000,  # kg
-            "Sal": 1 * personas / 1000,  # kg
-        },
-    }
-    
-    # Redondear valores
-    for preparacion in preparaciones:
-        for ingrediente in preparaciones[preparacion]:
-            valor = preparaciones[preparacion][ingrediente]
-            preparaciones[preparacion][ingrediente] = round(valor, 3)
-    
-    return preparaciones
+    return RECETARIO.calcular_varias(RECETARIO.nombres, personas)
 
 
 def formatear_ingredientes_preparacion(preparaciones, formato='texto'):
@@ -498,93 +466,146 @@ def formatear_ingredientes_preparacion(preparaciones, formato='texto'):
     
     Args:
         preparaciones (dict): Resultado de calcular_ingredientes_preparacion()
-        formato (str): 'texto', 'markdown', 'html' o 'lista'
+        formato (str): 'texto', 'markdown', 'html', 'lista' o 'csv'
         
     Returns:
-        str o list: Ingredientes formateados
-    """
-    
-    if formato == 'lista':
-        lista = []
-        for preparacion, ingredientes in preparaciones.items():
-            for ingrediente, cantidad in ingredientes.items():
-                # Detectar unidad
-                if ingrediente == "Huevos":
-                    unidad = "unidades"
-                elif "Agua" in ingrediente or "Vinagre" in ingrediente:
-                    unidad = "litros"
-                else:
-                    unidad = "kg"
-                
-                lista.append({
-                    'preparacion': preparacion,
-                    'ingrediente': ingrediente,
-                    'cantidad': cantidad,
-                    'unidad': unidad
-                })
-        return lista
-    
-    lineas = []
-    
-    if formato == 'markdown':
-        lineas.append("**👨‍🍳 INGREDIENTES POR PREPARACIÓN**\n")
-    elif formato == 'html':
-        lineas.append("<b>👨‍🍳 INGREDIENTES POR PREPARACIÓN</b>\n")
-    else:
-        lineas.append("👨‍🍳 INGREDIENTES POR PREPARACIÓN\n")
-    
-    for preparacion, ingredientes in sorted(preparaciones.items()):
-        if formato == 'markdown':
-            lineas.append(f"\n**{preparacion}:**")
-        elif formato == 'html':
-            lineas.append(f"\n<b>{preparacion}:</b>")
+        str o Filas: Ingredientes formateados
+    """
+    return renderizar(documento_ingredientes(preparaciones), formato)
+
+
+def documentos_lote(lista_personas, tipo='productos', bloque=1000):
+    """
+    Genera los documentos de un lote de cantidades de personas sin tenerlos todos en memoria.
+    
+    Los productos se calculan por bloques vectorizados sobre el catálogo y sus
+    filas salen de cada fila del lote con las mismas filas que
+    documento_personas(). Los documentos solo llevan filas (los formatos de
+    flujo son tabulares) y se descartan en cuanto se han renderizado.
+    
+    Args:
+        lista_personas (list): Números de personas
+        tipo (str): 'productos' o 'ingredientes'
+        bloque (int): Entradas calculadas a la vez
+        
+    Yields:
+        tuple: ((personas,), Documento) por cada entrada
+    """
+    for inicio in range(0, len(lista_personas), bloque):
+        parte = lista_personas[inicio:inicio + bloque]
+        if tipo == 'productos':
+            filas_kg, filas_unidades = CATALOGO.escalar_lote(parte)
+            for personas, fila_kg, fila_unidades in zip(parte, filas_kg, filas_unidades):
+                filas = _filas_listas(fila_kg, fila_unidades)
+                yield (personas,), Documento(None, None, (), COLUMNAS_RESULTADOS, tuple(filas))
         else:
-            lineas.append(f"\n{preparacion}:")
+            for personas in parte:
+                yield (personas,), documento_ingredientes(calcular_ingredientes_preparacion(personas))
+
+
+def calcular_menu(entradas, unidades_destino=None):
+    """
+    Calcula la lista de compra consolidada de un menú.
+    
+    Los ingredientes que se repiten en varias preparaciones (cebolla, ajo,
+    aceite, sal...) se suman en una sola línea con su unidad de ficha.
+    
+    Args:
+        entradas (list): EntradaMenu (ver utils.menu.leer_entradas)
+        unidades_destino (dict): Unidad de salida opcional por ingrediente
         
-        for ingrediente, cantidad in sorted(ingredientes.items()):
-            # Detectar unidad apropiada
-            if ingrediente == "Huevos":
-                unidad = "unidades"
-            elif "Agua" in ingrediente or "Vinagre" in ingrediente:
-                unidad = "litros"
-            else:
-                unidad = "kg"
-            
-            lineas.append(f"  • {ingrediente}: {cantidad} {unidad}")
+    Returns:
+        dict: Totales por ingrediente y desglose por preparación
     
-    return '\n'.join(lineas)
+    Ejemplo:
+        >>> menu = calcular_menu([EntradaMenu('Arroz blanco', 50, 2, 30)])
+        >>> print(menu['totales']['Arroz'])
+        {'cantidad': 300.0, 'unidad': 'kg', 'categoria': 'Granos'}
+    """
+    # La matriz del menú se compila en el primer menú, no al importar el módulo
+    try:
+        from utils.menu import MATRIZ_MENU
+    except ImportError:  # Ejecución directa del módulo
+        from menu import MATRIZ_MENU
+    return MATRIZ_MENU.agregar(entradas, unidades_destino)
+
 
+def formatear_menu(menu, formato='texto'):
+    """
+    Formatea la lista de compra de un menú.
+    
+    Args:
+        menu (dict): Resultado de calcular_menu()
+        formato (str): 'texto', 'markdown', 'html', 'lista' o 'csv'
+        
+    Returns:
+        str o Filas: Lista de compra formateada
+    """
+    return renderizar(documento_menu(menu), formato)
+
+
+def resultados_formateados(personas, formato='texto'):
+    """
+    Calcula y formatea las cantidades para N personas usando la caché LRU.
+    
+    Args:
+        personas (int): Número de personas
+        formato (str): 'texto', 'markdown', 'html', 'lista' o 'csv'
+        
+    Returns:
+        str o Filas: Igual que formatear_resultados(), pero de solo lectura
+    """
+    return CACHE_FORMATOS.obtener(
+        ('formatear_resultados', personas, formato),
+        lambda: renderizar(documento_personas(personas), formato)
+    )
 
-# Ejemplo de uso directo
+
+def ingredientes_formateados(personas, formato='texto'):
+    """
+    Calcula y formatea los ingredientes de todas las preparaciones usando la caché LRU.
+    
+    Args:
+        personas (int): Número de personas
+        formato (str): 'texto', 'markdown', 'html', 'lista' o 'csv'
+        
+    Returns:
+        str o Filas: Igual que formatear_ingredientes_preparacion(), pero de solo lectura
+    """
+    return CACHE_FORMATOS.obtener(
+        ('formatear_ingredientes_preparacion', personas, formato),
+        lambda: formatear_ingredientes_preparacion(
+            calcular_ingredientes_preparacion(personas), formato=formato
+        )
+    )
+
+
+def preparacion_formateada(personas, nombre_preparacion, formato='texto'):
+    """
+    Calcula y formatea una preparación específica usando la caché LRU.
+    
+    Args:
+        personas (int): Número de personas
+        nombre_preparacion (str): Nombre exacto de la preparación
+        formato (str): 'texto', 'markdown', 'html', 'lista' o 'csv'
+        
+    Returns:
+        str o Filas: Igual que formatear_preparacion_especifica(), pero de solo lectura
+    """
+    return CACHE_FORMATOS.obtener(
+        ('formatear_preparacion_especifica', personas, formato, nombre_preparacion),
+        lambda: formatear_preparacion_especifica(
+            calcular_preparacion_especifica(personas, nombre_preparacion), formato=formato
+        )
+    )
+
+
+# Uso directo: modo por lotes (ver utils/planificacion.py)
 if __name__ == "__main__":
-    # Ejemplo 1: Calcular para 50 personas
-    print("=== EJEMPLO 1: Cálculo básico ===")
-    resultado = calcular_cantidades_comida(50)
-    print(formatear_resultados(resultado))
-    
-    # Ejemplo 2: Formato markdown (para Telegram)
-    print("\n\n=== EJEMPLO 2: Formato Markdown ===")
-    print(formatear_resultados(resultado, formato='markdown'))
-    
-    # Ejemplo 3: Obtener producto específico
-    print("\n\n=== EJEMPLO 3: Producto específico ===")
-    arroz = obtener_producto_especifico(50, "Arroz blanco")
-    print(f"Para 50 personas necesitas: {arroz['cantidad']} {arroz['unidad']} de {arroz['producto']}")
-    
-    # Ejemplo 4: Lista de productos
-    print("\n\n=== EJEMPLO 4: Formato lista (para JSON/API) ===")
-    resultado_lista = calcular_cantidades_comida(20)
-    lista = formatear_resultados(resultado_lista, formato='lista')
-    print(f"Total de productos: {len(lista)}")
-    print("Primeros 3 productos:")
-    for item in lista[:3]:
-        print(f"  {item}")
-    
-    # Ejemplo 5: Ingredientes para preparaciones
-    print("\n\n=== EJEMPLO 5: Ingredientes para preparaciones ===")
-    ingredientes = calcular_ingredientes_preparacion(50)
-    print(formatear_ingredientes_preparacion(ingredientes))
-    
-    # Ejemplo 6: Ingredientes formato markdown
-    print("\n\n=== EJEMPLO 6: Ingredientes Markdown ===")
-    print(formatear_ingredientes_preparacion(ingredientes, formato='markdown'))
\ No newline at end of file
+    import sys
+    from pathlib import Path
+    
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    from utils.planificacion import main
+    
+    sys.exit(main())
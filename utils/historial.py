@@ -0,0 +1,551 @@
+"""
+Historial persistente de cálculos en SQLite (modo WAL).
+
+Cada cálculo atendido se guarda con su fecha, tipo, evento opcional,
+número de personas y las cantidades resultantes. Las peticiones solo
+encolan el resultado; un hilo escritor lo convierte en filas y las
+escribe por lotes, en una transacción por lote.
+
+Además de las cantidades de cada cálculo se mantienen resúmenes por
+producto y día y por producto y mes, así que los totales de un año de
+historial salen de unos miles de filas en vez de millones.
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from utils.catalogo import unidad_ingrediente
+
+# Base de datos del historial; FOODCALC_HISTORIAL=0 lo desactiva
+RUTA_HISTORIAL = os.environ.get(
+    'FOODCALC_HISTORIAL', str(Path.home() / '.foodcalc' / 'historial.db')
+)
+
+# Máximo de cálculos que se devuelven en un listado
+MAX_LISTADO = 1000
+
+# Agrupaciones admitidas en los totales, además de por producto
+AGRUPACIONES = ('dia', 'mes', 'evento', 'tipo')
+
+REGISTRO_HISTORIAL = logging.getLogger('foodcalc.historial')
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS calculos (
+    id INTEGER PRIMARY KEY,
+    fecha TEXT NOT NULL,
+    tipo TEXT NOT NULL,
+    evento TEXT NOT NULL,
+    personas INTEGER NOT NULL,
+    parametros TEXT
+);
+CREATE TABLE IF NOT EXISTS cantidades (
+    calculo_id INTEGER NOT NULL REFERENCES calculos(id),
+    fecha TEXT NOT NULL,
+    preparacion TEXT NOT NULL,
+    producto TEXT NOT NULL,
+    cantidad REAL NOT NULL,
+    unidad TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS totales_dia (
+    periodo TEXT NOT NULL,
+    tipo TEXT NOT NULL,
+    evento TEXT NOT NULL,
+    producto TEXT NOT NULL,
+    unidad TEXT NOT NULL,
+    cantidad REAL NOT NULL,
+    calculos INTEGER NOT NULL,
+    PRIMARY KEY (producto, unidad, periodo, tipo, evento)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS totales_mes (
+    periodo TEXT NOT NULL,
+    tipo TEXT NOT NULL,
+    evento TEXT NOT NULL,
+    producto TEXT NOT NULL,
+    unidad TEXT NOT NULL,
+    cantidad REAL NOT NULL,
+    calculos INTEGER NOT NULL,
+    PRIMARY KEY (producto, unidad, periodo, tipo, evento)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS calculos_fecha ON calculos(fecha);
+CREATE INDEX IF NOT EXISTS calculos_personas ON calculos(personas);
+CREATE INDEX IF NOT EXISTS calculos_evento ON calculos(evento, fecha);
+CREATE INDEX IF NOT EXISTS cantidades_calculo ON cantidades(calculo_id);
+CREATE INDEX IF NOT EXISTS cantidades_producto ON cantidades(producto, fecha, unidad, cantidad);
+CREATE INDEX IF NOT EXISTS totales_dia_periodo ON totales_dia(periodo);
+CREATE INDEX IF NOT EXISTS totales_mes_periodo ON totales_mes(periodo);
+"""
+
+
+def _lineas_productos(resultado):
+    for producto, cantidad in resultado['productos_kg'].items():
+        yield '', producto, cantidad, 'kg'
+    for producto, cantidad in resultado['productos_unidades'].items():
+        yield '', producto, cantidad, 'unidades'
+
+
+def _lineas_refresco(litros):
+    yield '', 'Refresco', litros, 'litros'
+
+
+def _lineas_preparaciones(preparaciones):
+    for preparacion, ingredientes in preparaciones.items():
+        for ingrediente, cantidad in ingredientes.items():
+            yield preparacion, ingrediente, cantidad, unidad_ingrediente(ingrediente)
+
+
+def _lineas_preparacion(resultado):
+    return _lineas_preparaciones({resultado['preparacion']: resultado['ingredientes']})
+
+
+def _lineas_menu(menu):
+    # Se guardan en la unidad de ficha para que los totales sumen siempre en la misma unidad
+    return _lineas_preparaciones(menu['por_preparacion'])
+
+
+# Filas (preparación, producto, cantidad, unidad) de cada tipo de resultado
+LINEAS = {
+    'productos': _lineas_productos,
+    'refresco': _lineas_refresco,
+    'preparacion': _lineas_preparacion,
+    'preparaciones': _lineas_preparaciones,
+    'menu': _lineas_menu,
+}
+
+
+def _fecha(valor, campo):
+    try:
+        return date.fromisoformat(valor)
+    except (TypeError, ValueError):
+        raise ValueError(f'{campo} debe ser una fecha AAAA-MM-DD') from None
+
+
+def leer_filtros(datos):
+    """
+    Convierte los parámetros de una consulta en filtros validados.
+
+    Args:
+        datos (dict): Parámetros recibidos: 'desde' y 'hasta' (AAAA-MM-DD,
+            ambos incluidos), 'tipo', 'evento', 'personas_min', 'personas_max'
+            y 'producto' (una lista o un solo nombre)
+
+    Returns:
+        dict: Filtros listos para calculos() y totales()
+
+    Raises:
+        ValueError: Si una fecha, un tipo o un número no es válido
+    """
+    filtros = {}
+    for campo in ('desde', 'hasta'):
+        if datos.get(campo):
+            filtros[campo] = _fecha(datos[campo], campo)
+    if 'desde' in filtros and 'hasta' in filtros and filtros['desde'] > filtros['hasta']:
+        raise ValueError('desde no puede ser posterior a hasta')
+
+    tipo = datos.get('tipo')
+    if tipo:
+        if tipo not in LINEAS:
+            raise ValueError(f"Tipo no válido; use uno de: {', '.join(LINEAS)}")
+        filtros['tipo'] = tipo
+    if datos.get('evento') is not None:
+        filtros['evento'] = str(datos['evento'])
+
+    for campo in ('personas_min', 'personas_max'):
+        if datos.get(campo) not in (None, ''):
+            filtros[campo] = int(datos[campo])
+
+    productos = datos.getlist('producto') if hasattr(datos, 'getlist') else datos.get('producto')
+    if isinstance(productos, str):
+        productos = [productos]
+    if productos:
+        filtros['productos'] = list(productos)
+    return filtros
+
+
+class HistorialNoDisponible(Exception):
+    """La base del historial no se pudo abrir y el historial está desactivado"""
+
+
+class HistorialCalculos:
+    """
+    Historial de cálculos sobre una base SQLite.
+
+    El hilo escritor se crea con el primer uso y es él quien abre la base y
+    crea el esquema, así que registrar() nunca toca el disco. Los cálculos
+    pendientes se escriben cuando se juntan `lote` o cuando pasan
+    `intervalo` segundos desde el primero; si se acumulan más de
+    `pendientes` sin escribir, los nuevos se descartan y se cuentan.
+
+    Si la base no se puede abrir, el error se registra una vez y el
+    historial se desactiva: los cálculos se descartan (y se cuentan) y las
+    consultas lanzan HistorialNoDisponible. El cálculo nunca falla por ello.
+    """
+
+    def __init__(self, ruta, lote=500, intervalo=0.5, pendientes=10_000):
+        self.ruta = str(ruta)
+        self.lote = max(1, int(lote))
+        self.intervalo = float(intervalo)
+        self._cola = queue.Queue(maxsize=max(1, int(pendientes)))
+        self._hilo = None
+        self._listo = threading.Event()
+        self._fallido = False
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._escritos = 0
+        self._lotes = 0
+        self._descartados = 0
+        self._errores = 0
+
+    def registrar(self, tipo, personas, resultado, evento=None, parametros=None):
+        """
+        Encola un cálculo para guardarlo; no espera a la escritura.
+
+        Args:
+            tipo (str): Clave de LINEAS ('productos', 'refresco', 'preparacion'...)
+            personas (int): Número de personas del cálculo
+            resultado: Resultado tal como lo devuelve food_calculator;
+                no se debe modificar después de registrarlo
+            evento (str): Nombre opcional del evento
+            parametros (dict): Parámetros de la petición, se guardan como JSON
+        """
+        self._iniciar()
+        with self._lock:
+            if self._fallido:
+                self._descartados += 1
+                return
+            try:
+                self._cola.put_nowait((time.time(), tipo, evento or '', personas, parametros, resultado))
+            except queue.Full:
+                self._descartados += 1
+
+    def vaciar(self, timeout=None):
+        """
+        Espera a que se escriban los cálculos encolados hasta ahora.
+
+        Returns:
+            bool: False si se agotó el tiempo de espera
+        """
+        if self._hilo is None:
+            return True
+        escrito = threading.Event()
+        with self._lock:
+            if self._fallido:
+                return True
+            self._cola.put(escrito)
+        return escrito.wait(timeout)
+
+    def calculos(self, desde=None, hasta=None, tipo=None, evento=None,
+                 personas_min=None, personas_max=None, productos=None, limite=100):
+        """
+        Lista los cálculos más recientes que cumplen los filtros.
+
+        Args:
+            desde, hasta (date): Días inicial y final, ambos incluidos
+            tipo (str): Tipo de cálculo
+            evento (str): Nombre del evento ('' para los cálculos sin evento)
+            personas_min, personas_max (int): Rango de personas
+            productos (list): Solo cálculos que incluyen alguno de estos productos
+            limite (int): Máximo de cálculos devueltos (hasta MAX_LISTADO)
+
+        Returns:
+            list: Dicts con id, fecha, tipo, evento, personas y parametros
+        """
+        condiciones, valores = self._condiciones(
+            'k.fecha', 10, desde, hasta, tipo, evento, personas_min, personas_max
+        )
+        if productos:
+            condiciones.append(
+                'EXISTS (SELECT 1 FROM cantidades c WHERE c.calculo_id = k.id'
+                f" AND c.producto IN ({', '.join('?' * len(productos))}))"
+            )
+            valores.extend(productos)
+        valores.append(max(1, min(int(limite), MAX_LISTADO)))
+
+        filas = self._leer(
+            'SELECT k.id, k.fecha, k.tipo, k.evento, k.personas, k.parametros FROM calculos k'
+            f'{self._donde(condiciones)} ORDER BY k.fecha DESC, k.id DESC LIMIT ?',
+            valores
+        )
+        return [
+            {
+                'id': id_, 'fecha': fecha, 'tipo': tipo, 'evento': evento or None,
+                'personas': personas, 'parametros': json.loads(parametros) if parametros else None,
+            }
+            for id_, fecha, tipo, evento, personas, parametros in filas
+        ]
+
+    def totales(self, desde=None, hasta=None, tipo=None, evento=None,
+                personas_min=None, personas_max=None, productos=None, agrupar=None):
+        """
+        Suma las cantidades de los cálculos que cumplen los filtros.
+
+        Sin filtro de personas la suma sale de los resúmenes por día o por
+        mes; con él se recorren las cantidades de los cálculos de ese rango
+        de personas.
+
+        Args:
+            desde, hasta, tipo, evento, personas_min, personas_max, productos:
+                Filtros, como en calculos()
+            agrupar (str): Agrupación adicional: 'dia', 'mes', 'evento' o 'tipo'
+
+        Returns:
+            list: Dicts con producto, unidad, cantidad y calculos (y el grupo)
+
+        Raises:
+            ValueError: Si la agrupación no es válida
+        """
+        if agrupar is not None and agrupar not in AGRUPACIONES:
+            raise ValueError(f"Agrupación no válida; use una de: {', '.join(AGRUPACIONES)}")
+
+        if personas_min is not None or personas_max is not None:
+            tabla = 'calculos k JOIN cantidades c ON c.calculo_id = k.id'
+            cuenta = 'COUNT(DISTINCT k.id)'
+            grupos = {
+                'dia': 'substr(k.fecha, 1, 10)', 'mes': 'substr(k.fecha, 1, 7)',
+                'evento': 'k.evento', 'tipo': 'k.tipo',
+            }
+            condiciones, valores = self._condiciones(
+                'k.fecha', 10, desde, hasta, tipo, evento, personas_min, personas_max
+            )
+            producto, unidad, cantidad = 'c.producto', 'c.unidad', 'c.cantidad'
+        else:
+            # Los meses completos salen del resumen mensual, el resto del diario
+            mensual = (
+                agrupar != 'dia'
+                and (desde is None or desde.day == 1)
+                and (hasta is None or (hasta + timedelta(days=1)).day == 1)
+            )
+            tabla = 'totales_mes t' if mensual else 'totales_dia t'
+            cuenta = 'SUM(t.calculos)'
+            grupos = {
+                'dia': 't.periodo', 'mes': 't.periodo' if mensual else 'substr(t.periodo, 1, 7)',
+                'evento': 't.evento', 'tipo': 't.tipo',
+            }
+            condiciones, valores = self._condiciones(
+                't.periodo', 7 if mensual else 10, desde, hasta, tipo, evento
+            )
+            producto, unidad, cantidad = 't.producto', 't.unidad', 't.cantidad'
+
+        if productos:
+            condiciones.append(f"{producto} IN ({', '.join('?' * len(productos))})")
+            valores.extend(productos)
+
+        columnas = [producto, unidad]
+        if agrupar is not None:
+            columnas.insert(0, grupos[agrupar])
+        columnas_sql = ', '.join(columnas)
+        filas = self._leer(
+            f'SELECT {columnas_sql}, SUM({cantidad}), {cuenta} FROM {tabla}'
+            f'{self._donde(condiciones)} GROUP BY {columnas_sql} ORDER BY {columnas_sql}',
+            valores
+        )
+
+        totales = []
+        for fila in filas:
+            *claves, suma, calculos = fila
+            total = {}
+            if agrupar is not None:
+                grupo = claves.pop(0)
+                # Los cálculos sin evento se guardan con evento ''
+                total[agrupar] = None if agrupar == 'evento' and not grupo else grupo
+            total.update(producto=claves[0], unidad=claves[1], cantidad=round(suma, 3), calculos=calculos)
+            totales.append(total)
+        return totales
+
+    def estadisticas(self):
+        """
+        Devuelve el estado del escritor.
+
+        Returns:
+            dict: pendientes, escritos, lotes, descartados, errores y
+                disponible (False si la base no se pudo abrir)
+        """
+        with self._lock:
+            return {
+                'disponible': not self._fallido,
+                'pendientes': self._cola.qsize(),
+                'escritos': self._escritos,
+                'lotes': self._lotes,
+                'descartados': self._descartados,
+                'errores': self._errores,
+            }
+
+    @staticmethod
+    def _condiciones(columna_fecha, longitud, desde=None, hasta=None, tipo=None, evento=None,
+                     personas_min=None, personas_max=None):
+        # Las fechas se comparan como texto, recortadas a 'AAAA-MM' o 'AAAA-MM-DD':
+        # una fecha completa del día 'hasta' es menor que el día siguiente
+        prefijo = columna_fecha.split('.')[0]
+        condiciones, valores = [], []
+        if desde is not None:
+            condiciones.append(f'{columna_fecha} >= ?')
+            valores.append(desde.isoformat()[:longitud])
+        if hasta is not None:
+            condiciones.append(f'{columna_fecha} < ?')
+            valores.append((hasta + timedelta(days=1)).isoformat()[:longitud])
+        if tipo is not None:
+            condiciones.append(f'{prefijo}.tipo = ?')
+            valores.append(tipo)
+        if evento is not None:
+            condiciones.append(f'{prefijo}.evento = ?')
+            valores.append(evento)
+        if personas_min is not None:
+            condiciones.append(f'{prefijo}.personas >= ?')
+            valores.append(personas_min)
+        if personas_max is not None:
+            condiciones.append(f'{prefijo}.personas <= ?')
+            valores.append(personas_max)
+        return condiciones, valores
+
+    @staticmethod
+    def _donde(condiciones):
+        return ' WHERE ' + ' AND '.join(condiciones) if condiciones else ''
+
+    def _conectar(self):
+        # Como la base, sqlite3 se carga con el primer uso y no al arrancar
+        import sqlite3
+
+        Path(self.ruta).parent.mkdir(parents=True, exist_ok=True)
+        conexion = sqlite3.connect(self.ruta, timeout=30)
+        conexion.execute('PRAGMA journal_mode=WAL')
+        # En WAL, NORMAL solo sincroniza en los checkpoints: una caída del
+        # sistema puede perder los últimos lotes, pero nunca corrompe la base
+        conexion.execute('PRAGMA synchronous=NORMAL')
+        return conexion
+
+    def _iniciar(self):
+        if self._hilo is not None:
+            return
+        with self._lock:
+            if self._hilo is not None:
+                return
+            hilo = threading.Thread(target=self._escribir, name='historial', daemon=True)
+            hilo.start()
+            self._hilo = hilo
+            atexit.register(self.vaciar, 5)
+
+    def _abrir(self):
+        """Abre la conexión del escritor y crea el esquema; None si falla"""
+        try:
+            conexion = self._conectar()
+            conexion.executescript(ESQUEMA)
+            return conexion
+        except Exception:
+            REGISTRO_HISTORIAL.exception('No se pudo abrir el historial en %s; queda desactivado', self.ruta)
+        # Lo encolado hasta ahora se descarta; después registrar() ya no encola
+        with self._lock:
+            self._fallido = True
+            while True:
+                try:
+                    elemento = self._cola.get_nowait()
+                except queue.Empty:
+                    break
+                if isinstance(elemento, threading.Event):
+                    elemento.set()
+                else:
+                    self._descartados += 1
+        return None
+
+    def _leer(self, sql, valores):
+        self._iniciar()
+        self._listo.wait()
+        if self._fallido:
+            raise HistorialNoDisponible(f'El historial no está disponible: no se pudo abrir {self.ruta}')
+        conexion = getattr(self._local, 'conexion', None)
+        if conexion is None:
+            conexion = self._local.conexion = self._conectar()
+            conexion.execute('PRAGMA query_only=1')
+        return conexion.execute(sql, valores).fetchall()
+
+    def _escribir(self):
+        conexion = self._abrir()
+        self._listo.set()
+        if conexion is None:
+            return
+        while True:
+            registros, avisos = [], []
+            elemento = self._cola.get()
+            limite = time.monotonic() + self.intervalo
+            while True:
+                if isinstance(elemento, threading.Event):
+                    avisos.append(elemento)
+                    break
+                registros.append(elemento)
+                restante = limite - time.monotonic()
+                if len(registros) >= self.lote or restante <= 0:
+                    break
+                try:
+                    elemento = self._cola.get(timeout=restante)
+                except queue.Empty:
+                    break
+
+            if registros:
+                try:
+                    self._guardar(conexion, registros)
+                    with self._lock:
+                        self._escritos += len(registros)
+                        self._lotes += 1
+                except Exception:
+                    REGISTRO_HISTORIAL.exception('No se pudo guardar un lote de %d cálculos', len(registros))
+                    with self._lock:
+                        self._errores += 1
+            for aviso in avisos:
+                aviso.set()
+
+    def _guardar(self, conexion, registros):
+        resumenes = {'totales_dia': {}, 'totales_mes': {}}
+        with conexion:
+            for instante, tipo, evento, personas, parametros, resultado in registros:
+                fecha = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(instante))
+                calculo_id = conexion.execute(
+                    'INSERT INTO calculos (fecha, tipo, evento, personas, parametros) VALUES (?, ?, ?, ?, ?)',
+                    (fecha, tipo, evento, personas,
+                     json.dumps(parametros, ensure_ascii=False) if parametros is not None else None)
+                ).lastrowid
+
+                lineas = list(LINEAS[tipo](resultado))
+                conexion.executemany(
+                    'INSERT INTO cantidades (calculo_id, fecha, preparacion, producto, cantidad, unidad)'
+                    ' VALUES (?, ?, ?, ?, ?, ?)',
+                    [(calculo_id, fecha, preparacion, producto, cantidad, unidad)
+                     for preparacion, producto, cantidad, unidad in lineas]
+                )
+
+                # Un cálculo cuenta una vez por producto aunque el producto
+                # aparezca en varias de sus preparaciones
+                por_producto = {}
+                for _, producto, cantidad, unidad in lineas:
+                    por_producto[producto, unidad] = por_producto.get((producto, unidad), 0) + cantidad
+                for tabla, periodo in (('totales_dia', fecha[:10]), ('totales_mes', fecha[:7])):
+                    resumen = resumenes[tabla]
+                    for (producto, unidad), cantidad in por_producto.items():
+                        clave = (producto, unidad, periodo, tipo, evento)
+                        suma, calculos = resumen.get(clave, (0, 0))
+                        resumen[clave] = (suma + cantidad, calculos + 1)
+
+            for tabla, resumen in resumenes.items():
+                conexion.executemany(
+                    f'INSERT INTO {tabla} (producto, unidad, periodo, tipo, evento, cantidad, calculos)'
+                    ' VALUES (?, ?, ?, ?, ?, ?, ?)'
+                    ' ON CONFLICT (producto, unidad, periodo, tipo, evento) DO UPDATE SET'
+                    ' cantidad = cantidad + excluded.cantidad, calculos = calculos + excluded.calculos',
+                    [clave + valores for clave, valores in resumen.items()]
+                )
+
+
+# Historial del proceso, o None si está desactivado
+HISTORIAL = (
+    HistorialCalculos(
+        RUTA_HISTORIAL,
+        lote=int(os.environ.get('FOODCALC_HISTORIAL_LOTE', 500)),
+        intervalo=float(os.environ.get('FOODCALC_HISTORIAL_INTERVALO', 0.5)),
+        pendientes=int(os.environ.get('FOODCALC_HISTORIAL_PENDIENTES', 10_000))
+    )
+    if RUTA_HISTORIAL not in ('', '0') else None
+)
@@ -0,0 +1,223 @@
+"""
+Agregación de menús: lista de compra consolidada para varias preparaciones,
+comensales, raciones por día y días (p. ej. un mes de comidas en varias sedes).
+
+Las normas del recetario se guardan como una matriz dispersa
+ingrediente × preparación en formato de coordenadas. Un menú se reduce a
+un vector de raciones por preparación y los totales salen de un único
+producto matriz-vector, sin importar cuántas entradas tenga el menú.
+"""
+
+from dataclasses import dataclass
+
+try:
+    from utils.catalogo import RECETARIO
+except ImportError:  # Ejecución directa del módulo
+    from catalogo import RECETARIO
+
+
+@dataclass(frozen=True, slots=True)
+class EntradaMenu:
+    """Una preparación servida a N personas, varias veces al día durante varios días"""
+    preparacion: str
+    personas: int
+    raciones_dia: int = 1
+    dias: int = 1
+
+    @property
+    def raciones(self):
+        return self.personas * self.raciones_dia * self.dias
+
+
+def leer_entradas(datos):
+    """
+    Convierte las entradas recibidas (dicts) en EntradaMenu validadas.
+
+    Args:
+        datos (list): Dicts con 'preparacion', 'personas' y opcionalmente
+            'raciones_dia' y 'dias' (1 por defecto)
+
+    Returns:
+        list: Entradas del menú
+
+    Raises:
+        ValueError: Si falta un campo o algún número no es mayor a 0
+    """
+    if not isinstance(datos, list) or not datos:
+        raise ValueError('Debe indicar una lista de entradas del menú')
+
+    entradas = []
+    for posicion, dato in enumerate(datos):
+        if not isinstance(dato, dict) or not dato.get('preparacion'):
+            raise ValueError(f'Entrada {posicion}: preparación no especificada')
+        entrada = EntradaMenu(
+            preparacion=dato['preparacion'],
+            personas=int(dato.get('personas', 1)),
+            raciones_dia=int(dato.get('raciones_dia', 1)),
+            dias=int(dato.get('dias', 1))
+        )
+        if min(entrada.personas, entrada.raciones_dia, entrada.dias) < 1:
+            raise ValueError(f'Entrada {posicion}: personas, raciones y días deben ser mayores a 0')
+        entradas.append(entrada)
+    return entradas
+
+
+class MatrizMenu:
+    """
+    Matriz dispersa ingrediente × preparación con las normas por persona.
+
+    Cada ingrediente ocupa una sola fila aunque aparezca en varias
+    preparaciones, así que sus cantidades se suman en su unidad de ficha.
+    Las normas se guardan sin dividir (g, ml o unidades) con su divisor,
+    para que una sola entrada dé exactamente lo mismo que RECETARIO.calcular().
+    """
+
+    __slots__ = (
+        'preparaciones', 'indice_preparaciones', 'ingredientes', 'fichas',
+        'filas', 'columnas', 'normas', 'divisores', '_arrays',
+    )
+
+    def __init__(self, recetario):
+        self.preparaciones = recetario.nombres
+        self.indice_preparaciones = {nombre: j for j, nombre in enumerate(self.preparaciones)}
+
+        indice_ingredientes = {}
+        self.fichas = {}
+        filas, columnas, normas, divisores = [], [], [], []
+
+        for j, preparacion in enumerate(self.preparaciones):
+            nombres, normas_receta, dividir_entre_mil = recetario.recetas[preparacion]
+            for nombre, norma, dividir, ficha in zip(
+                nombres, normas_receta, dividir_entre_mil, recetario.fichas[preparacion]
+            ):
+                fila = indice_ingredientes.setdefault(nombre, len(indice_ingredientes))
+                self.fichas[nombre] = ficha
+                filas.append(fila)
+                columnas.append(j)
+                normas.append(norma)
+                divisores.append(1000 if dividir else 1)
+
+        self.ingredientes = tuple(indice_ingredientes)
+        self.filas = tuple(filas)
+        self.columnas = tuple(columnas)
+        self.normas = tuple(normas)
+        self.divisores = tuple(divisores)
+
+        # Vectores de NumPy; se crean en el primer menú para no importarlo al arrancar
+        self._arrays = None
+
+    def raciones(self, entradas):
+        """
+        Suma las raciones de cada preparación del menú en una sola pasada.
+
+        Args:
+            entradas (list): EntradaMenu del menú
+
+        Returns:
+            list: Raciones por preparación, en el orden de self.preparaciones
+
+        Raises:
+            ValueError: Si alguna preparación no existe
+        """
+        import numpy as np
+
+        desconocidas = sorted({
+            entrada.preparacion for entrada in entradas
+            if entrada.preparacion not in self.indice_preparaciones
+        })
+        if desconocidas:
+            raise ValueError(f"Preparaciones no encontradas: {', '.join(desconocidas)}")
+
+        indices = np.fromiter(
+            (self.indice_preparaciones[entrada.preparacion] for entrada in entradas),
+            dtype=np.int64, count=len(entradas)
+        )
+        raciones = np.fromiter(
+            (entrada.raciones for entrada in entradas),
+            dtype=np.float64, count=len(entradas)
+        )
+        return np.bincount(indices, weights=raciones, minlength=len(self.preparaciones))
+
+    def multiplicar(self, raciones):
+        """
+        Producto de la matriz por el vector de raciones por preparación.
+
+        Args:
+            raciones (array): Raciones por preparación (ver raciones())
+
+        Returns:
+            tuple: (totales por ingrediente, aportes por elemento no nulo),
+            ambos sin redondear
+        """
+        import numpy as np
+
+        if self._arrays is None:
+            self._arrays = (
+                np.array(self.filas, dtype=np.int64),
+                np.array(self.columnas, dtype=np.int64),
+                np.array(self.normas, dtype=np.float64),
+                np.array(self.divisores, dtype=np.float64),
+            )
+        filas, columnas, normas, divisores = self._arrays
+
+        # Mismo orden de operaciones que RECETARIO.calcular(): norma * personas / 1000
+        aportes = normas * raciones[columnas] / divisores
+        totales = np.bincount(filas, weights=aportes, minlength=len(self.ingredientes))
+        return totales, aportes
+
+    def agregar(self, entradas, unidades_destino=None):
+        """
+        Calcula la lista de compra consolidada de un menú.
+
+        Args:
+            entradas (list): EntradaMenu del menú
+            unidades_destino (dict): Unidad de salida opcional por ingrediente,
+                p. ej. {'Aceite': 'litros'}; el resto sale en su unidad de ficha
+
+        Returns:
+            dict: Con las claves:
+                - 'entradas': número de entradas del menú
+                - 'raciones': raciones totales por preparación
+                - 'totales': ingrediente -> {'cantidad', 'unidad', 'categoria'}
+                - 'por_preparacion': preparación -> {ingrediente: cantidad}
+
+        Raises:
+            ValueError: Si una preparación no existe o una conversión no es posible
+        """
+        unidades_destino = unidades_destino or {}
+        raciones = self.raciones(entradas)
+        totales, aportes = self.multiplicar(raciones)
+        raciones = raciones.tolist()
+
+        por_preparacion = {}
+        for fila, columna, aporte in zip(self.filas, self.columnas, aportes.tolist()):
+            if raciones[columna]:
+                preparacion = self.preparaciones[columna]
+                por_preparacion.setdefault(preparacion, {})[self.ingredientes[fila]] = round(aporte, 3)
+
+        resumen = {}
+        for nombre, total in zip(self.ingredientes, totales.tolist()):
+            if not total:
+                continue
+            ficha = self.fichas[nombre]
+            unidad = unidades_destino.get(nombre, ficha.unidad)
+            resumen[nombre] = {
+                'cantidad': round(ficha.convertir(total, unidad), 3),
+                'unidad': unidad,
+                'categoria': ficha.categoria,
+            }
+
+        return {
+            'entradas': len(entradas),
+            'raciones': {
+                preparacion: int(total)
+                for preparacion, total in zip(self.preparaciones, raciones)
+                if total
+            },
+            'totales': resumen,
+            'por_preparacion': por_preparacion,
+        }
+
+
+# Matriz compilada una sola vez por proceso
+MATRIZ_MENU = MatrizMenu(RECETARIO)
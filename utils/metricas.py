@@ -0,0 +1,217 @@
+"""
+Métricas del servidor en el formato de texto de Prometheus.
+
+Contadores, indicadores e histogramas con etiquetas, pensados para estar
+siempre activos: registrar un valor cuesta un lock y una búsqueda binaria.
+Los valores que ya se cuentan en otro sitio (aciertos de las cachés, cola
+de exportación) se leen con recolectores en el momento de la consulta.
+
+Cada proceso tiene su propio registro: con gunicorn, cada trabajador
+expone sus propias métricas.
+"""
+
+import bisect
+import threading
+import time
+
+# Límites de los histogramas de latencia HTTP, en segundos
+CUBETAS_LATENCIA = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Límites de los histogramas de renderizado de exportaciones, en segundos
+CUBETAS_RENDER = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _etiquetas(nombres, valores, extra=''):
+    pares = [f'{nombre}="{_escapar(valor)}"' for nombre, valor in zip(nombres, valores)]
+    if extra:
+        pares.append(extra)
+    return '{' + ','.join(pares) + '}' if pares else ''
+
+
+def _numero(valor):
+    if valor == float('inf'):
+        return '+Inf'
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return repr(valor)
+
+
+class _Metrica:
+    """Base común: nombre, ayuda, etiquetas y valores por combinación de etiquetas"""
+
+    tipo = None
+
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def exponer(self):
+        """Líneas de texto de la métrica en el formato de Prometheus"""
+        lineas = [f'# HELP {self.nombre} {self.ayuda}', f'# TYPE {self.nombre} {self.tipo}']
+        with self._lock:
+            valores = sorted(self._valores.items())
+        for etiquetas, valor in valores:
+            lineas.extend(self._lineas(etiquetas, valor))
+        return lineas
+
+    def _lineas(self, etiquetas, valor):
+        return [f'{self.nombre}{_etiquetas(self.etiquetas, etiquetas)} {_numero(valor)}']
+
+
+class Contador(_Metrica):
+    """Valor que solo crece, p. ej. peticiones atendidas"""
+
+    tipo = 'counter'
+
+    def incrementar(self, *etiquetas, cantidad=1):
+        with self._lock:
+            self._valores[etiquetas] = self._valores.get(etiquetas, 0) + cantidad
+
+    def fijar(self, valor, *etiquetas):
+        """Copia un contador que se lleva en otro sitio (p. ej. los aciertos de una caché)"""
+        with self._lock:
+            self._valores[etiquetas] = valor
+
+
+class Indicador(_Metrica):
+    """Valor que sube y baja, p. ej. peticiones en curso"""
+
+    tipo = 'gauge'
+
+    def sumar(self, *etiquetas, cantidad=1):
+        with self._lock:
+            self._valores[etiquetas] = self._valores.get(etiquetas, 0) + cantidad
+
+    def fijar(self, valor, *etiquetas):
+        with self._lock:
+            self._valores[etiquetas] = valor
+
+
+class Histograma(_Metrica):
+    """Distribución de valores en cubetas acumuladas, con suma y cuenta"""
+
+    tipo = 'histogram'
+
+    def __init__(self, nombre, ayuda, etiquetas=(), cubetas=CUBETAS_LATENCIA):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.cubetas = tuple(sorted(cubetas))
+
+    def observar(self, valor, *etiquetas):
+        posicion = bisect.bisect_left(self.cubetas, valor)
+        with self._lock:
+            datos = self._valores.get(etiquetas)
+            if datos is None:
+                # Una cuenta por cubeta más la de +Inf, y la suma
+                datos = self._valores[etiquetas] = [[0] * (len(self.cubetas) + 1), 0.0]
+            datos[0][posicion] += 1
+            datos[1] += valor
+
+    def _lineas(self, etiquetas, datos):
+        cuentas, suma = datos
+        lineas = []
+        acumulado = 0
+        for limite, cuenta in zip(self.cubetas + (float('inf'),), cuentas):
+            acumulado += cuenta
+            extra = f'le="{_numero(float(limite))}"'
+            lineas.append(f'{self.nombre}_bucket{_etiquetas(self.etiquetas, etiquetas, extra)} {acumulado}')
+        lineas.append(f'{self.nombre}_sum{_etiquetas(self.etiquetas, etiquetas)} {_numero(suma)}')
+        lineas.append(f'{self.nombre}_count{_etiquetas(self.etiquetas, etiquetas)} {acumulado}')
+        return lineas
+
+
+class Registro:
+    """Conjunto de métricas y recolectores de un proceso"""
+
+    def __init__(self):
+        self._metricas = []
+        self._recolectores = []
+        self._lock = threading.Lock()
+
+    def registrar(self, metrica):
+        """Añade una métrica al registro y la devuelve"""
+        with self._lock:
+            self._metricas.append(metrica)
+        return metrica
+
+    def contador(self, nombre, ayuda, etiquetas=()):
+        return self.registrar(Contador(nombre, ayuda, etiquetas))
+
+    def indicador(self, nombre, ayuda, etiquetas=()):
+        return self.registrar(Indicador(nombre, ayuda, etiquetas))
+
+    def histograma(self, nombre, ayuda, etiquetas=(), cubetas=CUBETAS_LATENCIA):
+        return self.registrar(Histograma(nombre, ayuda, etiquetas, cubetas))
+
+    def recolector(self, funcion):
+        """
+        Registra una función que actualiza métricas justo antes de exponerlas.
+
+        Se puede usar como decorador.
+        """
+        with self._lock:
+            self._recolectores.append(funcion)
+        return funcion
+
+    def exponer(self):
+        """
+        Devuelve todas las métricas en el formato de texto de Prometheus.
+
+        Returns:
+            str: Texto listo para servir con CONTENT_TYPE
+        """
+        with self._lock:
+            recolectores = list(self._recolectores)
+            metricas = list(self._metricas)
+        for recolector in recolectores:
+            recolector()
+        lineas = []
+        for metrica in metricas:
+            lineas.extend(metrica.exponer())
+        return '\n'.join(lineas) + '\n'
+
+
+# Tipo de contenido del formato de texto de Prometheus
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Registro del proceso y métricas comunes
+REGISTRO = Registro()
+
+PETICIONES = REGISTRO.contador(
+    'foodcalc_peticiones_total', 'Peticiones HTTP atendidas', ('metodo', 'ruta', 'estado'))
+ERRORES = REGISTRO.contador(
+    'foodcalc_errores_total', 'Peticiones HTTP que terminaron con un error 5xx', ('metodo', 'ruta', 'estado'))
+LATENCIA = REGISTRO.histograma(
+    'foodcalc_peticion_segundos', 'Duración de las peticiones HTTP', ('metodo', 'ruta', 'estado'))
+EN_CURSO = REGISTRO.indicador(
+    'foodcalc_peticiones_en_curso', 'Peticiones HTTP que se están atendiendo')
+RENDER_EXPORTACION = REGISTRO.histograma(
+    'foodcalc_exportacion_render_segundos', 'Duración del renderizado de exportaciones',
+    ('tipo', 'via'), CUBETAS_RENDER)
+INICIO = REGISTRO.indicador(
+    'foodcalc_inicio_segundos', 'Hora de arranque del proceso (segundos desde epoch)')
+INICIO.fijar(time.time())
+
+
+def medir_render(tipo, via, generar):
+    """
+    Ejecuta un renderizado y registra su duración.
+
+    Args:
+        tipo (str): 'pdf' o 'imagen'
+        via (str): 'directa' (descarga) o 'cola' (trabajo en segundo plano)
+        generar (callable): Función sin argumentos que produce los bytes
+
+    Returns:
+        bytes: El resultado de generar()
+    """
+    inicio = time.perf_counter()
+    contenido = generar()
+    RENDER_EXPORTACION.observar(time.perf_counter() - inicio, tipo, via)
+    return contenido
@@ -0,0 +1,343 @@
+"""
+Planificación por lotes desde la línea de comandos, sin arrancar el servidor web.
+
+Lee un archivo CSV o JSON de eventos, calcula cada evento en un pool de
+procesos y escribe sus salidas en un directorio: un archivo por evento y
+formato con las cantidades de productos y, si el evento indica
+preparaciones, otro con sus ingredientes (solo en los formatos de texto;
+el PDF y las imágenes llevan las cantidades de productos).
+
+Uso:
+    python utils/food_calculator.py eventos.csv -o salida
+    python -m utils.planificacion eventos.json -o salida -f texto pdf -j 8
+
+Eventos en CSV (con cabecera) o JSON (lista de objetos, o {"eventos": [...]}):
+
+    evento,personas,preparaciones,formatos
+    Boda,120,Arroz blanco;Picadillo,texto;pdf
+    Comedor,45,,markdown
+
+Solo 'personas' es obligatorio. Las preparaciones y los formatos se separan
+con ';' (en JSON también pueden ser listas); sin formatos se usan los de -f.
+"""
+
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+
+from utils.catalogo import RECETARIO
+from utils.exportacion import FORMATOS_IMAGEN, obtener_imagen, obtener_pdf, precargar
+from utils.food_calculator import (
+    calcular_preparaciones,
+    formatear_ingredientes_preparacion,
+    resultados_formateados
+)
+from utils.renderizado import a_json, formatos_disponibles
+
+# Extensión de los archivos de cada formato
+EXTENSIONES = {
+    'texto': 'txt',
+    'markdown': 'md',
+    'html': 'html',
+    'csv': 'csv',
+    'lista': 'json',
+    'pdf': 'pdf',
+    **{formato: formato for formato in FORMATOS_IMAGEN},
+}
+
+# Formatos que se exportan con los backends de PDF e imagen
+FORMATOS_EXPORTACION = ('pdf', *FORMATOS_IMAGEN)
+
+# Separador de las listas dentro de una celda del CSV
+SEPARADOR = ';'
+
+# Máximo de eventos por tarea enviada al pool
+BLOQUE = 64
+
+# Intervalo mínimo entre líneas de progreso, en segundos
+INTERVALO_PROGRESO = 0.25
+
+
+def formatos_lote():
+    """
+    Devuelve los formatos de salida admitidos.
+
+    Returns:
+        tuple: Formatos de texto registrados más PDF e imagen
+    """
+    return (*formatos_disponibles(), *FORMATOS_EXPORTACION)
+
+
+@dataclass(frozen=True, slots=True)
+class Evento:
+    """Un evento del lote: N personas, sus preparaciones y los formatos de salida"""
+    indice: int
+    nombre: str
+    personas: int
+    preparaciones: tuple = ()
+    formatos: tuple = ('texto',)
+
+    @property
+    def base(self):
+        """Nombre de archivo del evento, sin extensión: número de orden y nombre"""
+        nombre = re.sub(r'[^\w.-]+', '-', self.nombre).strip('-.')[:60]
+        return f'{self.indice + 1:05d}-{nombre}' if nombre else f'{self.indice + 1:05d}'
+
+
+def _lista(valor):
+    if valor is None:
+        return ()
+    if isinstance(valor, str):
+        valor = valor.split(SEPARADOR)
+    return tuple(texto.strip() for texto in map(str, valor) if texto.strip())
+
+
+def leer_eventos(ruta, formatos=('texto',)):
+    """
+    Lee y valida los eventos de un archivo CSV o JSON.
+
+    Args:
+        ruta (Path): Archivo .csv o .json
+        formatos (tuple): Formatos de los eventos que no indican ninguno
+
+    Returns:
+        list: Eventos, en el orden del archivo
+
+    Raises:
+        ValueError: Si el archivo no es CSV ni JSON o algún evento no es válido
+    """
+    ruta = Path(ruta)
+    extension = ruta.suffix.lower()
+    if extension == '.csv':
+        with open(ruta, encoding='utf-8-sig', newline='') as archivo:
+            datos = list(csv.DictReader(archivo))
+    elif extension == '.json':
+        datos = json.loads(ruta.read_text(encoding='utf-8'))
+        if isinstance(datos, dict):
+            datos = datos.get('eventos')
+    else:
+        raise ValueError(f'Formato de eventos no admitido: {ruta.name} (use .csv o .json)')
+
+    if not isinstance(datos, list) or not datos:
+        raise ValueError(f'{ruta.name} no contiene eventos')
+
+    admitidos = set(formatos_lote())
+    preparaciones_validas = set(RECETARIO.nombres)
+    eventos = []
+    for indice, dato in enumerate(datos):
+        if not isinstance(dato, dict):
+            raise ValueError(f'Evento {indice + 1}: debe ser un objeto')
+        dato = {str(clave).strip().lower(): valor for clave, valor in dato.items() if clave is not None}
+        try:
+            personas = int(dato.get('personas') or 0)
+        except (TypeError, ValueError):
+            raise ValueError(f'Evento {indice + 1}: personas no válido ({dato.get("personas")!r})') from None
+        if personas < 1:
+            raise ValueError(f'Evento {indice + 1}: número de personas debe ser mayor a 0')
+
+        preparaciones = _lista(dato.get('preparaciones'))
+        desconocidas = [nombre for nombre in preparaciones if nombre not in preparaciones_validas]
+        if desconocidas:
+            raise ValueError(f"Evento {indice + 1}: preparaciones no encontradas: {', '.join(desconocidas)}")
+
+        formatos_evento = _lista(dato.get('formatos') or dato.get('formato')) or tuple(formatos)
+        no_validos = [formato for formato in formatos_evento if formato not in admitidos]
+        if no_validos:
+            raise ValueError(f"Evento {indice + 1}: formatos no válidos: {', '.join(no_validos)}")
+
+        eventos.append(Evento(
+            indice=indice,
+            nombre=str(dato.get('evento') or dato.get('nombre') or '').strip(),
+            personas=personas,
+            preparaciones=preparaciones,
+            formatos=tuple(dict.fromkeys(formatos_evento))
+        ))
+    return eventos
+
+
+def _codificar(valor):
+    # Los resultados 'lista' son Filas, no listas: se serializan con a_json
+    if isinstance(valor, str):
+        return valor.encode('utf-8')
+    return json.dumps(valor, default=a_json, ensure_ascii=False, indent=2).encode('utf-8')
+
+
+def escribir_evento(evento, directorio):
+    """
+    Calcula un evento y escribe un archivo por formato.
+
+    Args:
+        evento (Evento): Evento a calcular
+        directorio (Path): Directorio de salida (ya creado)
+
+    Returns:
+        tuple: (archivos escritos, bytes escritos)
+    """
+    salidas = []
+    ingredientes = None
+    for formato in evento.formatos:
+        extension = EXTENSIONES.get(formato, formato)
+        if formato == 'pdf':
+            contenido, _ = obtener_pdf(evento.personas)
+        elif formato in FORMATOS_IMAGEN:
+            contenido, _ = obtener_imagen(evento.personas, formato)
+        else:
+            contenido = _codificar(resultados_formateados(evento.personas, formato))
+            if evento.preparaciones:
+                if ingredientes is None:
+                    ingredientes = calcular_preparaciones(evento.personas, evento.preparaciones)
+                salidas.append((
+                    f'{evento.base}-preparaciones.{extension}',
+                    _codificar(formatear_ingredientes_preparacion(ingredientes, formato))
+                ))
+        salidas.append((f'{evento.base}.{extension}', contenido))
+
+    for nombre, contenido in salidas:
+        (directorio / nombre).write_bytes(contenido)
+    return len(salidas), sum(len(contenido) for _, contenido in salidas)
+
+
+def _procesar_bloque(eventos, directorio):
+    """Procesa un bloque de eventos en un proceso trabajador"""
+    archivos = tamano = 0
+    errores = []
+    for evento in eventos:
+        try:
+            escritos, bytes_escritos = escribir_evento(evento, directorio)
+        except Exception as e:
+            errores.append((evento.indice, evento.nombre, str(e) or e.__class__.__name__))
+            continue
+        archivos += escritos
+        tamano += bytes_escritos
+    return len(eventos), archivos, tamano, errores
+
+
+def procesar_eventos(eventos, directorio, trabajadores=None, bloque=BLOQUE, progreso=None):
+    """
+    Calcula y escribe todos los eventos, repartidos en bloques entre procesos.
+
+    Args:
+        eventos (list): Eventos de leer_eventos()
+        directorio (Path): Directorio de salida; se crea si no existe
+        trabajadores (int): Procesos del pool; 1 procesa en este proceso.
+            Por defecto, uno por CPU
+        bloque (int): Máximo de eventos por tarea
+        progreso (callable): Se llama con (eventos hechos, total, segundos)
+            al terminar cada bloque
+
+    Returns:
+        dict: eventos, archivos, bytes, errores [(índice, nombre, mensaje)],
+        segundos y trabajadores
+    """
+    directorio = Path(directorio)
+    directorio.mkdir(parents=True, exist_ok=True)
+    trabajadores = max(1, int(trabajadores or os.cpu_count() or 1))
+
+    # Bloques pequeños reparten mejor la carga; grandes ahorran envíos al pool
+    bloque = max(1, min(bloque, -(-len(eventos) // (trabajadores * 4))))
+    bloques = [eventos[inicio:inicio + bloque] for inicio in range(0, len(eventos), bloque)]
+
+    # Los procesos hijos heredan los backends ya importados
+    if any(formato in FORMATOS_EXPORTACION for evento in eventos for formato in evento.formatos):
+        precargar(en_segundo_plano=False)
+
+    resumen = {'eventos': 0, 'archivos': 0, 'bytes': 0, 'errores': []}
+    inicio = time.perf_counter()
+
+    def acumular(resultado):
+        hechos, archivos, tamano, errores = resultado
+        resumen['eventos'] += hechos
+        resumen['archivos'] += archivos
+        resumen['bytes'] += tamano
+        resumen['errores'].extend(errores)
+        if progreso is not None:
+            progreso(resumen['eventos'], len(eventos), time.perf_counter() - inicio)
+
+    if trabajadores == 1 or len(bloques) == 1:
+        trabajadores = 1
+        for parte in bloques:
+            acumular(_procesar_bloque(parte, directorio))
+    else:
+        with ProcessPoolExecutor(max_workers=trabajadores) as pool:
+            futuros = [pool.submit(_procesar_bloque, parte, directorio) for parte in bloques]
+            for futuro in as_completed(futuros):
+                acumular(futuro.result())
+
+    resumen['errores'].sort()
+    resumen['segundos'] = time.perf_counter() - inicio
+    resumen['trabajadores'] = trabajadores
+    return resumen
+
+
+def _mostrador_progreso(salida=sys.stderr):
+    """Devuelve una función de progreso que escribe como mucho cada INTERVALO_PROGRESO"""
+    ultimo = [0.0]
+    en_terminal = salida.isatty()
+
+    def mostrar(hechos, total, segundos):
+        if hechos < total and segundos - ultimo[0] < INTERVALO_PROGRESO:
+            return
+        ultimo[0] = segundos
+        velocidad = hechos / segundos if segundos > 0 else 0.0
+        linea = f'{hechos}/{total} eventos ({hechos / total:.0%}), {velocidad:.0f} eventos/s'
+        if en_terminal:
+            salida.write(f'\r{linea}' + ('\n' if hechos == total else ''))
+        else:
+            salida.write(linea + '\n')
+        salida.flush()
+
+    return mostrar
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('eventos', type=Path,
+                        help='archivo .csv o .json con los eventos')
+    parser.add_argument('-o', '--salida', type=Path, default=Path('salida'),
+                        help='directorio de salida (por defecto ./salida)')
+    parser.add_argument('-f', '--formatos', nargs='+', default=['texto'], choices=formatos_lote(),
+                        help='formatos de los eventos que no indican ninguno')
+    parser.add_argument('-j', '--trabajadores', type=int, default=os.cpu_count() or 1,
+                        help='procesos de cálculo (1 = sin pool)')
+    parser.add_argument('--bloque', type=int, default=BLOQUE,
+                        help='máximo de eventos por tarea del pool')
+    parser.add_argument('-q', '--silencioso', action='store_true',
+                        help='no muestra el progreso')
+    args = parser.parse_args(argv)
+
+    try:
+        eventos = leer_eventos(args.eventos, tuple(args.formatos))
+    except (OSError, ValueError) as e:
+        print(f'Error: {e}', file=sys.stderr)
+        return 2
+
+    resumen = procesar_eventos(
+        eventos,
+        args.salida,
+        trabajadores=args.trabajadores,
+        bloque=args.bloque,
+        progreso=None if args.silencioso else _mostrador_progreso()
+    )
+
+    for indice, nombre, mensaje in resumen['errores']:
+        print(f"Error en el evento {indice + 1}{f' ({nombre})' if nombre else ''}: {mensaje}", file=sys.stderr)
+
+    segundos = max(resumen['segundos'], 1e-9)
+    procesos = resumen['trabajadores']
+    print(f"Eventos:     {resumen['eventos']} ({len(resumen['errores'])} con error)")
+    print(f"Archivos:    {resumen['archivos']} ({resumen['bytes'] / 1e6:.1f} MB) en {args.salida}")
+    print(f"Tiempo:      {resumen['segundos']:.2f} s con {procesos} proceso{'s' if procesos != 1 else ''}")
+    print(f"Rendimiento: {resumen['eventos'] / segundos:.0f} eventos/s, "
+          f"{resumen['archivos'] / segundos:.0f} archivos/s")
+    return 1 if resumen['errores'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
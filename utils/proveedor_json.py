@@ -0,0 +1,121 @@
+"""
+Proveedores JSON de Flask para las respuestas de la API.
+
+Con orjson instalado las respuestas se codifican con él, que es varias
+veces más rápido que el módulo json en los lotes grandes; sin él se usa el
+proveedor de Flask. El proveedor se elige con FOODCALC_JSON:
+
+    auto    orjson si está instalado, si no json (por defecto)
+    orjson  orjson (si no está instalado se avisa y se usa json)
+    json    el módulo json de la biblioteca estándar
+"""
+
+import logging
+import os
+
+from flask.json.provider import DefaultJSONProvider
+
+from utils.renderizado import a_json
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional: sin él se usa el módulo json
+    orjson = None
+
+REGISTRO_JSON = logging.getLogger('foodcalc.json')
+
+
+class ProveedorJSON(DefaultJSONProvider):
+    """
+    Proveedor JSON de Flask que además serializa los resultados compactos
+    (Filas): se convierten a listas de dicts aquí, al escribir la respuesta,
+    y no al calcularlos.
+    """
+
+    nombre = 'json'
+
+    @staticmethod
+    def default(o):
+        if hasattr(o, 'a_json'):
+            return a_json(o)
+        return DefaultJSONProvider.default(o)
+
+
+class ProveedorOrjson(ProveedorJSON):
+    """
+    Proveedor JSON sobre orjson.
+
+    Las claves se ordenan igual que con el proveedor json y las fechas y
+    dataclasses pasan por default(), así que el contenido es el mismo. Cambia
+    la forma: el texto no ASCII se escribe en UTF-8 en vez de con escapes \\u
+    y los floats muy grandes o pequeños sin ceros en el exponente (1e-5).
+    Lo que orjson no admite (enteros de más de 64 bits, argumentos de
+    json.dumps) se codifica con el proveedor json.
+    """
+
+    nombre = 'orjson'
+
+    def _opciones(self, indentar=False):
+        opciones = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+                    | orjson.OPT_NON_STR_KEYS)
+        if self.sort_keys:
+            opciones |= orjson.OPT_SORT_KEYS
+        if indentar:
+            opciones |= orjson.OPT_INDENT_2
+        return opciones
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        try:
+            return orjson.dumps(obj, default=self.default, option=self._opciones()).decode('utf-8')
+        except orjson.JSONEncodeError:
+            return super().dumps(obj)
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indentar = self.compact is False or (self.compact is None and self._app.debug)
+        try:
+            cuerpo = orjson.dumps(
+                obj,
+                default=self.default,
+                option=self._opciones(indentar) | orjson.OPT_APPEND_NEWLINE
+            )
+        except orjson.JSONEncodeError:
+            return super().response(*args, **kwargs)
+        return self._app.response_class(cuerpo, mimetype=self.mimetype)
+
+
+# Proveedores disponibles en esta instalación, por nombre
+PROVEEDORES = {'json': ProveedorJSON}
+if orjson is not None:
+    PROVEEDORES['orjson'] = ProveedorOrjson
+
+
+def elegir_proveedor(nombre=None):
+    """
+    Devuelve la clase de proveedor JSON configurada.
+
+    Args:
+        nombre (str): 'auto', 'orjson' o 'json'; por defecto FOODCALC_JSON
+
+    Returns:
+        type: Subclase de ProveedorJSON, para asignar a app.json
+
+    Raises:
+        ValueError: Si el nombre no es un proveedor conocido
+    """
+    nombre = (nombre or os.environ.get('FOODCALC_JSON') or 'auto').strip().lower()
+    if nombre == 'auto':
+        return PROVEEDORES.get('orjson', ProveedorJSON)
+    if nombre == 'orjson' and orjson is None:
+        REGISTRO_JSON.warning('FOODCALC_JSON=orjson pero orjson no está instalado; se usa json')
+        return ProveedorJSON
+    if nombre not in PROVEEDORES:
+        raise ValueError(f'Proveedor JSON desconocido: {nombre!r} (auto, orjson o json)')
+    return PROVEEDORES[nombre]
@@ -0,0 +1,310 @@
+"""
+Representación intermedia de resultados y registro de renderizadores.
+
+Cada resultado se convierte una sola vez en un Documento y cada formato de
+salida (texto, markdown, html, lista, csv...) es un renderizador que recorre
+ese documento en una sola pasada.
+
+Los renderizadores de flujo (ndjson, csv) reciben una secuencia de
+documentos y generan el texto a trozos, con las filas de la forma 'lista',
+sin tener nunca la salida completa en memoria.
+"""
+
+import csv
+import io
+import json
+import math
+from collections.abc import Sequence
+from json.encoder import encode_basestring
+from typing import NamedTuple
+
+
+class Item(NamedTuple):
+    """Una línea de cantidad ya resuelta: nombre, cantidad y unidad"""
+    nombre: str
+    cantidad: float
+    unidad: str
+    linea: str
+
+
+class Seccion(NamedTuple):
+    """Un encabezado (opcional) y los items que se muestran debajo"""
+    titulo: str
+    items: tuple
+
+
+class Documento(NamedTuple):
+    """
+    Resultado listo para renderizar en cualquier formato.
+
+    secciones guarda el orden de presentación de los formatos de texto y
+    filas guarda las filas de los formatos tabulares (lista y csv), que
+    conservan el orden original del cálculo.
+    """
+    titulo: str
+    subtitulo: str
+    secciones: tuple
+    columnas: tuple
+    filas: tuple
+    destacar_items: bool = False
+
+
+class Filas(Sequence):
+    """
+    Salida de la forma 'lista': cada fila se lee como un dict columna -> valor.
+
+    Las filas se guardan como las tuplas del documento y los dicts se crean
+    la primera vez que se leen, así que un resultado en caché que solo se
+    serializa no retiene un dict por fila. Una vez creados se conservan: los
+    cambios en una fila (filas[0]['cantidad'] = 1) se mantienen y se ven al
+    comparar y al serializar.
+
+    Es igual (==) a cualquier secuencia con las mismas filas, p. ej. la list
+    de dicts de siempre. No es una list: json.dumps() necesita default=a_json
+    (el proveedor JSON de la app ya lo usa) y quien necesite la lista puede
+    llamar a a_json() o a list().
+    """
+
+    __slots__ = ('columnas', 'filas', '_dicts')
+
+    def __init__(self, columnas, filas):
+        self.columnas = tuple(columnas)
+        self.filas = filas if isinstance(filas, tuple) else tuple(filas)
+        self._dicts = None
+
+    def _leidas(self):
+        if self._dicts is None:
+            columnas = self.columnas
+            self._dicts = [dict(zip(columnas, fila)) for fila in self.filas]
+        return self._dicts
+
+    def __getitem__(self, posicion):
+        return self._leidas()[posicion]
+
+    def __len__(self):
+        return len(self.filas)
+
+    def __eq__(self, otro):
+        if isinstance(otro, Filas) and self._dicts is None and otro._dicts is None:
+            return self.columnas == otro.columnas and self.filas == otro.filas
+        if isinstance(otro, Sequence) and not isinstance(otro, (str, bytes)):
+            return len(self) == len(otro) and all(a == b for a, b in zip(self, otro))
+        return NotImplemented
+
+    __hash__ = None
+
+    def a_json(self):
+        """Lista de dicts, una por fila"""
+        if self._dicts is not None:
+            return self._dicts
+        columnas = self.columnas
+        return [dict(zip(columnas, fila)) for fila in self.filas]
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self.a_json()!r})'
+
+
+def a_json(valor):
+    """
+    Función default para json.dumps() con los resultados compactos.
+
+    Los resultados que se leen como listas sin serlo (Filas) se convierten
+    con su método a_json().
+
+    Ejemplo:
+        >>> json.dumps(formatear_resultados(resultado, 'lista'), default=a_json)
+
+    Raises:
+        TypeError: Si el valor no es serializable
+    """
+    convertir = getattr(valor, 'a_json', None)
+    if convertir is None:
+        raise TypeError(f'Object of type {type(valor).__name__} is not JSON serializable')
+    return convertir()
+
+
+def crear_item(nombre, cantidad, unidad):
+    """Crea un Item con su línea de texto ya formateada"""
+    return Item(nombre, cantidad, unidad, f"  • {nombre}: {cantidad} {unidad}")
+
+
+_RENDERIZADORES = {}
+_RENDERIZADORES_FLUJO = {}
+
+
+def registrar_renderizador(formato):
+    """
+    Decorador que registra una función como renderizador de un formato.
+
+    Args:
+        formato (str): Nombre del formato, p. ej. 'texto' o 'csv'
+    """
+    def decorador(funcion):
+        _RENDERIZADORES[formato] = funcion
+        return funcion
+    return decorador
+
+
+def registrar_renderizador_flujo(formato):
+    """
+    Decorador que registra un generador como renderizador de flujo de un formato.
+
+    Args:
+        formato (str): Nombre del formato, p. ej. 'ndjson' o 'csv'
+    """
+    def decorador(funcion):
+        _RENDERIZADORES_FLUJO[formato] = funcion
+        return funcion
+    return decorador
+
+
+def formatos_flujo_disponibles():
+    """
+    Devuelve los formatos de flujo registrados.
+
+    Returns:
+        tuple: Nombres de los formatos
+    """
+    return tuple(_RENDERIZADORES_FLUJO)
+
+
+def renderizar_flujo(documentos, formato, columnas_extra=()):
+    """
+    Renderiza una secuencia de documentos a trozos.
+
+    Args:
+        documentos (iterable): Pares (valores_extra, Documento); los valores
+            extra se anteponen a cada fila, p. ej. (personas,)
+        formato (str): Formato de flujo registrado
+        columnas_extra (tuple): Nombres de los valores extra
+
+    Yields:
+        str: Un trozo de salida por documento
+
+    Raises:
+        KeyError: Si el formato de flujo no existe
+    """
+    return _RENDERIZADORES_FLUJO[formato](documentos, tuple(columnas_extra))
+
+
+def formatos_disponibles():
+    """
+    Devuelve los formatos registrados.
+
+    Returns:
+        tuple: Nombres de los formatos
+    """
+    return tuple(_RENDERIZADORES)
+
+
+def renderizar(documento, formato='texto'):
+    """
+    Renderiza un documento en el formato pedido.
+
+    Args:
+        documento (Documento): Resultado ya estructurado
+        formato (str): Formato registrado; los desconocidos se tratan como 'texto'
+
+    Returns:
+        str o Filas: Documento renderizado
+    """
+    renderizador = _RENDERIZADORES.get(formato, _RENDERIZADORES['texto'])
+    return renderizador(documento)
+
+
+def _renderizar_lineas(documento, negrita, cursiva, destacar):
+    lineas = [negrita.format(documento.titulo)]
+    if documento.subtitulo:
+        lineas.append(cursiva.format(documento.subtitulo))
+    lineas[-1] += "\n"
+
+    for seccion in documento.secciones:
+        if seccion.titulo is not None:
+            lineas.append("\n" + negrita.format(seccion.titulo))
+        if destacar and documento.destacar_items:
+            lineas.extend(
+                f"  • **{item.nombre}:** {item.cantidad} {item.unidad}" for item in seccion.items
+            )
+        else:
+            lineas.extend(item.linea for item in seccion.items)
+
+    return '\n'.join(lineas)
+
+
+@registrar_renderizador('texto')
+def renderizar_texto(documento):
+    return _renderizar_lineas(documento, "{}", "{}", destacar=False)
+
+
+@registrar_renderizador('markdown')
+def renderizar_markdown(documento):
+    return _renderizar_lineas(documento, "**{}**", "*{}*", destacar=True)
+
+
+@registrar_renderizador('html')
+def renderizar_html(documento):
+    return _renderizar_lineas(documento, "<b>{}</b>", "<i>{}</i>", destacar=False)
+
+
+@registrar_renderizador('lista')
+def renderizar_lista(documento):
+    return Filas(documento.columnas, documento.filas)
+
+
+@registrar_renderizador('csv')
+def renderizar_csv(documento):
+    salida = io.StringIO()
+    escritor = csv.writer(salida, lineterminator='\n')
+    escritor.writerow(documento.columnas)
+    escritor.writerows(documento.filas)
+    return salida.getvalue()
+
+
+def _json_escalar(valor, textos):
+    # Igual que json.dumps(valor, ensure_ascii=False), pero sin crear un
+    # codificador por valor y recordando los textos, que se repiten en
+    # todas las filas (categorías, nombres, unidades)
+    if type(valor) is str:
+        codificado = textos.get(valor)
+        if codificado is None:
+            if len(textos) >= 4096:
+                textos.clear()
+            codificado = textos[valor] = encode_basestring(valor)
+        return codificado
+    if type(valor) is int or (type(valor) is float and math.isfinite(valor)):
+        return repr(valor)
+    return json.dumps(valor, ensure_ascii=False)
+
+
+@registrar_renderizador_flujo('ndjson')
+def renderizar_flujo_ndjson(documentos, columnas_extra):
+    plantillas = {}
+    textos = {}
+    for extra, documento in documentos:
+        # Las claves de cada línea solo se codifican una vez por forma de documento
+        columnas = columnas_extra + documento.columnas
+        plantilla = plantillas.get(columnas)
+        if plantilla is None:
+            plantilla = plantillas[columnas] = '{%s}\n' % ', '.join(
+                encode_basestring(columna).replace('%', '%%') + ': %s' for columna in columnas
+            )
+        prefijo = tuple([_json_escalar(valor, textos) for valor in extra])
+        yield ''.join([
+            plantilla % (prefijo + tuple([_json_escalar(valor, textos) for valor in fila]))
+            for fila in documento.filas
+        ])
+
+
+@registrar_renderizador_flujo('csv')
+def renderizar_flujo_csv(documentos, columnas_extra):
+    salida = io.StringIO()
+    escritor = csv.writer(salida, lineterminator='\n')
+    cabecera = True
+    for extra, documento in documentos:
+        if cabecera:
+            escritor.writerow(columnas_extra + documento.columnas)
+            cabecera = False
+        escritor.writerows(extra + fila for fila in documento.filas)
+        yield salida.getvalue()
+        salida.seek(0)
+        salida.truncate()
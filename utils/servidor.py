@@ -0,0 +1,335 @@
+"""
+Backends de servidor HTTP para la aplicación Flask.
+
+- 'desarrollo': servidor de Werkzeug con hilos (el de flask run)
+- 'gunicorn': varios procesos trabajadores con hilos, keep-alive, backlog y
+  reciclado de trabajadores (solo POSIX, se lanza como subproceso)
+- 'waitress': un proceso con un pool de hilos, keep-alive y backlog
+  (funciona en Windows y dentro de un hilo)
+- 'produccion': elige gunicorn si está disponible y si no waitress
+"""
+
+import importlib.util
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from dataclasses import dataclass, replace
+
+# Ruta que responde en cuanto el servidor puede atender peticiones
+RUTA_SALUD = '/api/salud'
+
+
+@dataclass(frozen=True)
+class ConfiguracionServidor:
+    """Parámetros de arranque del servidor"""
+    host: str = 'localhost'
+    puerto: int = 5000
+    modo: str = 'desarrollo'
+    trabajadores: int = 2
+    hilos: int = 4
+    keepalive: int = 5
+    backlog: int = 2048
+    max_peticiones: int = 1000
+    tiempo_gracia: int = 30
+
+    @classmethod
+    def desde_entorno(cls, **valores):
+        """
+        Crea la configuración a partir de las variables FOODCALC_SERVIDOR_*.
+
+        Los argumentos explícitos tienen prioridad sobre el entorno.
+        """
+        entorno = {
+            'host': os.environ.get('FOODCALC_SERVIDOR_HOST'),
+            'puerto': os.environ.get('FOODCALC_SERVIDOR_PUERTO'),
+            'modo': os.environ.get('FOODCALC_SERVIDOR_MODO'),
+            'trabajadores': os.environ.get('FOODCALC_SERVIDOR_TRABAJADORES'),
+            'hilos': os.environ.get('FOODCALC_SERVIDOR_HILOS'),
+            'keepalive': os.environ.get('FOODCALC_SERVIDOR_KEEPALIVE'),
+            'backlog': os.environ.get('FOODCALC_SERVIDOR_BACKLOG'),
+            'max_peticiones': os.environ.get('FOODCALC_SERVIDOR_MAX_PETICIONES'),
+            'tiempo_gracia': os.environ.get('FOODCALC_SERVIDOR_TIEMPO_GRACIA'),
+        }
+        configuracion = cls()
+        for campo, valor in entorno.items():
+            if valor is not None and campo not in valores:
+                tipo = type(getattr(configuracion, campo))
+                valores[campo] = tipo(valor)
+        return replace(configuracion, **valores)
+
+
+class ServidorDesarrollo:
+    """Servidor de Werkzeug con un hilo por petición"""
+
+    nombre = 'desarrollo'
+
+    def __init__(self, app, configuracion):
+        from werkzeug.serving import make_server
+
+        self.configuracion = configuracion
+        self.trabajadores = 1
+        self._servidor = make_server(configuracion.host, configuracion.puerto, app, threaded=True)
+
+    def ejecutar(self):
+        """Atiende peticiones hasta que se llame a detener()"""
+        self._servidor.serve_forever()
+
+    def detener(self):
+        """Detiene el bucle de peticiones y libera el socket"""
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+
+class ServidorWaitress:
+    """Servidor waitress: un proceso con un pool de hilos"""
+
+    nombre = 'waitress'
+
+    def __init__(self, app, configuracion):
+        from waitress import wasyncore
+        from waitress.server import create_server
+
+        self.configuracion = configuracion
+        self.trabajadores = 1
+        # Mapa propio de canales: detener() los cierra todos con close_all()
+        self._wasyncore = wasyncore
+        self._canales = {}
+        self._servidor = create_server(
+            app,
+            map=self._canales,
+            host=configuracion.host,
+            port=configuracion.puerto,
+            threads=configuracion.hilos,
+            backlog=configuracion.backlog,
+            channel_timeout=configuracion.keepalive,
+        )
+
+    def ejecutar(self):
+        """Atiende peticiones hasta que se llame a detener()"""
+        self._servidor.run()
+
+    def detener(self):
+        """Cierra el socket de escucha, los canales abiertos y los hilos del pool"""
+        self._servidor.close()
+        self._wasyncore.close_all(self._canales)
+        self._servidor.task_dispatcher.shutdown()
+
+
+class ServidorGunicorn:
+    """
+    Servidor gunicorn con varios procesos trabajadores.
+
+    Gunicorn necesita el hilo principal para sus señales, así que se lanza
+    como subproceso. Los trabajadores se reciclan tras max_peticiones
+    peticiones (con algo de variación) y se detienen con SIGTERM, que
+    espera a que terminen las peticiones en curso.
+
+    detener() puede llegar antes de que el hilo lance el subproceso (p. ej.
+    al reiniciar o cerrar la ventana justo después de iniciar): el lanzamiento
+    y la parada comparten un lock, y un servidor ya detenido no se lanza.
+    """
+
+    nombre = 'gunicorn'
+
+    def __init__(self, app, configuracion, modulo_app='utils.app:app'):
+        self.configuracion = configuracion
+        self.trabajadores = configuracion.trabajadores
+        self.modulo_app = modulo_app
+        self._proceso = None
+        self._detenido = False
+        self._lock = threading.Lock()
+
+    def comando(self):
+        """Línea de comandos con la que se lanza gunicorn"""
+        c = self.configuracion
+        return [
+            sys.executable, '-m', 'gunicorn',
+            '--bind', f'{c.host}:{c.puerto}',
+            '--workers', str(c.trabajadores),
+            '--threads', str(c.hilos),
+            '--worker-class', 'gthread',
+            '--keep-alive', str(c.keepalive),
+            '--backlog', str(c.backlog),
+            '--max-requests', str(c.max_peticiones),
+            '--max-requests-jitter', str(max(1, c.max_peticiones // 10)),
+            '--graceful-timeout', str(c.tiempo_gracia),
+            self.modulo_app,
+        ]
+
+    def ejecutar(self):
+        """Lanza gunicorn y espera a que termine"""
+        directorio = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        with self._lock:
+            if self._detenido:
+                return
+            proceso = self._proceso = subprocess.Popen(self.comando(), cwd=directorio)
+        proceso.wait()
+
+    def detener(self):
+        """Apagado ordenado: SIGTERM y, si no basta, SIGKILL"""
+        with self._lock:
+            self._detenido = True
+            proceso = self._proceso
+        if proceso is None or proceso.poll() is not None:
+            return
+        proceso.terminate()
+        try:
+            proceso.wait(timeout=self.configuracion.tiempo_gracia + 5)
+        except subprocess.TimeoutExpired:
+            proceso.kill()
+            proceso.wait()
+
+
+# Backends registrados
+BACKENDS = {
+    'desarrollo': ServidorDesarrollo,
+    'waitress': ServidorWaitress,
+    'gunicorn': ServidorGunicorn,
+}
+
+
+def backend_produccion():
+    """
+    Elige el backend de producción disponible en esta plataforma.
+
+    Returns:
+        str: 'gunicorn', 'waitress' o 'desarrollo' si no hay ninguno instalado
+    """
+    congelado = getattr(sys, 'frozen', False)
+    if os.name == 'posix' and not congelado and importlib.util.find_spec('gunicorn'):
+        return 'gunicorn'
+    if importlib.util.find_spec('waitress'):
+        return 'waitress'
+    return 'desarrollo'
+
+
+def crear_servidor(app, configuracion):
+    """
+    Crea el servidor del backend indicado en la configuración.
+
+    Args:
+        app (Flask): Aplicación WSGI
+        configuracion (ConfiguracionServidor): Parámetros de arranque
+
+    Returns:
+        Servidor con ejecutar(), detener(), nombre y trabajadores
+
+    Raises:
+        ValueError: Si el modo no existe
+    """
+    modo = configuracion.modo
+    if modo == 'produccion':
+        modo = backend_produccion()
+    if modo not in BACKENDS:
+        raise ValueError(f'Modo de servidor no válido: {configuracion.modo}')
+    return BACKENDS[modo](app, configuracion)
+
+
+def esperar_disponible(host, puerto, timeout=15.0, intervalo=0.05, ruta=RUTA_SALUD):
+    """
+    Sondea la ruta de salud hasta que el servidor responde.
+
+    Args:
+        host (str): Host del servidor
+        puerto (int): Puerto del servidor
+        timeout (float): Segundos máximos de espera
+        intervalo (float): Segundos entre sondeos
+        ruta (str): Ruta a sondear
+
+    Returns:
+        bool: True si el servidor respondió 200 antes del timeout
+    """
+    url = f'http://{host}:{puerto}{ruta}'
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as respuesta:
+                if respuesta.status == 200:
+                    return True
+        except (urllib.error.URLError, ConnectionError, TimeoutError, OSError):
+            pass
+        time.sleep(intervalo)
+    return False
+
+
+class ServidorGestionado:
+    """
+    Ciclo de vida completo de un servidor ejecutado en un hilo.
+
+    iniciar() crea el servidor y su hilo, detener() cierra el socket de
+    escucha y espera al hilo, y reiniciar() hace ambas cosas, opcionalmente
+    con otra configuración (puerto, modo, trabajadores...).
+    """
+
+    def __init__(self, app, configuracion):
+        self.app = app
+        self.configuracion = configuracion
+        self.servidor = None
+        self._hilo = None
+        self._lock = threading.Lock()
+
+    @property
+    def en_ejecucion(self):
+        return self._hilo is not None and self._hilo.is_alive()
+
+    @property
+    def url(self):
+        return f'http://{self.configuracion.host}:{self.configuracion.puerto}'
+
+    @property
+    def nombre(self):
+        return self.servidor.nombre if self.servidor is not None else None
+
+    @property
+    def trabajadores(self):
+        return self.servidor.trabajadores if self.servidor is not None else 0
+
+    def iniciar(self):
+        """
+        Crea el servidor y lo arranca en un hilo.
+
+        Raises:
+            OSError: Si el puerto no está libre
+        """
+        with self._lock:
+            if self.en_ejecucion:
+                return
+            self.servidor = crear_servidor(self.app, self.configuracion)
+            self._hilo = threading.Thread(target=self.servidor.ejecutar, daemon=True)
+            self._hilo.start()
+
+    def esperar_listo(self, timeout=15.0):
+        """
+        Espera a que el servidor responda en la ruta de salud.
+
+        Returns:
+            bool: True si está listo antes del timeout
+        """
+        return esperar_disponible(self.configuracion.host, self.configuracion.puerto, timeout)
+
+    def detener(self, timeout=10.0):
+        """Detiene el servidor, libera el puerto y espera a que termine su hilo"""
+        with self._lock:
+            if self.servidor is not None:
+                self.servidor.detener()
+            if self._hilo is not None:
+                self._hilo.join(timeout)
+            self.servidor = None
+            self._hilo = None
+
+    def reiniciar(self, **cambios):
+        """
+        Detiene el servidor y lo vuelve a arrancar.
+
+        Args:
+            **cambios: Campos de ConfiguracionServidor que cambian (puerto,
+                modo, trabajadores...); sin ellos se usa la misma configuración
+        """
+        self.detener()
+        if cambios:
+            self.configuracion = replace(self.configuracion, **cambios)
+        self.iniciar()
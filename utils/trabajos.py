@@ -0,0 +1,230 @@
+"""
+Cola de trabajos de exportación (PDF, imagen) renderizados en segundo plano.
+Los trabajos se ejecutan en un pool acotado de procesos para no ocupar los
+hilos que atienden las peticiones JSON.
+"""
+
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from utils.exportacion import buscar_exportacion, generar_imagen, generar_pdf, guardar_exportacion
+from utils.metricas import RENDER_EXPORTACION
+
+# Generadores de cada tipo de exportación
+GENERADORES = {
+    'pdf': generar_pdf,
+    'imagen': generar_imagen,
+}
+
+
+class ColaLlena(Exception):
+    """Se lanza cuando la cola de exportación ya tiene el máximo de trabajos pendientes"""
+
+
+class ColaNoDisponible(Exception):
+    """Se lanza cuando el pool no acepta el trabajo (p. ej. murió un proceso trabajador)"""
+
+
+def _renderizar(tipo, parametros):
+    """Renderiza un trabajo en el proceso trabajador y mide su duración"""
+    inicio = time.perf_counter()
+    contenido = GENERADORES[tipo](**parametros)
+    return contenido, (time.perf_counter() - inicio) * 1000
+
+
+class TrabajoExportacion:
+    """Estado de un trabajo de exportación"""
+
+    __slots__ = (
+        'id', 'tipo', 'parametros', 'estado', 'creado', 'terminado',
+        'tiempo_render_ms', 'error', 'contenido', 'futuro', 'desde_cache',
+    )
+
+    def __init__(self, tipo, parametros):
+        self.id = uuid.uuid4().hex
+        self.tipo = tipo
+        self.parametros = parametros
+        self.estado = 'en_cola'
+        self.creado = time.time()
+        self.terminado = None
+        self.tiempo_render_ms = None
+        self.error = None
+        self.contenido = None
+        self.futuro = None
+        self.desde_cache = False
+
+    def resumen(self):
+        """
+        Devuelve el estado del trabajo listo para serializar.
+
+        Returns:
+            dict: id, tipo, estado, tiempos y error si lo hubo
+        """
+        estado = self.estado
+        if estado == 'en_cola' and self.futuro is not None and self.futuro.running():
+            estado = 'procesando'
+
+        tiempo_total_ms = None
+        if self.terminado is not None:
+            tiempo_total_ms = round((self.terminado - self.creado) * 1000, 2)
+
+        return {
+            'id': self.id,
+            'tipo': self.tipo,
+            'parametros': self.parametros,
+            'estado': estado,
+            'tiempo_render_ms': self.tiempo_render_ms,
+            'tiempo_total_ms': tiempo_total_ms,
+            'tamano_bytes': len(self.contenido) if self.contenido is not None else None,
+            'desde_cache': self.desde_cache,
+            'error': self.error,
+        }
+
+
+class ColaExportacion:
+    """
+    Cola acotada de trabajos de exportación sobre un pool de procesos.
+
+    El pool se crea con el primer trabajo. Comparte las cachés de las
+    descargas directas: un trabajo que ya está en CACHE_PDF o CACHE_IMAGENES
+    se da por terminado sin ocupar el pool, y lo que renderiza el pool se
+    guarda en ellas. Los trabajos terminados se conservan hasta un máximo
+    configurable y después se descartan los más antiguos.
+    """
+
+    def __init__(self, trabajadores=2, profundidad=32, retenidos=256, usar_procesos=True):
+        self.trabajadores = max(1, int(trabajadores))
+        self.profundidad = max(1, int(profundidad))
+        self.retenidos = max(1, int(retenidos))
+        self.usar_procesos = usar_procesos
+        self._pool = None
+        self._trabajos = OrderedDict()
+        self._pendientes = 0
+        self._lock = threading.Lock()
+
+    def enviar(self, tipo, parametros):
+        """
+        Encola un trabajo de exportación.
+
+        Args:
+            tipo (str): 'pdf' o 'imagen'
+            parametros (dict): Argumentos del generador (personas, formato...)
+
+        Returns:
+            TrabajoExportacion: El trabajo creado
+
+        Raises:
+            ColaLlena: Si ya hay tantos trabajos pendientes como la profundidad
+            ColaNoDisponible: Si el pool está roto o cerrado; el siguiente
+                trabajo crea un pool nuevo
+        """
+        trabajo = TrabajoExportacion(tipo, parametros)
+
+        encontrado = buscar_exportacion(tipo, parametros)
+        if encontrado is not None:
+            trabajo.contenido = encontrado[0]
+            trabajo.tiempo_render_ms = 0.0
+            trabajo.desde_cache = True
+            trabajo.estado = 'terminado'
+            trabajo.terminado = time.time()
+            with self._lock:
+                self._trabajos[trabajo.id] = trabajo
+                self._descartar_antiguos()
+            return trabajo
+
+        with self._lock:
+            if self._pendientes >= self.profundidad:
+                raise ColaLlena(f'La cola de exportación está llena ({self.profundidad} trabajos)')
+            self._pendientes += 1
+            self._trabajos[trabajo.id] = trabajo
+            self._descartar_antiguos()
+            pool = self._obtener_pool()
+
+        try:
+            trabajo.futuro = pool.submit(_renderizar, tipo, parametros)
+        except (BrokenExecutor, RuntimeError) as e:
+            # Un pool roto no acepta más trabajos: se deshace el registro y
+            # se descarta para que _obtener_pool() cree uno nuevo
+            with self._lock:
+                self._pendientes -= 1
+                self._trabajos.pop(trabajo.id, None)
+                if self._pool is pool:
+                    self._pool = None
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise ColaNoDisponible(f'El pool de exportación no está disponible: {e}') from e
+        trabajo.futuro.add_done_callback(lambda futuro: self._terminar(trabajo, futuro))
+        return trabajo
+
+    def obtener(self, trabajo_id):
+        """
+        Busca un trabajo por su id.
+
+        Returns:
+            TrabajoExportacion o None si no existe o ya se descartó
+        """
+        with self._lock:
+            return self._trabajos.get(trabajo_id)
+
+    def estadisticas(self):
+        """
+        Devuelve el estado de la cola.
+
+        Returns:
+            dict: trabajadores, profundidad, pendientes y trabajos retenidos
+        """
+        with self._lock:
+            return {
+                'trabajadores': self.trabajadores,
+                'profundidad': self.profundidad,
+                'pendientes': self._pendientes,
+                'retenidos': len(self._trabajos),
+            }
+
+    def cerrar(self, esperar=True):
+        """Detiene el pool de trabajadores"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=esperar, cancel_futures=not esperar)
+
+    def _obtener_pool(self):
+        if self._pool is None:
+            clase = ProcessPoolExecutor if self.usar_procesos else ThreadPoolExecutor
+            self._pool = clase(max_workers=self.trabajadores)
+        return self._pool
+
+    def _terminar(self, trabajo, futuro):
+        try:
+            trabajo.contenido, trabajo.tiempo_render_ms = futuro.result()
+            RENDER_EXPORTACION.observar(trabajo.tiempo_render_ms / 1000, trabajo.tipo, 'cola')
+            trabajo.tiempo_render_ms = round(trabajo.tiempo_render_ms, 2)
+            guardar_exportacion(trabajo.tipo, trabajo.parametros, trabajo.contenido)
+            trabajo.estado = 'terminado'
+        except Exception as e:
+            trabajo.error = str(e) or e.__class__.__name__
+            trabajo.estado = 'error'
+        trabajo.terminado = time.time()
+
+        with self._lock:
+            self._pendientes -= 1
+
+    def _descartar_antiguos(self):
+        # Solo se descartan trabajos ya terminados, empezando por los más antiguos
+        exceso = len(self._trabajos) - self.retenidos
+        if exceso <= 0:
+            return
+        for trabajo_id in [t.id for t in self._trabajos.values() if t.terminado is not None][:exceso]:
+            del self._trabajos[trabajo_id]
+
+
+# Cola de exportación del proceso, configurable por variables de entorno
+COLA_EXPORTACION = ColaExportacion(
+    trabajadores=int(os.environ.get('FOODCALC_EXPORTACION_TRABAJADORES', min(4, os.cpu_count() or 1))),
+    profundidad=int(os.environ.get('FOODCALC_EXPORTACION_COLA', 32)),
+    retenidos=int(os.environ.get('FOODCALC_EXPORTACION_RETENIDOS', 256)),
+    usar_procesos=os.environ.get('FOODCALC_EXPORTACION_PROCESOS', '1') != '0'
+)
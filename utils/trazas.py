@@ -0,0 +1,137 @@
+"""
+Trazas por fases de las peticiones lentas (exportación a PDF e imagen).
+
+Cada fase se mide con un tramo:
+
+    with tramo('build'):
+        doc.build(story)
+
+Fuera de una traza activa (petición no muestreada, trabajo de la cola en
+otro proceso) tramo() no hace nada. Las trazas se devuelven en la cabecera
+Server-Timing y se escriben como una línea JSON en el registro de trazas.
+"""
+
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import random
+import time
+
+# Fracción de peticiones trazadas (0 desactiva las trazas, 1 las traza todas)
+MUESTREO = float(os.environ.get('FOODCALC_TRAZAS_MUESTREO', 1.0))
+
+# Registro de trazas: una línea JSON por petición trazada, con nivel INFO. Si
+# se indica un archivo se escriben allí; si no, se propagan a los manejadores
+# del logging de la aplicación (si no hay ninguno, no se registran).
+REGISTRO_TRAZAS = logging.getLogger('foodcalc.trazas')
+REGISTRO_TRAZAS.setLevel(logging.INFO)
+ARCHIVO_TRAZAS = os.environ.get('FOODCALC_TRAZAS_ARCHIVO')
+if ARCHIVO_TRAZAS:
+    _manejador = logging.FileHandler(ARCHIVO_TRAZAS, encoding='utf-8')
+    _manejador.setFormatter(logging.Formatter('%(message)s'))
+    REGISTRO_TRAZAS.addHandler(_manejador)
+    REGISTRO_TRAZAS.propagate = False
+
+_TRAZA_ACTUAL = contextvars.ContextVar('traza_actual', default=None)
+_TRAMO_NULO = contextlib.nullcontext()
+
+
+class Traza:
+    """Tramos medidos durante una petición, en orden de finalización"""
+
+    __slots__ = ('tramos', 'inicio')
+
+    def __init__(self):
+        self.tramos = []
+        self.inicio = time.perf_counter()
+
+    def agregar(self, nombre, duracion_ms):
+        self.tramos.append((nombre, duracion_ms))
+
+    def total_ms(self):
+        return (time.perf_counter() - self.inicio) * 1000
+
+    def server_timing(self):
+        """
+        Valor de la cabecera Server-Timing.
+
+        Returns:
+            str: p. ej. 'calculo;dur=0.12, build;dur=8.40'
+        """
+        return ', '.join(f'{nombre};dur={duracion:.2f}' for nombre, duracion in self.tramos)
+
+
+class _Tramo:
+    __slots__ = ('traza', 'nombre', 'inicio')
+
+    def __init__(self, traza, nombre):
+        self.traza = traza
+        self.nombre = nombre
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *excepcion):
+        self.traza.agregar(self.nombre, (time.perf_counter() - self.inicio) * 1000)
+        return False
+
+
+def tramo(nombre):
+    """
+    Mide una fase dentro de la traza activa.
+
+    Args:
+        nombre (str): Nombre de la fase (un token de Server-Timing, sin espacios)
+
+    Returns:
+        Gestor de contexto; no hace nada si no hay traza activa
+    """
+    traza = _TRAZA_ACTUAL.get()
+    if traza is None:
+        return _TRAMO_NULO
+    return _Tramo(traza, nombre)
+
+
+@contextlib.contextmanager
+def trazar(muestreo=None):
+    """
+    Activa una traza para el bloque si la petición sale en el muestreo.
+
+    Args:
+        muestreo (float): Fracción trazada; por defecto FOODCALC_TRAZAS_MUESTREO
+
+    Yields:
+        Traza o None si la petición no se traza
+    """
+    muestreo = MUESTREO if muestreo is None else muestreo
+    if muestreo <= 0 or (muestreo < 1 and random.random() >= muestreo):
+        yield None
+        return
+
+    traza = Traza()
+    token = _TRAZA_ACTUAL.set(traza)
+    try:
+        yield traza
+    finally:
+        _TRAZA_ACTUAL.reset(token)
+
+
+def registrar_traza(traza, **campos):
+    """
+    Escribe la traza como una línea JSON en el registro de trazas.
+
+    Args:
+        traza (Traza): Traza terminada
+        **campos: Datos de la petición (ruta, método, estado, parámetros...)
+    """
+    # Sin manejadores la línea se descartaría: no se construye
+    if not REGISTRO_TRAZAS.isEnabledFor(logging.INFO) or not REGISTRO_TRAZAS.hasHandlers():
+        return
+    REGISTRO_TRAZAS.info(json.dumps({
+        'ts': round(time.time(), 3),
+        **campos,
+        'tramos': [{'nombre': nombre, 'ms': round(duracion, 3)} for nombre, duracion in traza.tramos],
+    }, ensure_ascii=False))
@@ -0,0 +1,197 @@
+"""
+Vista nativa de la calculadora en Flet.
+
+Calcula en el mismo proceso con food_calculator, sin servidor Flask, sin
+navegador y sin peticiones HTTP. Las filas de la tabla se crean una sola
+vez: al escribir en el campo de personas solo cambian los textos de las
+cantidades, así que cada pulsación envía a la interfaz únicamente los
+valores modificados. La tabla es un ListView con altura de fila fija, que
+solo construye las filas visibles aunque haya cientos.
+"""
+
+import flet as ft
+
+from utils.catalogo import CATALOGO, CATEGORIA_UNIDADES, unidad_ingrediente
+from utils.food_calculator import (
+    ORDEN_UNIDADES,
+    SECCIONES_KG,
+    calcular_preparaciones,
+    calcular_refresco,
+    obtener_preparaciones_disponibles
+)
+
+# Altura fija de cada fila de la tabla (permite que ListView la virtualice)
+ALTO_FILA = 30
+
+# Personas con las que se abre la vista
+PERSONAS_INICIALES = 50
+
+
+def _fila(nombre, unidad):
+    """Crea una fila de la tabla y devuelve (fila, texto de la cantidad)"""
+    cantidad = ft.Text('', width=110, text_align=ft.TextAlign.RIGHT)
+    fila = ft.Container(
+        content=ft.Row(
+            [
+                ft.Text(nombre, size=13, expand=True),
+                cantidad,
+                ft.Text(unidad, size=13, width=80, color="#64748b"),
+            ],
+            spacing=8
+        ),
+        height=ALTO_FILA,
+        padding=ft.Padding(left=12, top=0, right=8, bottom=0)
+    )
+    return fila, cantidad
+
+
+def _cabecera(titulo):
+    """Crea la fila de título de una categoría o preparación"""
+    return ft.Container(
+        content=ft.Text(titulo, size=13, weight=ft.FontWeight.BOLD, color="#1e40af"),
+        height=ALTO_FILA,
+        bgcolor="#eff6ff",
+        padding=ft.Padding(left=8, top=6, right=8, bottom=0)
+    )
+
+
+class VistaCalculadora:
+    """
+    Pantalla de la calculadora: personas, tabla de productos por categoría,
+    refresco e ingredientes de las preparaciones seleccionadas.
+
+    El control raíz está en `contenido`. calcular() actualiza los valores
+    sin tocar la página, así que la vista también se puede construir y
+    medir sin abrir ninguna ventana.
+    """
+
+    def __init__(self, personas=PERSONAS_INICIALES):
+        self.personas = None
+        self.preparaciones = ()
+
+        self.campo_personas = ft.TextField(
+            label="Número de personas",
+            value=str(personas),
+            width=220,
+            keyboard_type=ft.KeyboardType.NUMBER,
+            on_change=self._al_escribir
+        )
+        self.aviso = ft.Text('', size=12, color="#ef4444")
+        self.texto_refresco = ft.Text('', size=14, weight=ft.FontWeight.BOLD, color="#0f766e")
+        self.selector = [
+            ft.Checkbox(label=nombre, value=False, on_change=self._al_seleccionar)
+            for nombre in obtener_preparaciones_disponibles()
+        ]
+
+        # Celdas de cantidad enlazadas a su posición en las listas de escalar()
+        self._celdas_kg = []
+        self._celdas_unidades = []
+        self._celdas_preparaciones = []
+        self._filas_productos = self._crear_filas_productos()
+
+        self.tabla = ft.ListView(
+            controls=list(self._filas_productos),
+            item_extent=ALTO_FILA,
+            spacing=0,
+            expand=True
+        )
+
+        self.contenido = ft.Column(
+            [
+                ft.Row([self.campo_personas, self.texto_refresco], spacing=20,
+                       vertical_alignment=ft.CrossAxisAlignment.CENTER),
+                self.aviso,
+                ft.Text("Preparaciones", size=14, weight=ft.FontWeight.BOLD),
+                ft.Row(self.selector, wrap=True, spacing=4, run_spacing=0),
+                ft.Container(
+                    content=self.tabla,
+                    expand=True,
+                    bgcolor="#f8fafc",
+                    border_radius=8
+                ),
+            ],
+            spacing=10,
+            expand=True
+        )
+
+        self.calcular(personas)
+
+    def _crear_filas_productos(self):
+        filas = []
+        for categoria, productos in SECCIONES_KG:
+            filas.append(_cabecera(categoria))
+            for producto, i in productos:
+                fila, celda = _fila(producto, 'kg')
+                filas.append(fila)
+                self._celdas_kg.append((i, celda))
+
+        if ORDEN_UNIDADES:
+            filas.append(_cabecera(CATEGORIA_UNIDADES))
+            for producto, j in ORDEN_UNIDADES:
+                fila, celda = _fila(producto, 'unidades')
+                filas.append(fila)
+                self._celdas_unidades.append((j, celda))
+        return filas
+
+    def _crear_filas_preparaciones(self, ingredientes):
+        filas = []
+        self._celdas_preparaciones = []
+        for preparacion in self.preparaciones:
+            filas.append(_cabecera(f"🍳 {preparacion}"))
+            for ingrediente in sorted(ingredientes.get(preparacion, ())):
+                fila, celda = _fila(ingrediente, unidad_ingrediente(ingrediente))
+                filas.append(fila)
+                self._celdas_preparaciones.append((preparacion, ingrediente, celda))
+        self.tabla.controls = self._filas_productos + filas
+
+    def calcular(self, personas):
+        """
+        Recalcula todas las cantidades para N personas.
+
+        Solo cambia el valor de las celdas existentes: las filas de las
+        preparaciones se crean al cambiar la selección, no al recalcular.
+
+        Args:
+            personas (int): Número de personas
+        """
+        self.personas = personas
+        cantidades_kg, cantidades_unidades = CATALOGO.escalar(personas)
+        for i, celda in self._celdas_kg:
+            celda.value = str(cantidades_kg[i])
+        for j, celda in self._celdas_unidades:
+            celda.value = str(cantidades_unidades[j])
+
+        self.texto_refresco.value = f"🥤 Refresco: {calcular_refresco(personas)} litros"
+        self._calcular_preparaciones()
+
+    def _calcular_preparaciones(self, recrear=False):
+        ingredientes = calcular_preparaciones(self.personas, self.preparaciones) if self.preparaciones else {}
+        if recrear:
+            self._crear_filas_preparaciones(ingredientes)
+        for preparacion, ingrediente, celda in self._celdas_preparaciones:
+            celda.value = str(ingredientes[preparacion][ingrediente])
+
+    def _al_escribir(self, e):
+        """Recalcula en cada pulsación si el número es válido"""
+        try:
+            personas = int(self.campo_personas.value)
+        except (TypeError, ValueError):
+            personas = 0
+        if personas < 1:
+            self.aviso.value = "Número de personas debe ser mayor a 0"
+            self.aviso.update()
+            return
+
+        aviso = self.aviso.value
+        self.aviso.value = ''
+        if personas != self.personas:
+            self.calcular(personas)
+            self.contenido.update()
+        elif aviso:
+            self.aviso.update()
+
+    def _al_seleccionar(self, e):
+        """Añade o quita las filas de las preparaciones marcadas"""
+        self.preparaciones = tuple(casilla.label for casilla in self.selector if casilla.value)
+        self._calcular_preparaciones(recrear=True)
+        self.contenido.update()